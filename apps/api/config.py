@@ -3,7 +3,7 @@ Configuration management using Pydantic Settings
 Environment variables loaded from DO Secrets in K8s
 """
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List, Optional
 from functools import lru_cache
 
 
@@ -23,6 +23,8 @@ class Settings(BaseSettings):
     # JWT
     JWT_ALGORITHM: str = "RS256"
     JWT_PUBLIC_KEY: str  # Keycloak public key
+    JWT_CACHE_SIZE: int = 10000  # Verified tokens kept per process
+    JWT_CACHE_MAX_TTL: int = 300  # Seconds a verification is reused (at most until exp)
 
     # Stripe
     STRIPE_SECRET_KEY: str
@@ -32,10 +34,82 @@ class Settings(BaseSettings):
     # OpenAI
     OPENAI_API_KEY: str
     OPENAI_MODEL: str = "gpt-4o"
+    OPENAI_BASE_URL: Optional[str] = None  # Override, e.g. a local fake server in tests
+    OPENAI_DEADLINE_SECONDS: float = 45.0  # Total budget per completion, retries included
+    OPENAI_SERVICE_DEADLINES: Dict[str, float] = {"cold-dm": 20.0, "objection": 25.0, "carousel": 60.0}
+    OPENAI_MAX_RETRIES: int = 2
+    OPENAI_RETRY_BASE_DELAY: float = 0.5  # Seconds, doubled per attempt (full jitter)
+    OPENAI_RETRY_MAX_DELAY: float = 4.0
+
+    # Prompt token budget (checked locally before any OpenAI call)
+    OPENAI_CONTEXT_WINDOW: int = 128000  # Prompt + completion tokens of OPENAI_MODEL
+    OPENAI_MAX_PROMPT_TOKENS: int = 4000  # Per-service override: config.max_prompt_tokens
+    OPENAI_DEFAULT_MAX_TOKENS: int = 1000  # Per-service override: config.max_tokens
+    TIKTOKEN_LOAD_TIMEOUT: float = 10.0  # Startup wait for the encoding; heuristic counts until loaded
+    CONTEXT_LIST_LIMITS: Dict[str, int] = {
+        "recent_activity": 3,
+        "tech_stack": 5,
+        "interests": 5,
+        "pain_points": 5
+    }
+    CONTEXT_FIELD_MAX_CHARS: int = 500  # Longer strings in context lists are cut
+
+    # LLM admission control (shared by all pods through Redis)
+    LLM_RPM_LIMIT: int = 500  # Keep below the OpenAI org limits
+    LLM_TPM_LIMIT: int = 150000
+    LLM_ADMISSION_QUEUE_SIZE: int = 200  # Waiting calls per pod before shedding with 503
+    LLM_ADMISSION_MAX_WAIT: float = 10.0  # Seconds
+
+    # LLM weighted fair scheduling (per pod)
+    LLM_SCHEDULER_CONCURRENCY: int = 32  # Concurrent OpenAI completions per pod
+    LLM_STREAM_SCHEDULER_CONCURRENCY: int = 64  # Concurrent OpenAI streams per pod (held until the last token)
+    LLM_PLAN_WEIGHTS: Dict[str, float] = {
+        "monthly_bundle": 4.0,
+        "annual_bundle": 4.0,
+        "monthly_single": 2.0,
+        "annual_single": 2.0,
+        "founding": 1.0,
+        "none": 1.0
+    }
+
+    # Circuit breaker on upstream errors
+    CIRCUIT_BREAKER_ERROR_RATE: float = 0.5  # Failure ratio that opens the circuit
+    CIRCUIT_BREAKER_MIN_CALLS: int = 20  # Calls in the window before the ratio counts
+    CIRCUIT_BREAKER_WINDOW: int = 30  # Seconds
+    CIRCUIT_BREAKER_OPEN_SECONDS: int = 30  # Fail fast this long before probing again
 
     # Apollo.io
     APOLLO_API_KEY: str
     APOLLO_BASE_URL: str = "https://api.apollo.io/v1"
+    APOLLO_BULK_MATCH_SIZE: int = 10  # Prospects per people/bulk_match call (Apollo max)
+    APOLLO_BULK_CONCURRENCY: int = 4  # Bulk match calls in flight per enrich_profiles
+    APOLLO_SEARCH_PAGE_SIZE: int = 100  # People per mixed_people/search page (Apollo max)
+    APOLLO_SEARCH_PREFETCH: int = 3  # Pages fetched ahead while streaming a search
+    APOLLO_SEARCH_MAX_PAGES: int = 500  # Apollo does not serve pages beyond this
+    APOLLO_SEARCH_MAX_RESULTS: int = 10000  # Per streamed search
+    APOLLO_SEARCH_MAX_RETRIES: int = 3  # Retries of a rate-limited (429) page
+
+    # Apollo enrichment cache (in-process LRU + enrichment_cache table)
+    ENRICHMENT_CACHE_SIZE: int = 10000  # In-process entries
+    ENRICHMENT_FIELD_TTLS: Dict[str, int] = {  # Seconds each enriched field stays fresh
+        "email": 30 * 86400,
+        "phone": 30 * 86400,
+        "title": 14 * 86400,
+        "linkedin_url": 90 * 86400,
+        "company": 30 * 86400,
+        "company_size": 30 * 86400,
+        "tech_stack": 7 * 86400,
+        "industry": 30 * 86400
+    }
+    ENRICHMENT_MISS_TTL: int = 21600  # Prospects Apollo has no match for
+    ENRICHMENT_ERROR_TTL: int = 300  # Failed lookups
+    ENRICHMENT_BUDGET_MS: int = 800  # Generation waits this long for enrichment (0 = no limit)
+
+    # Outbound HTTP connection pools (OpenAI, Apollo)
+    HTTP_POOL_MAX_CONNECTIONS: int = 100
+    HTTP_POOL_MAX_KEEPALIVE: int = 20
+    HTTP_POOL_KEEPALIVE_EXPIRY: float = 30.0  # Seconds
+    HTTP2_ENABLED: bool = True
 
     # LinkedIn (if using official API)
     LINKEDIN_CLIENT_ID: str = ""
@@ -82,7 +156,53 @@ class Settings(BaseSettings):
 
     # Rate Limiting
     RATE_LIMIT_DAILY: int = 100
+    RATE_LIMIT_MONTHLY: int = 3000
+    RATE_LIMIT_MONTHLY_WINDOW_DAYS: int = 30  # Sliding window
     RATE_LIMIT_BURST: int = 10
+    RATE_LIMIT_BURST_WINDOW: int = 60  # Seconds to refill a full burst bucket
+
+    # Unlocked (user, service) grants cached in-process (seconds)
+    ENTITLEMENT_CACHE_TTL: int = 60
+
+    # Batch generation
+    BATCH_MAX_ITEMS: int = 500
+    BATCH_CONCURRENCY: int = 8  # Items enriched/generated at once per batch
+    BATCH_INSERT_CHUNK: int = 50  # Generation rows per bulk INSERT
+
+    # Write-behind Generation inserts (off = insert before responding)
+    GENERATION_WRITE_BEHIND: bool = False
+    GENERATION_WRITE_QUEUE_SIZE: int = 10000  # Requests wait for space beyond this
+    GENERATION_FLUSH_ROWS: int = 200
+    GENERATION_FLUSH_INTERVAL_MS: int = 250
+
+    # Analytics events (buffered, flushed with COPY)
+    EVENT_TRACKING_ENABLED: bool = True
+    EVENT_BUFFER_SIZE: int = 50000  # Events beyond this are dropped
+    EVENT_FLUSH_ROWS: int = 2000
+    EVENT_FLUSH_INTERVAL_MS: int = 500
+    EVENT_SAMPLE_RATES: Dict[str, float] = {}  # event_type -> fraction kept, e.g. {"page_view": 0.1}
+
+    # Asynchronous generation jobs
+    JOB_WORKER_ENABLED: bool = True  # Run workers inside API pods too
+    JOB_WORKER_CONCURRENCY: int = 4
+    JOB_POLL_INTERVAL: float = 1.0  # Seconds between claims when the queue is empty
+    JOB_LOCK_TIMEOUT: int = 300  # Seconds before a running job is reclaimed
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_CALLBACK_SECRET: str = ""  # HMAC key for callback signatures
+    JOB_CALLBACK_ALLOWED_HOSTS: List[str] = []  # If set, callbacks only to these hosts (and subdomains)
+
+    # Response cache (opt-in per service via config.response_cache_ttl)
+    RESPONSE_CACHE_MAX_ENTRIES: int = 5000
+    RESPONSE_CACHE_REDIS_ENABLED: bool = True
+
+    # Idempotency-Key handling (seconds)
+    IDEMPOTENCY_TTL: int = 86400  # Replay window
+    IDEMPOTENCY_LOCK_TTL: int = 120  # Reservation while the original runs
+    IDEMPOTENCY_WAIT_TIMEOUT: int = 90  # Max wait on an in-flight original
+    IDEMPOTENCY_POLL_INTERVAL: float = 0.2
+
+    # Service config snapshot refresh (seconds)
+    SERVICE_CONFIG_REFRESH_INTERVAL: int = 60
 
     # Pagination
     DEFAULT_PAGE_SIZE: int = 20
@@ -0,0 +1,177 @@
+"""
+Fake Apollo.io API - offline stand-in for benchmarks and load tests
+Serves the endpoints ApolloService uses with deterministic fake people:
+
+    uvicorn fake_apollo:app --port 8099
+    APOLLO_BASE_URL=http://127.0.0.1:8099/v1 APOLLO_API_KEY=fake ...
+
+    python fake_apollo.py bench --prospects 500  # single vs bulk enrichment
+
+Latency, match rate and the per-minute request limit are set with
+FAKE_APOLLO_LATENCY_MS, FAKE_APOLLO_MISS_RATE and FAKE_APOLLO_RPM
+(0 = unlimited; beyond it requests get 429 like the real API).
+"""
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from typing import Any, Dict, Optional
+import argparse
+import asyncio
+import hashlib
+import os
+import time
+
+LATENCY = float(os.getenv("FAKE_APOLLO_LATENCY_MS", "150")) / 1000
+MISS_RATE = float(os.getenv("FAKE_APOLLO_MISS_RATE", "0.1"))
+RPM = int(os.getenv("FAKE_APOLLO_RPM", "0"))
+SEARCH_TOTAL = int(os.getenv("FAKE_APOLLO_SEARCH_TOTAL", "5000"))
+
+TECHNOLOGIES = ["Salesforce", "HubSpot", "Snowflake", "dbt", "Looker", "Segment", "Stripe", "Intercom"]
+INDUSTRIES = ["SaaS", "Fintech", "E-commerce", "Healthcare", "Logistics"]
+
+app = FastAPI(title="Fake Apollo")
+
+_window_started = time.monotonic()
+_window_requests = 0
+
+
+def _digest(value: str) -> int:
+    return int(hashlib.sha256(value.encode()).hexdigest()[:12], 16)
+
+
+def fake_person(seed: str) -> Dict[str, Any]:
+    n = _digest(seed)
+    slug = f"prospect-{n % 10 ** 8}"
+    return {
+        "id": f"fake{n:x}",
+        "name": f"Prospect {n % 10 ** 8}",
+        "title": ["VP Sales", "Head of Growth", "CTO", "Founder"][n % 4],
+        "email": f"{slug}@example.com",
+        "phone_numbers": [f"+1555{n % 10 ** 7:07d}"],
+        "linkedin_url": f"http://www.linkedin.com/in/{slug}",
+        "organization": {
+            "name": f"Company {n % 997}",
+            "estimated_num_employees": 10 + n % 5000,
+            "technologies": TECHNOLOGIES[n % 4:n % 4 + 4],
+            "industry": INDUSTRIES[n % len(INDUSTRIES)]
+        }
+    }
+
+
+def match(details: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    seed = details.get("linkedin_url") or "|".join(
+        str(details.get(field, "")) for field in ("first_name", "last_name", "organization_name")
+    )
+    if (_digest("miss" + seed) % 1000) / 1000 < MISS_RATE:
+        return None
+    return fake_person(seed)
+
+
+@app.middleware("http")
+async def rate_limit(request: Request, call_next):
+    global _window_started, _window_requests
+    now = time.monotonic()
+    if now - _window_started >= 60:
+        _window_started, _window_requests = now, 0
+    _window_requests += 1
+
+    headers = {}
+    if RPM:
+        left = max(0, RPM - _window_requests)
+        headers = {"x-rate-limit-minute": str(RPM), "x-minute-requests-left": str(left)}
+        if _window_requests > RPM:
+            retry_after = str(max(1, int(60 - (now - _window_started))))
+            return JSONResponse({"error": "rate limited"}, 429, {**headers, "Retry-After": retry_after})
+
+    await asyncio.sleep(LATENCY)
+    response = await call_next(request)
+    response.headers.update(headers)
+    return response
+
+
+@app.post("/v1/people/match")
+async def people_match(details: Dict[str, Any]):
+    return {"person": match(details)}
+
+
+@app.post("/v1/people/bulk_match")
+async def people_bulk_match(body: Dict[str, Any]):
+    details = body.get("details") or []
+    if len(details) > 10:
+        return JSONResponse({"error": "At most 10 details per request"}, 422)
+    return {"matches": [match(item) for item in details]}
+
+
+@app.post("/v1/mixed_people/search")
+async def mixed_people_search(query: Dict[str, Any], page: int = 1, per_page: int = 10):
+    per_page = min(per_page, 100)
+    start = (page - 1) * per_page
+    seed = repr(sorted(query.items()))
+    people = [
+        fake_person(f"{seed}:{index}")
+        for index in range(start, min(start + per_page, SEARCH_TOTAL))
+    ]
+    return {
+        "people": people,
+        "pagination": {
+            "page": page,
+            "per_page": per_page,
+            "total_entries": SEARCH_TOTAL,
+            "total_pages": -(-SEARCH_TOTAL // per_page)
+        }
+    }
+
+
+async def bench(args: argparse.Namespace) -> None:
+    """
+    Time per-prospect vs bulk enrichment against this server (no cache)
+    """
+    import uvicorn
+    from services.apollo_service import ApolloService
+    from services.http_clients import create_http_client
+
+    server = uvicorn.Server(uvicorn.Config(app, port=args.port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    client = create_http_client(timeout=30.0)
+    service = ApolloService(client=client, cache=None)
+    service.api_key = "fake"
+    service.base_url = f"http://127.0.0.1:{args.port}/v1"
+
+    prospects = [
+        {"name": f"Lead {i}", "company": f"Company {i % 97}"}
+        for i in range(args.prospects)
+    ]
+
+    try:
+        started = time.perf_counter()
+        for prospect in prospects:
+            await service.enrich_profile(dict(prospect))
+        single = time.perf_counter() - started
+
+        started = time.perf_counter()
+        await service.enrich_profiles([dict(prospect) for prospect in prospects])
+        bulk = time.perf_counter() - started
+    finally:
+        await client.aclose()
+        server.should_exit = True
+        await serving
+
+    print(f"{args.prospects} prospects, {LATENCY * 1000:.0f} ms per Apollo call")
+    print(f"enrich_profile (one call each): {single:.2f}s")
+    print(f"enrich_profiles (bulk match):   {bulk:.2f}s ({single / bulk:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Apollo.io API")
+    parser.add_argument("command", choices=["serve", "bench"], nargs="?", default="serve")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--prospects", type=int, default=200, help="Prospects to enrich (bench)")
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        asyncio.run(bench(args))
+    else:
+        import uvicorn
+        uvicorn.run(app, port=args.port)
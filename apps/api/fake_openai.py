@@ -0,0 +1,225 @@
+"""
+Fake OpenAI API - offline stand-in for benchmarks and failure drills
+Serves /v1/chat/completions (plain and streamed) with deterministic
+fake completions:
+
+    uvicorn fake_openai:app --port 8098
+    OPENAI_BASE_URL=http://127.0.0.1:8098/v1 OPENAI_API_KEY=fake ...
+
+    python fake_openai.py demo  # retries, circuit breaker and recovery
+
+Latency is set with FAKE_OPENAI_LATENCY_MS (before the response or the
+first chunk) and FAKE_OPENAI_CHUNK_MS (between streamed chunks).
+FAKE_OPENAI_429_RATE and FAKE_OPENAI_5XX_RATE are the fractions of
+requests answered with 429 (with Retry-After: FAKE_OPENAI_RETRY_AFTER)
+and 503, like the real API under load.
+"""
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Any, Dict, List
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+
+LATENCY = float(os.getenv("FAKE_OPENAI_LATENCY_MS", "300")) / 1000
+CHUNK_LATENCY = float(os.getenv("FAKE_OPENAI_CHUNK_MS", "15")) / 1000
+RATE_LIMIT_RATE = float(os.getenv("FAKE_OPENAI_429_RATE", "0"))
+SERVER_ERROR_RATE = float(os.getenv("FAKE_OPENAI_5XX_RATE", "0"))
+RETRY_AFTER = int(os.getenv("FAKE_OPENAI_RETRY_AFTER", "1"))
+COMPLETION_TOKENS = int(os.getenv("FAKE_OPENAI_COMPLETION_TOKENS", "120"))
+
+WORDS = ["pipeline", "quarter", "outreach", "revenue", "team", "growth", "demo", "signal", "intro", "value"]
+
+app = FastAPI(title="Fake OpenAI")
+
+# Responses served, by status code (read by the demo)
+served: Dict[int, int] = {}
+
+
+def fake_words(messages: List[Dict[str, Any]], count: int) -> List[str]:
+    n = int(hashlib.sha256(json.dumps(messages, sort_keys=True).encode()).hexdigest()[:12], 16)
+    return [WORDS[(n >> (i % 40)) % len(WORDS)] for i in range(count)]
+
+
+def injected_error():
+    roll = random.random()
+    if roll < RATE_LIMIT_RATE:
+        return JSONResponse(
+            {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+            429,
+            {"Retry-After": str(RETRY_AFTER)}
+        )
+    if roll < RATE_LIMIT_RATE + SERVER_ERROR_RATE:
+        return JSONResponse(
+            {"error": {"message": "The server is overloaded", "type": "server_error", "code": None}},
+            503
+        )
+    return None
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(body: Dict[str, Any]):
+    await asyncio.sleep(LATENCY)
+    error = injected_error()
+    if error is not None:
+        served[error.status_code] = served.get(error.status_code, 0) + 1
+        return error
+    served[200] = served.get(200, 0) + 1
+
+    messages = body.get("messages") or []
+    model = body.get("model", "gpt-4o")
+    words = fake_words(messages, min(COMPLETION_TOKENS, body.get("max_tokens") or COMPLETION_TOKENS))
+    prompt_tokens = sum(len(str(message.get("content", ""))) // 4 + 4 for message in messages)
+    completion_id = f"chatcmpl-fake{int(time.time() * 1000)}"
+    usage = {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": len(words),
+        "total_tokens": prompt_tokens + len(words)
+    }
+
+    if not body.get("stream"):
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": " ".join(words)},
+                "finish_reason": "stop"
+            }],
+            "usage": usage
+        }
+
+    async def chunks():
+        for index, word in enumerate(words + [None]):
+            if index:
+                await asyncio.sleep(CHUNK_LATENCY)
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "delta": {"content": word if not index else " " + word} if word else {},
+                    "finish_reason": None if word else "stop"
+                }]
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+        if (body.get("stream_options") or {}).get("include_usage"):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [],
+                "usage": usage
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(chunks(), media_type="text/event-stream")
+
+
+async def demo(args: argparse.Namespace) -> None:
+    """
+    Drive OpenAIService through healthy, flaky, down and recovered phases
+    against this server and print what the caller and the server saw
+    """
+    global LATENCY, RATE_LIMIT_RATE, SERVER_ERROR_RATE
+    import uvicorn
+    from openai import AsyncOpenAI
+    from services.circuit_breaker import CircuitBreaker
+    from services.openai_service import OpenAIService
+    from services.scheduler import FairScheduler
+
+    server = uvicorn.Server(uvicorn.Config(app, port=args.port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    client = AsyncOpenAI(api_key="fake", base_url=f"http://127.0.0.1:{args.port}/v1", max_retries=0)
+    breaker = CircuitBreaker("fake-openai", min_calls=args.min_calls, open_seconds=args.open_seconds)
+    service = OpenAIService(
+        client=client,
+        breaker=breaker,
+        scheduler=FairScheduler(),
+        stream_scheduler=FairScheduler(name="stream")
+    )
+    request = service._generic_request("Write a two-line intro for a VP Sales", max_tokens=60)
+
+    async def call(streamed: bool) -> str:
+        try:
+            if streamed:
+                async for _ in service.stream(dict(request), deadline=args.deadline):
+                    pass
+            else:
+                await service.complete(dict(request), deadline=args.deadline)
+            return "ok"
+        except Exception as e:
+            return type(e).__name__
+
+    async def phase(name: str, calls: int, concurrent: bool) -> None:
+        served.clear()
+        started = time.perf_counter()
+        if concurrent:
+            results = await asyncio.gather(*(call(streamed=i % 2 == 1) for i in range(calls)))
+        else:
+            results = [await call(streamed=i % 2 == 1) for i in range(calls)]
+        elapsed = time.perf_counter() - started
+
+        outcomes: Dict[str, int] = {}
+        for result in results:
+            outcomes[result] = outcomes.get(result, 0) + 1
+        print(f"{name}: {calls} calls in {elapsed:.1f}s")
+        print(f"  caller saw {dict(sorted(outcomes.items()))}")
+        print(f"  server answered {sum(served.values())} requests {dict(sorted(served.items()))}, breaker {breaker.state}")
+
+    try:
+        RATE_LIMIT_RATE, SERVER_ERROR_RATE = 0.0, 0.0
+        await phase("healthy", args.calls, concurrent=True)
+
+        # Transient 429s and 503s are retried inside the deadline
+        RATE_LIMIT_RATE, SERVER_ERROR_RATE = args.flaky_rate / 2, args.flaky_rate / 2
+        await phase("flaky", args.calls, concurrent=True)
+
+        # Every call fails until the breaker opens; then calls fail fast
+        # without reaching the server. A fresh breaker keeps the earlier
+        # successes from diluting the error rate.
+        service.breaker = breaker = CircuitBreaker(
+            "fake-openai", min_calls=args.min_calls, open_seconds=args.open_seconds
+        )
+        LATENCY, RATE_LIMIT_RATE, SERVER_ERROR_RATE = 0.02, 0.0, 1.0
+        await phase("down", args.calls, concurrent=False)
+
+        # After the cool-down a half-open probe closes the circuit
+        RATE_LIMIT_RATE, SERVER_ERROR_RATE = 0.0, 0.0
+        await asyncio.sleep(args.open_seconds)
+        await phase("recovered", args.calls, concurrent=False)
+    finally:
+        await client.close()
+        server.should_exit = True
+        await serving
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake OpenAI API")
+    parser.add_argument("command", choices=["serve", "demo"], nargs="?", default="serve")
+    parser.add_argument("--port", type=int, default=8098)
+    parser.add_argument("--calls", type=int, default=20, help="Calls per phase (demo)")
+    parser.add_argument("--flaky-rate", type=float, default=0.3, help="Share of 429/503 answers in the flaky phase")
+    parser.add_argument("--deadline", type=float, default=10.0)
+    parser.add_argument("--min-calls", type=int, default=10, help="Breaker min_calls (demo)")
+    parser.add_argument("--open-seconds", type=float, default=2.0, help="Breaker cool-down (demo)")
+    args = parser.parse_args()
+
+    if args.command == "demo":
+        asyncio.run(demo(args))
+    else:
+        import uvicorn
+        uvicorn.run(app, port=args.port)
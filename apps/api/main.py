@@ -11,8 +11,21 @@ from contextlib import asynccontextmanager
 import time
 import logging
 
-from routers import auth, user, services, admin, webhooks
-from models.database import engine, Base
+from routers import auth, user, services, admin, webhooks, jobs
+from models.database import engine, Base, QueryCounter, query_counter
+from services.http_clients import open_clients, close_clients
+from services.redis_client import open_redis, close_redis
+from services.rate_limiter import RateLimiter
+from services.config_cache import ServiceConfigCache
+from services.response_cache import ResponseCache
+from services.idempotency import IdempotencyStore
+from services.admission import AdmissionController
+from services.job_worker import JobWorker
+from services.generation_writer import GenerationWriter
+from services.events import event_buffer
+from services.openai_service import OpenAIService
+from services.apollo_service import ApolloService
+from services.token_budget import warm_up as warm_up_token_counting
 from config import settings
 
 # Logging configuration
@@ -33,6 +46,12 @@ REQUEST_DURATION = Histogram(
     'Request duration in seconds',
     ['method', 'endpoint']
 )
+DB_QUERIES_PER_REQUEST = Histogram(
+    'konqer_api_db_queries_per_request',
+    'Database round trips per request',
+    ['method', 'endpoint'],
+    buckets=(0, 1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 50)
+)
 
 # Lifespan context manager (startup/shutdown)
 @asynccontextmanager
@@ -46,12 +65,60 @@ async def lifespan(app: FastAPI):
         # await conn.run_sync(Base.metadata.create_all)
         logger.info("✅ Database connection established")
 
+    # Token counting encoding (loaded off the event loop)
+    await warm_up_token_counting()
+
+    # Shared outbound clients (OpenAI, Apollo, Redis)
+    await open_clients(app)
+    await open_redis(app)
+    app.state.rate_limiter = RateLimiter(app.state.redis)
+    app.state.response_cache = ResponseCache(app.state.redis)
+    app.state.idempotency_store = IdempotencyStore(app.state.redis)
+    app.state.admission_controller = AdmissionController(app.state.redis)
+
+    # Write-behind buffer for Generation rows
+    app.state.generation_writer = None
+    if settings.GENERATION_WRITE_BEHIND:
+        app.state.generation_writer = GenerationWriter()
+        await app.state.generation_writer.start()
+
+    # Analytics event flusher
+    if settings.EVENT_TRACKING_ENABLED:
+        await event_buffer.start()
+
+    # Service config snapshot
+    app.state.service_config_cache = ServiceConfigCache()
+    await app.state.service_config_cache.start()
+
+    # Generation job workers (can also run standalone via worker.py)
+    app.state.job_worker = None
+    if settings.JOB_WORKER_ENABLED:
+        app.state.job_worker = JobWorker(
+            openai_service=OpenAIService(
+                client=app.state.openai_client,
+                admission=app.state.admission_controller
+            ),
+            apollo_service=ApolloService(client=app.state.apollo_client),
+            response_cache=app.state.response_cache,
+            config_cache=app.state.service_config_cache,
+            limiter=app.state.rate_limiter
+        )
+        await app.state.job_worker.start()
+
     logger.info("✅ Konqer API started successfully")
 
     yield
 
     # Shutdown
     logger.info("🛑 Shutting down Konqer API...")
+    if app.state.job_worker:
+        await app.state.job_worker.stop()
+    if app.state.generation_writer:
+        await app.state.generation_writer.stop()
+    await event_buffer.stop()
+    await app.state.service_config_cache.stop()
+    await close_clients(app)
+    await close_redis(app)
     await engine.dispose()
     logger.info("✅ Database connections closed")
 
@@ -85,6 +152,8 @@ if settings.ENVIRONMENT == "production":
 @app.middleware("http")
 async def metrics_middleware(request: Request, call_next):
     start_time = time.time()
+    counter = QueryCounter()
+    query_counter.set(counter)
 
     response = await call_next(request)
 
@@ -101,7 +170,15 @@ async def metrics_middleware(request: Request, call_next):
         endpoint=request.url.path
     ).observe(duration)
 
+    DB_QUERIES_PER_REQUEST.labels(
+        method=request.method,
+        endpoint=request.url.path
+    ).observe(counter.count)
+
     response.headers["X-Process-Time"] = str(duration)
+    if settings.ENVIRONMENT != "production":
+        # Internal detail: only exposed outside production
+        response.headers["X-DB-Queries"] = str(counter.count)
 
     return response
 
@@ -157,6 +234,7 @@ app.include_router(user.router, prefix="/user", tags=["User"])
 app.include_router(services.router, prefix="/services", tags=["Services"])
 app.include_router(admin.router, prefix="/admin", tags=["Admin"])
 app.include_router(webhooks.router, prefix="/webhooks", tags=["Webhooks"])
+app.include_router(jobs.router, prefix="/jobs", tags=["Jobs"])
 
 # Startup event logging
 @app.on_event("startup")
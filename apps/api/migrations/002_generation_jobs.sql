@@ -0,0 +1,38 @@
+-- ============================================
+-- KONQER DATABASE SCHEMA - 002
+-- ============================================
+-- Asynchronous generation jobs (POST /services/{service}/jobs)
+-- Claimed by workers with FOR UPDATE SKIP LOCKED
+
+CREATE TABLE generation_jobs (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  user_id UUID REFERENCES users(id) ON DELETE CASCADE,
+  service VARCHAR(100) NOT NULL,
+  status VARCHAR(50) NOT NULL DEFAULT 'queued',  -- 'queued', 'running', 'succeeded', 'failed'
+  prompt TEXT,
+  context JSONB DEFAULT '{}'::jsonb,
+  callback_url TEXT,
+  generation_id UUID REFERENCES generations(id) ON DELETE SET NULL,
+  result JSONB,
+  error TEXT,
+  attempts INTEGER DEFAULT 0,
+  locked_at TIMESTAMP,
+  started_at TIMESTAMP,
+  finished_at TIMESTAMP,
+  created_at TIMESTAMP DEFAULT NOW(),
+  updated_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX idx_generation_jobs_user ON generation_jobs(user_id, created_at DESC);
+CREATE INDEX idx_generation_jobs_claim ON generation_jobs(created_at) WHERE status = 'queued';
+CREATE INDEX idx_generation_jobs_running ON generation_jobs(locked_at) WHERE status = 'running';
+
+CREATE TRIGGER update_generation_jobs_updated_at
+  BEFORE UPDATE ON generation_jobs
+  FOR EACH ROW
+  EXECUTE FUNCTION update_updated_at_column();
+
+-- ============================================
+-- MIGRATION COMPLETE
+-- ============================================
+-- Version: 002
@@ -0,0 +1,24 @@
+-- ============================================
+-- KONQER DATABASE SCHEMA - 003
+-- ============================================
+-- Progress checkpoints for resumable backfills (rescore.py)
+
+CREATE TABLE backfill_checkpoints (
+  name VARCHAR(100) PRIMARY KEY,
+  last_id UUID,  -- Keyset position: rows with id <= last_id are done
+  processed BIGINT NOT NULL DEFAULT 0,
+  updated BIGINT NOT NULL DEFAULT 0,
+  started_at TIMESTAMP DEFAULT NOW(),
+  finished_at TIMESTAMP,
+  updated_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE TRIGGER update_backfill_checkpoints_updated_at
+  BEFORE UPDATE ON backfill_checkpoints
+  FOR EACH ROW
+  EXECUTE FUNCTION update_updated_at_column();
+
+-- ============================================
+-- MIGRATION COMPLETE
+-- ============================================
+-- Version: 003
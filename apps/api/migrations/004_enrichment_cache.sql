@@ -0,0 +1,20 @@
+-- ============================================
+-- KONQER DATABASE SCHEMA - 004
+-- ============================================
+-- Apollo enrichment results shared by all pods (services/enrichment_cache.py)
+-- Keyed by normalized LinkedIn URL ('li:...') or name + company ('nc:...')
+
+CREATE TABLE enrichment_cache (
+  key VARCHAR(512) PRIMARY KEY,
+  status VARCHAR(10) NOT NULL,  -- 'hit', 'miss' (no Apollo match), 'error'
+  fields JSONB NOT NULL DEFAULT '{}'::jsonb,  -- Enriched context fields
+  fetched_at TIMESTAMP NOT NULL DEFAULT NOW(),
+  expires_at TIMESTAMP NOT NULL  -- Nothing in the row is fresh after this
+);
+
+CREATE INDEX idx_enrichment_cache_expires_at ON enrichment_cache(expires_at);
+
+-- ============================================
+-- MIGRATION COMPLETE
+-- ============================================
+-- Version: 004
@@ -2,33 +2,97 @@
 SQLAlchemy models matching the database schema
 """
 from sqlalchemy import (
-    Column, String, Integer, Float, Boolean, Text,
-    ForeignKey, TIMESTAMP, Enum, Index, UniqueConstraint
+    Column, String, Integer, BigInteger, Float, Boolean, Text,
+    ForeignKey, TIMESTAMP, Enum, Index, UniqueConstraint, event
 )
 from sqlalchemy.dialects.postgresql import UUID, JSONB, INET
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import declarative_base, relationship, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.sql import func
+from prometheus_client import Histogram
+from contextvars import ContextVar
+from typing import Optional
 import enum
+import time
 from config import settings
 
 # Base class
 Base = declarative_base()
 
+# ============================================
+# CONNECTION POOL METRICS
+# ============================================
+DB_POOL_WAIT = Histogram(
+    'konqer_api_db_pool_wait_seconds',
+    'Time spent waiting to check a connection out of the pool',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+DB_CONNECTION_HELD = Histogram(
+    'konqer_api_db_connection_held_seconds',
+    'Time a connection stays checked out of the pool',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that records how long each checkout waited for a connection
+    """
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - start)
+
+
 # Async engine
 engine = create_async_engine(
     settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"),
     echo=settings.ENVIRONMENT == "development",
+    poolclass=TimedQueuePool,
     pool_size=10,
     max_overflow=20
 )
 
+
+@event.listens_for(engine.sync_engine, "checkout")
+def _mark_checkout(dbapi_connection, connection_record, connection_proxy):
+    connection_record.info["checked_out_at"] = time.perf_counter()
+
+
+@event.listens_for(engine.sync_engine, "checkin")
+def _observe_checkin(dbapi_connection, connection_record):
+    checked_out_at = connection_record.info.pop("checked_out_at", None)
+    if checked_out_at is not None:
+        DB_CONNECTION_HELD.observe(time.perf_counter() - checked_out_at)
+
 # Async session factory
 async_session = sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
 
 
+# ============================================
+# QUERY COUNTING (DB round trips per request)
+# ============================================
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+
+# Set by the metrics middleware; shared with the request task by reference
+query_counter: ContextVar[Optional[QueryCounter]] = ContextVar("query_counter", default=None)
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = query_counter.get()
+    if counter is not None:
+        counter.count += 1
+
+
 # ============================================
 # ENUMS
 # ============================================
@@ -309,9 +373,73 @@ class EmailQueue(Base):
     created_at = Column(TIMESTAMP, server_default=func.now(), index=True)
 
 
+class GenerationJob(Base):
+    __tablename__ = "generation_jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=func.gen_random_uuid())
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    service = Column(String(100), nullable=False)
+    status = Column(String(50), nullable=False, default='queued')
+    prompt = Column(Text)
+    context = Column(JSONB, server_default='{}')
+    callback_url = Column(Text)
+    generation_id = Column(UUID(as_uuid=True), ForeignKey("generations.id", ondelete="SET NULL"))
+    result = Column(JSONB)
+    error = Column(Text)
+    attempts = Column(Integer, default=0)
+    locked_at = Column(TIMESTAMP)
+    started_at = Column(TIMESTAMP)
+    finished_at = Column(TIMESTAMP)
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index('idx_generation_jobs_user', 'user_id', 'created_at'),
+        Index('idx_generation_jobs_claim', 'created_at', postgresql_where=(status == 'queued')),
+        Index('idx_generation_jobs_running', 'locked_at', postgresql_where=(status == 'running')),
+    )
+
+
+class BackfillCheckpoint(Base):
+    __tablename__ = "backfill_checkpoints"
+
+    name = Column(String(100), primary_key=True)
+    last_id = Column(UUID(as_uuid=True))
+    processed = Column(BigInteger, nullable=False, default=0)
+    updated = Column(BigInteger, nullable=False, default=0)
+    started_at = Column(TIMESTAMP, server_default=func.now())
+    finished_at = Column(TIMESTAMP)
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
+
+class EnrichmentCacheEntry(Base):
+    __tablename__ = "enrichment_cache"
+
+    key = Column(String(512), primary_key=True)
+    status = Column(String(10), nullable=False)  # hit, miss, error
+    fields = Column(JSONB, nullable=False, default=dict)
+    fetched_at = Column(TIMESTAMP, nullable=False, server_default=func.now())
+    expires_at = Column(TIMESTAMP, nullable=False)
+
+    __table_args__ = (
+        Index('idx_enrichment_cache_expires_at', 'expires_at'),
+    )
+
+
 # ============================================
 # DEPENDENCY INJECTION
 # ============================================
+async def release_connection(db: AsyncSession) -> None:
+    """
+    End the session's current transaction and hand its connection back to
+    the pool. Loaded objects stay usable (expire_on_commit=False) and the
+    session reconnects on its next query, so call this before slow upstream
+    I/O instead of holding a pooled connection across it.
+    """
+    if db.in_transaction():
+        await db.commit()
+
+
 async def get_db() -> AsyncSession:
     """
     Dependency for FastAPI routes
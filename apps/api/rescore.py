@@ -0,0 +1,185 @@
+"""
+KONQER Re-score - backfill Generation.personalization_score after scoring changes
+Resumable, chunked and throttled: python rescore.py [--restart] [--dry-run]
+
+Walks cold-dm generations in primary-key order (keyset pagination), scores
+each chunk in a process pool and writes changed scores back with one
+UPDATE ... FROM (VALUES ...) per chunk. The keyset position is checkpointed
+in backfill_checkpoints in the same transaction, so an interrupted run
+resumes where it stopped.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from sqlalchemy import Float, column, select, update, values
+from sqlalchemy.dialects.postgresql import UUID
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import math
+import signal
+import time
+import logging
+
+from models.database import engine, async_session, Generation, BackfillCheckpoint
+from services.personalization import score_batch
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_NAME = "personalization_score"
+
+generations = Generation.__table__
+
+Row = Tuple[Any, Optional[str], Optional[Dict[str, Any]], Optional[float]]
+
+
+def score_rows(rows: List[Row]) -> List[Tuple[Any, float, Optional[float]]]:
+    """
+    Score one slice of rows (runs in a worker process)
+    Returns (id, new score, current score) per row
+    """
+    scores = score_batch((output or "", context or {}) for _, output, context, _ in rows)
+    return [(row[0], scored.score, row[3]) for row, scored in zip(rows, scores)]
+
+
+async def load_checkpoint(restart: bool, dry_run: bool) -> BackfillCheckpoint:
+    async with async_session() as session:
+        checkpoint = await session.get(BackfillCheckpoint, CHECKPOINT_NAME)
+        if dry_run:
+            # Read-only: start from the checkpoint without touching it
+            if checkpoint is None or restart:
+                checkpoint = BackfillCheckpoint(name=CHECKPOINT_NAME, processed=0, updated=0)
+            return checkpoint
+        if checkpoint is None:
+            checkpoint = BackfillCheckpoint(name=CHECKPOINT_NAME)
+            session.add(checkpoint)
+            restart = True
+        if restart:
+            checkpoint.last_id = None
+            checkpoint.processed = 0
+            checkpoint.updated = 0
+            checkpoint.started_at = datetime.now()
+        checkpoint.finished_at = None
+        await session.commit()
+        return checkpoint
+
+
+async def fetch_chunk(last_id: Any, size: int) -> List[Row]:
+    query = (
+        select(
+            generations.c.id,
+            generations.c.output,
+            generations.c.metadata,
+            generations.c.personalization_score
+        )
+        .where(generations.c.service == "cold-dm")
+        .order_by(generations.c.id)
+        .limit(size)
+    )
+    if last_id is not None:
+        query = query.where(generations.c.id > last_id)
+
+    async with async_session() as session:
+        result = await session.execute(query)
+        return [tuple(row) for row in result.all()]
+
+
+async def write_chunk(changed: List[Tuple[Any, float]], last_id: Any, processed: int) -> int:
+    """
+    Apply changed scores and advance the checkpoint in one transaction
+    """
+    async with async_session() as session:
+        updated = 0
+        if changed:
+            scores = values(
+                column("id", UUID(as_uuid=True)),
+                column("score", Float),
+                name="scores"
+            ).data(changed)
+            result = await session.execute(
+                update(generations)
+                .where(generations.c.id == scores.c.id)
+                .values(personalization_score=scores.c.score)
+            )
+            updated = result.rowcount
+
+        checkpoint = await session.get(BackfillCheckpoint, CHECKPOINT_NAME)
+        checkpoint.last_id = last_id
+        checkpoint.processed += processed
+        checkpoint.updated += updated
+        await session.commit()
+        return updated
+
+
+async def mark_finished() -> None:
+    async with async_session() as session:
+        checkpoint = await session.get(BackfillCheckpoint, CHECKPOINT_NAME)
+        checkpoint.finished_at = datetime.now()
+        await session.commit()
+
+
+async def main(args: argparse.Namespace) -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    checkpoint = await load_checkpoint(args.restart, args.dry_run)
+    last_id = checkpoint.last_id
+    processed = checkpoint.processed
+    updated = 0 if args.dry_run else checkpoint.updated
+    logger.info(f"🚀 Re-scoring from {last_id or 'the beginning'} ({processed} already processed)")
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        while not stop.is_set():
+            chunk_started = time.monotonic()
+
+            rows = await fetch_chunk(last_id, args.chunk_size)
+            if not rows:
+                if not args.dry_run:
+                    await mark_finished()
+                logger.info(f"✅ Re-score complete: {processed} processed, {updated} updated")
+                break
+
+            slice_size = math.ceil(len(rows) / args.workers)
+            results = await asyncio.gather(*(
+                loop.run_in_executor(pool, score_rows, rows[start:start + slice_size])
+                for start in range(0, len(rows), slice_size)
+            ))
+            changed = [
+                (row_id, score)
+                for part in results
+                for row_id, score, current in part
+                if current != score
+            ]
+            last_id = rows[-1][0]
+            processed += len(rows)
+
+            if args.dry_run:
+                updated += len(changed)
+            else:
+                updated += await write_chunk(changed, last_id, len(rows))
+
+            logger.info(f"Processed {processed} generations, {updated} {'would change' if args.dry_run else 'updated'} (last id {last_id})")
+
+            # Throttle: cap throughput, then yield to production traffic
+            min_duration = len(rows) / args.max_rows_per_second
+            await asyncio.sleep(max(0.0, min_duration - (time.monotonic() - chunk_started)) + args.pause)
+        else:
+            logger.info(f"🛑 Stopped at {last_id}; rerun to resume")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-score historical personalization_score values")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Rows per keyset page and UPDATE")
+    parser.add_argument("--workers", type=int, default=2, help="Scoring processes")
+    parser.add_argument("--max-rows-per-second", type=float, default=500)
+    parser.add_argument("--pause", type=float, default=0.1, help="Extra seconds to sleep between chunks")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start over")
+    parser.add_argument("--dry-run", action="store_true", help="Count changes without writing")
+    asyncio.run(main(parser.parse_args()))
@@ -13,6 +13,9 @@ from models.database import (
     ServiceAccess, ServiceConfig, AuditLog
 )
 from routers.auth import get_current_user
+from services.config_cache import (
+    ServiceConfigCache, get_service_config_cache, notify_config_changed
+)
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -307,7 +310,8 @@ async def update_service_config(
     service: str,
     config_update: dict,
     db: AsyncSession = Depends(get_db),
-    current_admin: User = Depends(get_current_user)  # TODO: Check admin role
+    current_admin: User = Depends(get_current_user),  # TODO: Check admin role
+    config_cache: ServiceConfigCache = Depends(get_service_config_cache)
 ):
     """
     Update service configuration
@@ -340,8 +344,14 @@ async def update_service_config(
     )
     db.add(audit_log)
 
+    # Other pods reload their snapshot when the transaction commits
+    await notify_config_changed(db, service)
+
     await db.commit()
 
+    # Reload this pod's snapshot right away
+    await config_cache.load(trigger="update")
+
     logger.info(f"Admin {current_admin.id} updated config for {service}")
 
     return {"message": "Service config updated"}
@@ -3,13 +3,14 @@ Authentication router - Keycloak integration
 """
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
+from jose import JWTError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 import httpx
 import logging
 
 from models.database import get_db, User
+from services.jwt_cache import jwt_cache
 from config import settings
 
 router = APIRouter()
@@ -31,13 +32,9 @@ async def get_current_user(
     )
 
     try:
-        # Decode JWT (Keycloak public key)
-        payload = jwt.decode(
-            token,
-            settings.JWT_PUBLIC_KEY,
-            algorithms=[settings.JWT_ALGORITHM],
-            audience=settings.KEYCLOAK_CLIENT_ID
-        )
+        # Decode JWT (Keycloak public key); verified tokens are cached
+        # until they expire
+        payload = jwt_cache.decode(token)
 
         keycloak_user_id: str = payload.get("sub")
         if keycloak_user_id is None:
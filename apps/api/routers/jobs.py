@@ -0,0 +1,38 @@
+"""
+Jobs router - status of asynchronous generation jobs
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from uuid import UUID
+import logging
+
+from models.database import get_db, User, GenerationJob
+from routers.auth import get_current_user
+from services.job_worker import serialize_job
+from schemas.api import JobResponse
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: UUID,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Poll an asynchronous generation job
+    """
+    result = await db.execute(
+        select(GenerationJob)
+        .where(GenerationJob.id == job_id)
+        .where(GenerationJob.user_id == current_user.id)
+    )
+    job = result.scalar_one_or_none()
+
+    if not job:
+        raise HTTPException(404, "Job not found")
+
+    return serialize_job(job)
@@ -1,84 +1,92 @@
 """
 Services router - Generation endpoints for 12 services
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from datetime import datetime, timedelta
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+import asyncio
+import json
+import uuid
 import logging
 
-from models.database import get_db, User, ServiceAccess, Generation, ServiceConfig
+from models.database import get_db, release_connection, async_session, User, Generation, GenerationJob
 from routers.auth import get_current_user
-from services.openai_service import OpenAIService
-from schemas.api import GenerateRequest, GenerateResponse
+from services.openai_service import OpenAIService, DeadlineExceeded
+from services.circuit_breaker import CircuitOpenError
+from services.admission import AdmissionRejected
+from services.apollo_service import ApolloService
+from services.http_clients import get_openai_service, get_apollo_service
+from services.rate_limiter import RateLimiter, RateLimitResult, get_rate_limiter
+from services.entitlements import (
+    Entitlement, EntitlementResolver, get_entitlement, get_entitlement_resolver
+)
+from services.config_cache import ServiceConfigCache, get_service_config_cache
+from services.response_cache import ResponseCache, get_response_cache
+from services.generation import run_generation, prepare_context, prepare_contexts, score_generation
+from services.idempotency import IdempotencyStore, get_idempotency_store, run_idempotent
+from services.generation_writer import GenerationWriter, generation_row, get_generation_writer
+from services.events import track_event
+from services.token_budget import RequestTooLarge, check_input, record_actual
+from services.callback_urls import UnsafeCallbackURL, check_callback_url
+from schemas.api import (
+    GenerateRequest, GenerateResponse, BatchGenerateRequest,
+    PeopleSearchRequest, JobCreateRequest, JobCreatedResponse
+)
+from config import settings
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
-async def check_service_access(
-    user: User,
-    service: str,
-    db: AsyncSession
-) -> bool:
+def rate_limit_exceeded(rate_limit: RateLimitResult) -> HTTPException:
     """
-    Check if user has access to service
+    429 error for a rejected rate limit check
     """
-    result = await db.execute(
-        select(ServiceAccess)
-        .where(ServiceAccess.user_id == user.id)
-        .where(ServiceAccess.service == service)
-        .where(ServiceAccess.locked == False)
-    )
-    access = result.scalar_one_or_none()
-    return access is not None
+    if rate_limit.reason == "burst":
+        message = "Too many requests, please slow down"
+    elif rate_limit.reason == "monthly":
+        message = "Monthly rate limit exceeded"
+    else:
+        message = "Daily rate limit exceeded"
+    return HTTPException(429, message, headers=rate_limit.headers())
 
 
-async def check_rate_limit(
-    user: User,
-    service: str,
-    db: AsyncSession
-) -> bool:
+def upstream_unavailable(error: Exception) -> HTTPException:
     """
-    Check if user has exceeded daily rate limit
+    503 while the OpenAI circuit is open or LLM capacity is exhausted,
+    504 when the deadline ran out
     """
-    # Get service config
-    result = await db.execute(
-        select(ServiceConfig).where(ServiceConfig.service == service)
-    )
-    config = result.scalar_one_or_none()
-
-    if not config:
-        return True  # Service not found, allow
+    if isinstance(error, (CircuitOpenError, AdmissionRejected)):
+        return HTTPException(
+            503,
+            "Generation is temporarily unavailable, please retry shortly",
+            headers={"Retry-After": str(error.retry_after)}
+        )
+    return HTTPException(504, "Generation timed out")
 
-    daily_limit = config.rate_limit_daily
 
-    # Count today's generations
-    today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-
-    result = await db.execute(
-        select(func.count(Generation.id))
-        .where(Generation.user_id == user.id)
-        .where(Generation.service == service)
-        .where(Generation.created_at >= today_start)
+def request_too_large(error: RequestTooLarge) -> HTTPException:
+    """
+    413 for a prompt that exceeds its token budget
+    """
+    return HTTPException(
+        413,
+        f"Prompt and context are too long ({error.prompt_tokens} tokens, limit {error.limit})"
     )
-    count = result.scalar()
-
-    return count < daily_limit
 
 
 @router.get("/config/{service}")
 async def get_service_config(
     service: str,
-    db: AsyncSession = Depends(get_db)
+    config_cache: ServiceConfigCache = Depends(get_service_config_cache)
 ):
     """
     Get service configuration (public endpoint for frontend)
     """
-    result = await db.execute(
-        select(ServiceConfig).where(ServiceConfig.service == service)
-    )
-    config = result.scalar_one_or_none()
+    config = config_cache.get(service)
 
     if not config:
         raise HTTPException(404, "Service not found")
@@ -100,136 +108,576 @@ async def get_service_config(
 async def generate_service(
     service: str,
     request: GenerateRequest,
+    response: Response,
+    http_request: Request,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    openai_service: OpenAIService = Depends(get_openai_service),
+    apollo_service: ApolloService = Depends(get_apollo_service),
+    limiter: RateLimiter = Depends(get_rate_limiter),
+    entitlement: Entitlement = Depends(get_entitlement),
+    resolver: EntitlementResolver = Depends(get_entitlement_resolver),
+    response_cache: ResponseCache = Depends(get_response_cache),
+    idempotency_store: IdempotencyStore = Depends(get_idempotency_store),
+    generation_writer: Optional[GenerationWriter] = Depends(get_generation_writer),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
     """
     Generate content for a specific service
+
+    With an Idempotency-Key header, retries of a completed request replay
+    its response without consuming quota or calling OpenAI again.
     """
     # 1. Check service access
-    has_access = await check_service_access(current_user, service, db)
-    if not has_access:
+    if not entitlement.has_access:
         raise HTTPException(403, f"Access to {service} is locked. Upgrade your plan.")
 
-    # 2. Check rate limit
-    within_limit = await check_rate_limit(current_user, service, db)
-    if not within_limit:
-        raise HTTPException(429, "Daily rate limit exceeded")
+    # Reject oversized input before it costs quota or an upstream call
+    try:
+        check_input(request.prompt, request.context, entitlement.config)
+    except RequestTooLarge as e:
+        raise request_too_large(e)
+
+    # User and entitlement are loaded; don't hold a pooled connection
+    # across the OpenAI/Apollo round trip
+    await release_connection(db)
+
+    async def generate() -> Dict[str, Any]:
+        # 2. Check rate limit
+        rate_limit = await resolver.consume(entitlement)
+        if not rate_limit.allowed:
+            raise rate_limit_exceeded(rate_limit)
+
+        # 3. Generate based on service
+        try:
+            result = await run_generation(
+                service, request.prompt, request.context,
+                openai_service, apollo_service, response_cache, entitlement.config
+            )
+
+            output = result["output"]
+            tokens_used = result["tokens_used"]
+            personalization_score = result["personalization_score"]
+            personalization_factors = result["personalization_factors"]
+            context = result["context"]  # Enriched profile, saved with the row
+
+        except RequestTooLarge as e:
+            await limiter.refund(str(current_user.id), service)
+            raise request_too_large(e)
+        except (CircuitOpenError, AdmissionRejected, DeadlineExceeded) as e:
+            logger.warning(f"Generation unavailable for {service}: {e}")
+            await limiter.refund(str(current_user.id), service)
+            raise upstream_unavailable(e)
+        except Exception as e:
+            logger.error(f"Generation failed for {service}: {e}")
+            await limiter.refund(str(current_user.id), service)
+            raise HTTPException(500, f"Generation failed: {str(e)}")
+
+        response.headers.update(rate_limit.headers())
+
+        # 4. Save generation
+        row = generation_row(
+            current_user.id, service, request.prompt, output,
+            tokens_used, personalization_score, context
+        )
+        if generation_writer:
+            await generation_writer.add(row)
+        else:
+            await db.execute(insert(Generation), [row])
+            await db.commit()
+
+        track_event("generation", current_user.id, service, {"generation_id": str(row["id"])}, http_request)
+
+        return {
+            "id": str(row["id"]),
+            "service": service,
+            "output": output,
+            "personalization_score": personalization_score,
+            "personalization_factors": personalization_factors,
+            "tokens_used": tokens_used,
+            "created_at": row["created_at"]
+        }
+
+    return await run_idempotent(
+        idempotency_store,
+        idempotency_key,
+        scope=f"{current_user.id}:generate:{service}",
+        payload=request,
+        fn=generate,
+        response=response
+    )
 
-    # 3. Generate based on service
-    openai_service = OpenAIService()
-    personalization_score = None
+
+@router.post("/{service}/generate/stream")
+async def generate_service_stream(
+    service: str,
+    request: GenerateRequest,
+    http_request: Request,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    openai_service: OpenAIService = Depends(get_openai_service),
+    apollo_service: ApolloService = Depends(get_apollo_service),
+    limiter: RateLimiter = Depends(get_rate_limiter),
+    entitlement: Entitlement = Depends(get_entitlement),
+    resolver: EntitlementResolver = Depends(get_entitlement_resolver),
+    response_cache: ResponseCache = Depends(get_response_cache),
+    generation_writer: Optional[GenerationWriter] = Depends(get_generation_writer)
+):
+    """
+    Generate content for a specific service as Server-Sent Events
+
+    Emits `token` events as the model produces output, then a single
+    `done` event carrying the same payload as /generate once the
+    generation has been saved. Failures after the stream has started
+    are reported as an `error` event. The generation is refunded unless
+    it was saved, including when the client disconnects early.
+    """
+    # 1. Check service access
+    if not entitlement.has_access:
+        raise HTTPException(403, f"Access to {service} is locked. Upgrade your plan.")
 
     try:
-        if service == "cold-dm":
-            # Import Apollo service
-            from services.apollo_service import ApolloService
-            apollo_service = ApolloService()
+        check_input(request.prompt, request.context, entitlement.config)
+    except RequestTooLarge as e:
+        raise request_too_large(e)
 
-            # Enrich context with Apollo
-            enriched_context = await apollo_service.enrich_profile(request.context)
+    # 2. Check rate limit
+    rate_limit = await resolver.consume(entitlement)
+    if not rate_limit.allowed:
+        raise rate_limit_exceeded(rate_limit)
+
+    # The request session lives until the stream ends; release its
+    # connection before enrichment and streaming
+    await release_connection(db)
+
+    # Fail fast while OpenAI is degraded instead of opening a stream
+    retry_after = openai_service.breaker.retry_after()
+    if retry_after is not None:
+        await limiter.refund(str(current_user.id), service)
+        raise upstream_unavailable(CircuitOpenError(openai_service.breaker.name, retry_after))
+    if openai_service.admission is not None and openai_service.admission.saturated():
+        await limiter.refund(str(current_user.id), service)
+        raise upstream_unavailable(AdmissionRejected("queue full", retry_after=1))
+
+    # 3. Build the upstream request before the stream starts, so
+    # enrichment and prompt errors still surface as a plain HTTP error
+    try:
+        context, enriched = await prepare_context(service, request.context, apollo_service, entitlement.config)
+        openai_request = openai_service.build_request(service, request.prompt, context, entitlement.config)
+    except RequestTooLarge as e:
+        await limiter.refund(str(current_user.id), service)
+        raise request_too_large(e)
+    except Exception as e:
+        logger.error(f"Generation failed for {service}: {e}")
+        await limiter.refund(str(current_user.id), service)
+        raise HTTPException(500, f"Generation failed: {str(e)}")
 
-            result = await openai_service.generate_cold_dm(enriched_context)
+    user_id = current_user.id
+    cache_ttl = response_cache.ttl_for(entitlement.config)
+    cache_key = openai_service.fingerprint(service, openai_request) if cache_ttl else None
+
+    async def refund() -> None:
+        # Shielded so a disconnect mid-refund still gives the quota back
+        await asyncio.shield(asyncio.ensure_future(limiter.refund(str(user_id), service)))
+
+    async def event_stream() -> AsyncIterator[str]:
+        chunks = []
+        usage: Dict[str, int] = {}
+        tokens_used = None
+        settled = False  # Generation saved or refunded
+
+        try:
+            try:
+                cached = cache_key and await response_cache.get(cache_key, service)
+                if cached:
+                    # Replay the cached output as a single token event
+                    chunks.append(cached["output"])
+                    tokens_used = 0
+                    yield format_sse("token", {"delta": cached["output"]})
+                else:
+                    deadline = openai_service.deadline_for(service, entitlement.config)
+                    async for delta in openai_service.stream(openai_request, deadline, usage):
+                        chunks.append(delta)
+                        yield format_sse("token", {"delta": delta})
+                    tokens_used = usage.get("total_tokens")
+                    record_actual(service, openai_request, usage.get("prompt_tokens"))
+            except Exception as e:
+                logger.error(f"Streaming generation failed for {service}: {e}")
+                settled = True
+                await refund()
+                error = {"message": f"Generation failed: {str(e)}"}
+                if isinstance(e, (CircuitOpenError, AdmissionRejected)):
+                    error["retry_after"] = e.retry_after
+                yield format_sse("error", error)
+                return
+
+            try:
+                output = "".join(chunks)
+                if cache_key and not cached:
+                    await response_cache.set(
+                        cache_key,
+                        {"output": output, "tokens_used": tokens_used, "model": openai_service.model},
+                        cache_ttl
+                    )
+
+                personalization_score, personalization_factors = score_generation(
+                    service, output, context, enriched
+                )
+
+                # 4. Save generation (the request session may already be closed
+                # once the response has started, so use a dedicated one)
+                row = generation_row(
+                    user_id, service, request.prompt, output,
+                    tokens_used, personalization_score, context
+                )
+                if generation_writer:
+                    await generation_writer.add(row)
+                else:
+                    async with async_session() as session:
+                        await session.execute(insert(Generation), [row])
+                        await session.commit()
+                settled = True
+            except Exception as e:
+                logger.error(f"Saving streamed generation failed for {service}: {e}")
+                settled = True
+                await refund()
+                yield format_sse("error", {"message": "Generation could not be saved"})
+                return
+
+            track_event("generation", user_id, service, {"generation_id": str(row["id"]), "stream": True}, http_request)
+
+            yield format_sse("done", {
+                "id": str(row["id"]),
+                "service": service,
+                "personalization_score": personalization_score,
+                "personalization_factors": personalization_factors,
+                "tokens_used": tokens_used,
+                "created_at": row["created_at"].isoformat()
+            })
+        finally:
+            # Client disconnected (or the stream was cancelled) before the
+            # generation was saved: don't charge for it
+            if not settled:
+                await refund()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # Disable ingress (nginx) response buffering
+            **rate_limit.headers()
+        }
+    )
 
-            # Calculate personalization score
-            personalization_score = calculate_personalization_score(
-                result["message"], enriched_context
-            )
 
-            output = result["message"]
-            tokens_used = result["tokens_used"]
+@router.post("/{service}/generate/batch")
+async def generate_service_batch(
+    service: str,
+    request: BatchGenerateRequest,
+    http_request: Request,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    openai_service: OpenAIService = Depends(get_openai_service),
+    apollo_service: ApolloService = Depends(get_apollo_service),
+    limiter: RateLimiter = Depends(get_rate_limiter),
+    entitlement: Entitlement = Depends(get_entitlement),
+    resolver: EntitlementResolver = Depends(get_entitlement_resolver),
+    response_cache: ResponseCache = Depends(get_response_cache)
+):
+    """
+    Generate content for a list of contexts (e.g. a lead list) in one call
 
-        elif service == "objection":
-            result = await openai_service.generate_objection_response(
-                objection=request.prompt,
-                context=request.context,
-                framework=request.context.get("framework", "Cost vs Value")
-            )
-            output = result["response"]
-            tokens_used = result["tokens_used"]
+    Access and quota are checked once for the whole batch, and the
+    contexts are enriched together (Apollo bulk match). Items then run
+    concurrently (BATCH_CONCURRENCY at a time) and each result is streamed
+    back as one NDJSON line as soon as it finishes, in completion order:
 
-        elif service == "carousel":
-            result = await openai_service.generate_carousel(
-                topic=request.prompt,
-                target_audience=request.context.get("target_audience", "B2B professionals")
-            )
-            output = result["carousel_structure"]
-            tokens_used = result["tokens_used"]
+        {"index": 3, "status": "ok", "id": "...", "output": "...", ...}
+        {"index": 0, "status": "error", "error": "..."}
 
-        else:
-            # Generic generation for other services
-            result = await openai_service.generate_generic(
-                service=service,
-                prompt=request.prompt,
-                system_prompt=request.context.get("system_prompt")
+    Generation rows are bulk-inserted in chunks of BATCH_INSERT_CHUNK, and
+    a final {"done": true, ...} line summarizes the batch.
+    """
+    if len(request.contexts) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(422, f"A batch can contain at most {settings.BATCH_MAX_ITEMS} items")
+
+    # 1. Check service access
+    if not entitlement.has_access:
+        raise HTTPException(403, f"Access to {service} is locked. Upgrade your plan.")
+
+    try:
+        for context in request.contexts:
+            check_input(request.prompt, context, entitlement.config)
+    except RequestTooLarge as e:
+        raise request_too_large(e)
+
+    # 2. Check rate limit (the whole batch must fit in the remaining quota)
+    rate_limit = await resolver.consume(entitlement, cost=len(request.contexts))
+    if not rate_limit.allowed:
+        raise rate_limit_exceeded(rate_limit)
+
+    # The request session lives until the stream ends; release its
+    # connection before the batch starts
+    await release_connection(db)
+
+    user_id = current_user.id
+    semaphore = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+
+    async def generate_item(index: int, context: Dict[str, Any]) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                result = await run_generation(
+                    service, request.prompt, context,
+                    openai_service, apollo_service, response_cache, entitlement.config,
+                    prepared=True
+                )
+            except Exception as e:
+                logger.error(f"Batch generation item {index} failed for {service}: {e}")
+                return {"index": index, "status": "error", "error": f"Generation failed: {str(e)}"}
+
+        # IDs and timestamps are assigned here so results can be streamed
+        # before their chunk is inserted
+        return {
+            "index": index,
+            "status": "ok",
+            "id": uuid.uuid4(),
+            "output": result["output"],
+            "personalization_score": result["personalization_score"],
+            "personalization_factors": result["personalization_factors"],
+            "tokens_used": result["tokens_used"],
+            "created_at": datetime.now(),
+            "context": result["context"]
+        }
+
+    async def save(rows: List[Dict[str, Any]]) -> bool:
+        try:
+            async with async_session() as session:
+                await session.execute(insert(Generation), [
+                    {
+                        "id": row["id"],
+                        "user_id": user_id,
+                        "service": service,
+                        "prompt": request.prompt,
+                        "output": row["output"],
+                        "tokens_used": row["tokens_used"],
+                        "personalization_score": row["personalization_score"],
+                        "metadata": row["context"],
+                        "created_at": row["created_at"]
+                    }
+                    for row in rows
+                ])
+                await session.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Batch insert of {len(rows)} generations failed for {service}: {e}")
+            return False
+
+    async def settle(rows: List[Dict[str, Any]], unpaid: int) -> bool:
+        saved = await save(rows) if rows else True
+        if unpaid:
+            await limiter.refund(str(user_id), service, cost=unpaid)
+        return saved
+
+    async def ndjson_stream() -> AsyncIterator[str]:
+        tasks: List[asyncio.Task] = []
+        pending_rows: List[Dict[str, Any]] = []
+        streamed = set()
+        succeeded = 0
+        saved = True
+
+        try:
+            # Enrich the whole list up front (batched Apollo calls) instead
+            # of one lookup per item
+            contexts = await prepare_contexts(
+                service, [dict(context) for context in request.contexts], apollo_service
             )
-            output = result["output"]
-            tokens_used = result["tokens_used"]
+            tasks = [
+                asyncio.create_task(generate_item(index, context))
+                for index, context in enumerate(contexts)
+            ]
+
+            for next_done in asyncio.as_completed(tasks):
+                item = await next_done
+                streamed.add(item["index"])
+
+                if item["status"] == "ok":
+                    succeeded += 1
+                    pending_rows.append(item)
+                    if len(pending_rows) >= settings.BATCH_INSERT_CHUNK:
+                        saved = await save(pending_rows) and saved
+                        pending_rows = []
+                    item = {
+                        "index": item["index"],
+                        "status": "ok",
+                        "id": str(item["id"]),
+                        "output": item["output"],
+                        "personalization_score": item["personalization_score"],
+                        "personalization_factors": item["personalization_factors"],
+                        "tokens_used": item["tokens_used"],
+                        "created_at": item["created_at"].isoformat()
+                    }
+
+                yield json.dumps(item) + "\n"
+        finally:
+            # Also runs when the client disconnects mid-batch: items that
+            # already finished are saved, everything else is refunded
+            for task in tasks:
+                task.cancel()
+            for task in tasks:
+                if task.done() and not task.cancelled():
+                    item = task.result()
+                    if item["status"] == "ok" and item["index"] not in streamed:
+                        succeeded += 1
+                        pending_rows.append(item)
+
+            settling = asyncio.ensure_future(settle(pending_rows, len(request.contexts) - succeeded))
+            saved = await asyncio.shield(settling) and saved
+
+        failed = len(request.contexts) - succeeded
+
+        track_event("generation", user_id, service, {"batch": True, "succeeded": succeeded, "failed": failed}, http_request)
+
+        yield json.dumps({
+            "done": True,
+            "succeeded": succeeded,
+            "failed": failed,
+            "saved": saved
+        }) + "\n"
+
+    return StreamingResponse(
+        ndjson_stream(),
+        media_type="application/x-ndjson",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            **rate_limit.headers()
+        }
+    )
 
-    except Exception as e:
-        logger.error(f"Generation failed for {service}: {e}")
-        raise HTTPException(500, f"Generation failed: {str(e)}")
 
-    # 4. Save generation
-    generation = Generation(
+@router.post("/{service}/search/stream")
+async def search_people_stream(
+    service: str,
+    request: PeopleSearchRequest,
+    http_request: Request,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    apollo_service: ApolloService = Depends(get_apollo_service),
+    entitlement: Entitlement = Depends(get_entitlement),
+    resolver: EntitlementResolver = Depends(get_entitlement_resolver)
+):
+    """
+    Stream Apollo people search results as NDJSON (e.g. community finder)
+
+    Pages are prefetched and each person is written as soon as its page
+    arrives, so large searches are never held in memory:
+
+        {"person": {...}}
+        {"done": true, "count": 2500}
+
+    A failure mid-stream ends it with {"error": "..."}.
+    """
+    max_results = min(request.max_results or settings.APOLLO_SEARCH_MAX_RESULTS, settings.APOLLO_SEARCH_MAX_RESULTS)
+
+    # 1. Check service access
+    if not entitlement.has_access:
+        raise HTTPException(403, f"Access to {service} is locked. Upgrade your plan.")
+
+    # 2. Check rate limit (one search = one request)
+    rate_limit = await resolver.consume(entitlement)
+    if not rate_limit.allowed:
+        raise rate_limit_exceeded(rate_limit)
+
+    # The request session lives until the stream ends
+    await release_connection(db)
+
+    user_id = current_user.id
+
+    async def ndjson_stream() -> AsyncIterator[str]:
+        count = 0
+        try:
+            async for person in apollo_service.iter_people(request.query, max_results=max_results):
+                count += 1
+                yield json.dumps({"person": person}) + "\n"
+        except Exception as e:
+            logger.error(f"People search failed after {count} results: {e}")
+            yield json.dumps({"error": "Search failed", "count": count}) + "\n"
+            return
+
+        track_event("search", user_id, service, {"count": count}, http_request)
+
+        yield json.dumps({"done": True, "count": count}) + "\n"
+
+    return StreamingResponse(
+        ndjson_stream(),
+        media_type="application/x-ndjson",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            **rate_limit.headers()
+        }
+    )
+
+
+@router.post("/{service}/jobs", response_model=JobCreatedResponse, status_code=202)
+async def create_generation_job(
+    service: str,
+    request: JobCreateRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    entitlement: Entitlement = Depends(get_entitlement),
+    resolver: EntitlementResolver = Depends(get_entitlement_resolver)
+):
+    """
+    Queue a generation and return immediately
+
+    Poll GET /jobs/{id} for the result, or pass callback_url to have the
+    finished job POSTed to it (public hosts only).
+    """
+    if request.callback_url:
+        try:
+            await check_callback_url(str(request.callback_url))
+        except UnsafeCallbackURL as e:
+            raise HTTPException(422, str(e))
+
+    # 1. Check service access
+    if not entitlement.has_access:
+        raise HTTPException(403, f"Access to {service} is locked. Upgrade your plan.")
+
+    try:
+        check_input(request.prompt, request.context, entitlement.config)
+    except RequestTooLarge as e:
+        raise request_too_large(e)
+
+    # 2. Check rate limit (refunded by the worker if the job fails)
+    rate_limit = await resolver.consume(entitlement)
+    if not rate_limit.allowed:
+        raise rate_limit_exceeded(rate_limit)
+
+    # 3. Queue job
+    job = GenerationJob(
         user_id=current_user.id,
         service=service,
+        status='queued',
         prompt=request.prompt,
-        output=output,
-        tokens_used=tokens_used,
-        personalization_score=personalization_score,
-        metadata=request.context
+        context=request.context,
+        callback_url=str(request.callback_url) if request.callback_url else None
     )
-    db.add(generation)
+    db.add(job)
     await db.commit()
-    await db.refresh(generation)
+    await db.refresh(job)
 
     return {
-        "id": str(generation.id),
+        "id": str(job.id),
         "service": service,
-        "output": output,
-        "personalization_score": personalization_score,
-        "tokens_used": tokens_used,
-        "created_at": generation.created_at
+        "status": job.status,
+        "poll_url": f"/jobs/{job.id}"
     }
 
 
-def calculate_personalization_score(message: str, context: dict) -> float:
+def format_sse(event: str, data: Dict[str, Any]) -> str:
     """
-    Calculate personalization score (0-100)
+    Format a Server-Sent Events message
     """
-    score = 0.0
-
-    # Name mentioned
-    name = context.get("name", "")
-    if name and name.split()[0].lower() in message.lower():
-        score += 20
-
-    # Company mentioned
-    company = context.get("company", "")
-    if company and company.lower() in message.lower():
-        score += 15
-
-    # Activity referenced
-    for activity in context.get("recent_activity", []):
-        keywords = activity.get("summary", "").lower().split()[:5]
-        if any(kw in message.lower() for kw in keywords):
-            score += 30
-            break
-
-    # Tech stack mentioned
-    if any(tech.lower() in message.lower() for tech in context.get("tech_stack", [])):
-        score += 20
-
-    # Penalize generic phrases
-    generic_phrases = [
-        "i hope this message finds you well",
-        "i came across your profile",
-        "quick question",
-        "touching base"
-    ]
-    for phrase in generic_phrases:
-        if phrase in message.lower():
-            score -= 10
-
-    return max(0, min(100, score))
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
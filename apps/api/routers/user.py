@@ -1,14 +1,19 @@
 """
 User router - Profile, subscriptions, history
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from typing import List
+from typing import List, Optional
+import asyncio
 import logging
 
 from models.database import get_db, User, Subscription, ServiceAccess, Generation
 from routers.auth import get_current_user
+from services.rate_limiter import RateLimiter, get_rate_limiter
+from services.config_cache import ServiceConfigCache, get_service_config_cache
+from services.idempotency import IdempotencyStore, get_idempotency_store, run_idempotent
+from services.events import track_event
 from schemas.api import (
     UserProfile, UserSubscriptionResponse,
     ServiceAccessResponse, GenerationHistory
@@ -63,10 +68,12 @@ async def get_user_subscriptions(
 @router.get("/services", response_model=List[ServiceAccessResponse])
 async def get_user_services(
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    limiter: RateLimiter = Depends(get_rate_limiter),
+    config_cache: ServiceConfigCache = Depends(get_service_config_cache)
 ):
     """
-    Get list of services accessible to user
+    Get list of services accessible to user, with remaining quota
     """
     result = await db.execute(
         select(ServiceAccess)
@@ -76,12 +83,21 @@ async def get_user_services(
     )
     access_list = result.scalars().all()
 
+    usages = await asyncio.gather(*[
+        limiter.usage(str(current_user.id), access.service, *config_cache.limits(access.service))
+        for access in access_list
+    ])
+
     return [
         {
             "service": access.service,
-            "unlocked_at": access.unlocked_at
+            "unlocked_at": access.unlocked_at,
+            "daily_limit": usage.limit,
+            "daily_remaining": usage.remaining,
+            "monthly_limit": usage.monthly_limit,
+            "monthly_remaining": usage.monthly_remaining
         }
-        for access in access_list
+        for access, usage in zip(access_list, usages)
     ]
 
 
@@ -127,28 +143,47 @@ async def get_user_history(
 @router.post("/checkout")
 async def create_checkout_session(
     plan: str,
+    response: Response,
+    http_request: Request,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    idempotency_store: IdempotencyStore = Depends(get_idempotency_store),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
     """
     Create Stripe checkout session
+
+    With an Idempotency-Key header, retries return the session created by
+    the first request instead of opening a new one.
     """
     from services.stripe_service import StripeService
 
     stripe_service = StripeService()
 
-    try:
-        session = await stripe_service.create_checkout_session(
-            user_id=str(current_user.id),
-            email=current_user.email,
-            plan=plan
-        )
+    async def create_session():
+        try:
+            session = await stripe_service.create_checkout_session(
+                user_id=str(current_user.id),
+                email=current_user.email,
+                plan=plan,
+                idempotency_key=idempotency_key
+            )
 
+        except Exception as e:
+            logger.error(f"Checkout creation failed: {e}")
+            raise HTTPException(500, "Failed to create checkout session")
+
+        track_event("checkout", current_user.id, metadata={"plan": plan}, request=http_request)
         return session
 
-    except Exception as e:
-        logger.error(f"Checkout creation failed: {e}")
-        raise HTTPException(500, "Failed to create checkout session")
+    return await run_idempotent(
+        idempotency_store,
+        idempotency_key,
+        scope=f"{current_user.id}:checkout",
+        payload={"plan": plan},
+        fn=create_session,
+        response=response
+    )
 
 
 @router.post("/portal")
@@ -1,7 +1,7 @@
 """
 Pydantic schemas for API validation
 """
-from pydantic import BaseModel, EmailStr, Field, field_validator
+from pydantic import BaseModel, EmailStr, Field, HttpUrl, field_validator
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 from uuid import UUID
@@ -32,6 +32,10 @@ class UserSubscriptionResponse(BaseModel):
 class ServiceAccessResponse(BaseModel):
     service: str
     unlocked_at: datetime
+    daily_limit: Optional[int] = None
+    daily_remaining: Optional[int] = None
+    monthly_limit: Optional[int] = None
+    monthly_remaining: Optional[int] = None
 
     class Config:
         from_attributes = True
@@ -50,11 +54,51 @@ class GenerateRequest(BaseModel):
         return v.strip()
 
 
+class BatchGenerateRequest(BaseModel):
+    prompt: str = Field(..., min_length=10, max_length=5000, description="User prompt shared by all items")
+    contexts: List[Dict[str, Any]] = Field(..., min_length=1, description="One context per item (e.g. per prospect)")
+
+    @field_validator('prompt')
+    @classmethod
+    def prompt_not_empty(cls, v: str) -> str:
+        if not v.strip():
+            raise ValueError('Prompt cannot be empty')
+        return v.strip()
+
+
+class PeopleSearchRequest(BaseModel):
+    query: Dict[str, Any] = Field(..., description="Apollo mixed_people/search filters")
+    max_results: Optional[int] = Field(None, ge=1, description="Stop after this many people")
+
+
+class JobCreateRequest(GenerateRequest):
+    callback_url: Optional[HttpUrl] = Field(None, description="Public HTTPS URL notified when the job finishes")
+
+
+class JobCreatedResponse(BaseModel):
+    id: str
+    service: str
+    status: str
+    poll_url: str
+
+
+class JobResponse(BaseModel):
+    id: str
+    service: str
+    status: str
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
 class GenerateResponse(BaseModel):
     id: str
     service: str
     output: str
     personalization_score: Optional[float] = None
+    personalization_factors: Optional[Dict[str, float]] = None
     tokens_used: Optional[int] = None
     created_at: datetime
 
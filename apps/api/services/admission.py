@@ -0,0 +1,233 @@
+"""
+LLM Admission Control - cluster-wide requests/tokens-per-minute governor
+Redis-backed (atomic Lua token buckets shared by every pod) with an
+in-process fallback
+
+Callers ask for one request and an estimated token cost before each
+OpenAI call. When the buckets are empty they wait in a bounded, FIFO
+per-pod queue; once the queue is full, or the wait would exceed
+LLM_ADMISSION_MAX_WAIT, the call is shed with AdmissionRejected (503)
+instead of piling up behind provider 429s.
+"""
+from fastapi import Request
+from prometheus_client import Counter, Gauge, Histogram
+from typing import Dict, Optional, Tuple
+import asyncio
+import math
+import time
+import logging
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Prometheus metrics
+LLM_ADMISSION_DECISIONS = Counter(
+    'konqer_api_llm_admission_total',
+    'LLM admission decisions (admitted, queued, rejected_queue_full, rejected_wait)',
+    ['result']
+)
+LLM_ADMISSION_WAIT = Histogram(
+    'konqer_api_llm_admission_wait_seconds',
+    'Time calls spent queued for LLM admission (admitted or shed)',
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+LLM_ADMISSION_QUEUE = Gauge(
+    'konqer_api_llm_admission_queue_depth',
+    'Calls waiting for LLM admission in this process'
+)
+
+ADMISSION_KEY = "llm-admission"
+
+# KEYS[1] = bucket hash (req, tok, ts)
+# ARGV = rpm, tpm, tokens, now (ms)
+# Both buckets refill continuously to their per-minute capacity.
+# Returns 0 when admitted, otherwise milliseconds until the call would fit
+ADMIT_SCRIPT = """
+local rpm = tonumber(ARGV[1])
+local tpm = tonumber(ARGV[2])
+local tokens = math.min(tonumber(ARGV[3]), tpm)
+local now = tonumber(ARGV[4])
+
+local state = redis.call('HMGET', KEYS[1], 'req', 'tok', 'ts')
+local req = tonumber(state[1]) or rpm
+local tok = tonumber(state[2]) or tpm
+local ts = tonumber(state[3]) or now
+local elapsed = math.max(0, now - ts)
+
+req = math.min(rpm, req + elapsed * rpm / 60000)
+tok = math.min(tpm, tok + elapsed * tpm / 60000)
+
+local wait = 0
+if req < 1 then
+  wait = math.max(wait, (1 - req) * 60000 / rpm)
+end
+if tok < tokens then
+  wait = math.max(wait, (tokens - tok) * 60000 / tpm)
+end
+
+if wait == 0 then
+  req = req - 1
+  tok = tok - tokens
+end
+
+redis.call('HSET', KEYS[1], 'req', req, 'tok', tok, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], 120000)
+return math.ceil(wait)
+"""
+
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a call is shed instead of queued
+    """
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"LLM capacity exhausted ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class MemoryBackend:
+    """
+    In-process admission buckets, used when Redis is missing or failing
+    admit() mirrors ADMIT_SCRIPT: it takes one request and the call's
+    estimated tokens from the RPM/TPM buckets, or returns how many ms to
+    wait before asking again (AdmissionController then queues or sheds
+    the call). The budget is per pod instead of cluster-wide, so while
+    it is in use the pods together can admit more than LLM_RPM_LIMIT /
+    LLM_TPM_LIMIT.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}
+
+    async def admit(self, key: str, rpm: int, tpm: int, tokens: int) -> int:
+        tokens = min(tokens, tpm)
+        now = time.monotonic() * 1000
+        req, tok, ts = self._buckets.get(key, (rpm, tpm, now))
+        elapsed = max(0.0, now - ts)
+
+        req = min(rpm, req + elapsed * rpm / 60000)
+        tok = min(tpm, tok + elapsed * tpm / 60000)
+
+        wait = 0.0
+        if req < 1:
+            wait = max(wait, (1 - req) * 60000 / rpm)
+        if tok < tokens:
+            wait = max(wait, (tokens - tok) * 60000 / tpm)
+
+        if wait == 0:
+            req -= 1
+            tok -= tokens
+
+        self._buckets[key] = (req, tok, now)
+        return math.ceil(wait)
+
+
+class AdmissionController:
+    """
+    Shared RPM/TPM governor in front of OpenAIService
+
+    `redis_client` is any redis.asyncio-compatible client. Without one,
+    or when Redis errors, the in-process backend is used.
+    """
+
+    def __init__(
+        self,
+        redis_client=None,
+        rpm: int = settings.LLM_RPM_LIMIT,
+        tpm: int = settings.LLM_TPM_LIMIT,
+        queue_size: int = settings.LLM_ADMISSION_QUEUE_SIZE,
+        max_wait: float = settings.LLM_ADMISSION_MAX_WAIT
+    ):
+        self.redis = redis_client
+        self.memory = MemoryBackend()
+        self.rpm = rpm
+        self.tpm = tpm
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self._waiting = 0
+        # Only the head of the local queue polls the shared buckets
+        self._lock = asyncio.Lock()
+
+        if self.redis is not None:
+            self._admit_script = self.redis.register_script(ADMIT_SCRIPT)
+
+    def saturated(self) -> bool:
+        """
+        True when new calls would be shed immediately
+        """
+        return self._waiting >= self.queue_size
+
+    async def acquire(self, tokens: int, max_wait: Optional[float] = None) -> None:
+        """
+        Wait until one request and `tokens` tokens fit the shared budget
+
+        Raises AdmissionRejected when the local queue is full or the
+        budget would not free up within `max_wait` seconds.
+        """
+        if self.saturated():
+            LLM_ADMISSION_DECISIONS.labels(result="rejected_queue_full").inc()
+            raise AdmissionRejected("queue full", retry_after=1)
+
+        max_wait = min(self.max_wait, max_wait if max_wait is not None else self.max_wait)
+        started = time.monotonic()
+        self._waiting += 1
+        LLM_ADMISSION_QUEUE.set(self._waiting)
+
+        queued = self._lock.locked()
+        try:
+            # Waiting behind the head of the queue spends the same budget
+            if queued:
+                try:
+                    await asyncio.wait_for(self._lock.acquire(), max(0.0, max_wait - (time.monotonic() - started)))
+                except asyncio.TimeoutError:
+                    LLM_ADMISSION_DECISIONS.labels(result="rejected_wait").inc()
+                    raise AdmissionRejected("rate limited", retry_after=1)
+            else:
+                await self._lock.acquire()
+
+            try:
+                while True:
+                    wait = await self._admit(tokens) / 1000
+                    if wait == 0:
+                        break
+
+                    waited = time.monotonic() - started
+                    if waited + wait > max_wait:
+                        LLM_ADMISSION_DECISIONS.labels(result="rejected_wait").inc()
+                        raise AdmissionRejected("rate limited", retry_after=max(1, math.ceil(wait)))
+
+                    queued = True
+                    await asyncio.sleep(wait)
+            finally:
+                self._lock.release()
+        finally:
+            self._waiting -= 1
+            LLM_ADMISSION_QUEUE.set(self._waiting)
+            LLM_ADMISSION_WAIT.observe(time.monotonic() - started)
+
+        LLM_ADMISSION_DECISIONS.labels(result="queued" if queued else "admitted").inc()
+
+    async def _admit(self, tokens: int) -> int:
+        try:
+            if self.redis is None:
+                raise ConnectionError("Redis not configured")
+            return int(await self._admit_script(
+                keys=[ADMISSION_KEY],
+                args=[self.rpm, self.tpm, tokens, int(time.time() * 1000)]
+            ))
+        except Exception as e:
+            if self.redis is not None:
+                logger.warning(f"LLM admission falling back to in-process buckets: {e}")
+            return await self.memory.admit(ADMISSION_KEY, self.rpm, self.tpm, tokens)
+
+
+# ============================================
+# DEPENDENCY INJECTION
+# ============================================
+def get_admission_controller(request: Request) -> AdmissionController:
+    """
+    Dependency: shared LLM admission controller
+    """
+    return request.app.state.admission_controller
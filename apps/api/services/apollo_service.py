@@ -1,18 +1,52 @@
 """
 Apollo.io Service - Contact enrichment
 """
+import asyncio
 import httpx
-from typing import Dict, Any, Optional
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Deque, List, Optional, AsyncIterator, Tuple
 from config import settings
+from services.enrichment_cache import (
+    EnrichmentCache, CachedEnrichment, enrichment_cache, enrichment_key, HIT, MISS, ERROR
+)
+from services.singleflight import enrichment_flight
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+class ApolloError(Exception):
+    """
+    Apollo answered with an error status
+    """
+    def __init__(self, status_code: int):
+        super().__init__(f"Apollo API error: {status_code}")
+        self.status_code = status_code
+
+
 class ApolloService:
-    def __init__(self):
+    def __init__(
+        self,
+        client: Optional[httpx.AsyncClient] = None,
+        cache: Optional[EnrichmentCache] = enrichment_cache
+    ):
         self.api_key = settings.APOLLO_API_KEY
         self.base_url = settings.APOLLO_BASE_URL
+        self.client = client
+        self.cache = cache
+
+    @asynccontextmanager
+    async def _get_client(self, timeout: float) -> AsyncIterator[httpx.AsyncClient]:
+        """
+        Yield the shared client, or a short-lived one when none was injected
+        """
+        if self.client is not None:
+            yield self.client
+        else:
+            async with httpx.AsyncClient(timeout=timeout) as client:
+                yield client
 
     async def enrich_profile(self, context: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -33,49 +67,161 @@ class ApolloService:
             - tech_stack
             - title (verified)
             - etc.
+
+        Results (including misses and errors) are cached per prospect;
+        concurrent enrichments of the same prospect share one Apollo call.
         """
         # If no Apollo API key, return original context
         if not self.api_key:
             logger.warning("Apollo API key not configured, returning original context")
             return context
 
+        key = enrichment_key(context)
+        if key is None:
+            return context
+
+        cached = await self.cache.get(key) if self.cache is not None else None
+        if cached is not None and cached.is_fresh():
+            return self._merge(context, cached.fields)
+
+        fallback = cached.fresh_fields() if cached is not None else {}
+        fields, _ = await enrichment_flight.do(
+            key, lambda: self._refresh(key, context, fallback)
+        )
+        return self._merge(context, fields)
+
+    async def enrich_profiles(self, contexts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Enrich many contacts (e.g. a lead list) at once
+
+        Cached prospects are served from the enrichment cache. The rest
+        are deduplicated, grouped into people/bulk_match calls of
+        APOLLO_BULK_MATCH_SIZE and run APOLLO_BULK_CONCURRENCY at a time;
+        prospects of a failed bulk call fall back to single matches.
+
+        Returns the contexts, enriched in place, in input order.
+        """
+        if not self.api_key:
+            logger.warning("Apollo API key not configured, returning original contexts")
+            return contexts
+
+        keys = [enrichment_key(context) for context in contexts]
+        fields: Dict[str, Dict[str, Any]] = {}
+        pending: Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]] = {}  # key -> (context, fallback)
+
+        cached_entries = (
+            await self.cache.get_many(key for key in keys if key is not None)
+            if self.cache is not None else {}
+        )
+        for key, context in zip(keys, contexts):
+            if key is None or key in fields or key in pending:
+                continue
+            cached = cached_entries.get(key)
+            if cached is not None and cached.is_fresh():
+                fields[key] = cached.fields
+            else:
+                pending[key] = (context, cached.fresh_fields() if cached is not None else {})
+
+        items = list(pending.items())
+        size = settings.APOLLO_BULK_MATCH_SIZE
+        semaphore = asyncio.Semaphore(settings.APOLLO_BULK_CONCURRENCY)
+
+        async def run_batch(batch: List[Tuple[str, Tuple[Dict[str, Any], Dict[str, Any]]]]) -> None:
+            async with semaphore:
+                try:
+                    async with self._get_client(timeout=30.0) as client:
+                        people = await self._bulk_match(client, [context for _, (context, _) in batch])
+                except Exception as e:
+                    logger.warning(f"Apollo bulk match of {len(batch)} prospects failed, matching singly: {e}")
+                    results = await asyncio.gather(*(
+                        self._refresh(key, context, fallback)
+                        for key, (context, fallback) in batch
+                    ))
+                    fields.update(zip((key for key, _ in batch), results))
+                    return
+
+            entries = {}
+            for (key, _), person_data in zip(batch, people):
+                person_fields = self._person_fields(person_data) if person_data else {}
+                entries[key] = CachedEnrichment.create(HIT if person_fields else MISS, person_fields)
+                fields[key] = person_fields
+            if self.cache is not None:
+                await self.cache.set_many(entries)
+
+        await asyncio.gather(*(
+            run_batch(items[start:start + size])
+            for start in range(0, len(items), size)
+        ))
+
+        return [
+            self._merge(context, fields.get(key, {})) if key is not None else context
+            for key, context in zip(keys, contexts)
+        ]
+
+    async def _refresh(
+        self,
+        key: str,
+        context: Dict[str, Any],
+        fallback: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Look a prospect up in Apollo and cache the outcome
+
+        On errors the still-fresh fields of the previous entry are kept
+        (and cached for ENRICHMENT_ERROR_TTL).
+        """
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                # Enrich person
+            async with self._get_client(timeout=10.0) as client:
                 person_data = await self._enrich_person(
                     client,
                     name=context.get("name"),
                     company=context.get("company"),
                     linkedin_url=context.get("linkedin_url")
                 )
-
-                if person_data:
-                    # Merge enriched data
-                    context.update({
-                        "email": person_data.get("email"),
-                        "phone": person_data.get("phone_numbers", [None])[0],
-                        "title": person_data.get("title") or context.get("title"),
-                        "linkedin_url": person_data.get("linkedin_url") or context.get("linkedin_url")
-                    })
-
-                    # Enrich organization
-                    if person_data.get("organization"):
-                        org = person_data["organization"]
-                        context.update({
-                            "company": org.get("name") or context.get("company"),
-                            "company_size": org.get("estimated_num_employees"),
-                            "tech_stack": org.get("technologies", []),
-                            "industry": org.get("industry")
-                        })
-
-                return context
-
+            fields = self._person_fields(person_data) if person_data else {}
+            entry = CachedEnrichment.create(HIT if fields else MISS, fields)
         except httpx.RequestError as e:
             logger.error(f"Apollo API request error: {e}")
-            return context
+            entry = CachedEnrichment.create(ERROR, fallback)
         except Exception as e:
             logger.error(f"Apollo enrichment error: {e}")
-            return context
+            entry = CachedEnrichment.create(ERROR, fallback)
+
+        if self.cache is not None:
+            await self.cache.set(key, entry)
+        return entry.fields
+
+    @staticmethod
+    def _person_fields(person_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Context fields from an Apollo person record
+        """
+        fields = {
+            "email": person_data.get("email"),
+            "phone": (person_data.get("phone_numbers") or [None])[0],
+            "title": person_data.get("title"),
+            "linkedin_url": person_data.get("linkedin_url")
+        }
+
+        # Enrich organization
+        if person_data.get("organization"):
+            org = person_data["organization"]
+            fields.update({
+                "company": org.get("name"),
+                "company_size": org.get("estimated_num_employees"),
+                "tech_stack": org.get("technologies", []),
+                "industry": org.get("industry")
+            })
+
+        return {name: value for name, value in fields.items() if value is not None}
+
+    @staticmethod
+    def _merge(context: Dict[str, Any], fields: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Merge enriched fields into context (in place)
+        """
+        context.update(fields)
+        return context
 
     async def _enrich_person(
         self,
@@ -86,8 +232,12 @@ class ApolloService:
     ) -> Optional[Dict[str, Any]]:
         """
         Call Apollo.io people enrichment API
+
+        Returns None when Apollo has no match; raises ApolloError on
+        error responses.
         """
-        if not name and not linkedin_url:
+        data = self._match_details(name, company, linkedin_url)
+        if not data:
             return None
 
         url = f"{self.base_url}/people/match"
@@ -96,6 +246,64 @@ class ApolloService:
             "api_key": self.api_key
         }
 
+        response = await client.post(url, params=params, json=data, timeout=10.0)
+
+        if response.status_code == 200:
+            result = response.json()
+            return result.get("person")
+
+        logger.warning(f"Apollo API error: {response.status_code} - {response.text}")
+        raise ApolloError(response.status_code)
+
+    async def _bulk_match(
+        self,
+        client: httpx.AsyncClient,
+        contexts: List[Dict[str, Any]]
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Call Apollo.io bulk people enrichment API
+
+        Returns one person (or None) per context, in order; raises
+        ApolloError on error responses.
+        """
+        url = f"{self.base_url}/people/bulk_match"
+
+        params = {
+            "api_key": self.api_key
+        }
+
+        data = {
+            "details": [
+                self._match_details(
+                    context.get("name"), context.get("company"), context.get("linkedin_url")
+                )
+                for context in contexts
+            ]
+        }
+
+        response = await client.post(url, params=params, json=data, timeout=30.0)
+
+        if response.status_code != 200:
+            logger.warning(f"Apollo bulk API error: {response.status_code} - {response.text}")
+            raise ApolloError(response.status_code)
+
+        matches = response.json().get("matches") or []
+        if len(matches) != len(contexts):
+            raise ValueError(f"Apollo bulk match returned {len(matches)} results for {len(contexts)} prospects")
+        return matches
+
+    @staticmethod
+    def _match_details(
+        name: Optional[str] = None,
+        company: Optional[str] = None,
+        linkedin_url: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        people/match parameters identifying a prospect (empty if none)
+        """
+        if not name and not linkedin_url:
+            return {}
+
         data = {}
 
         if linkedin_url:
@@ -111,22 +319,7 @@ class ApolloService:
             if company:
                 data["organization_name"] = company
 
-        if not data:
-            return None
-
-        try:
-            response = await client.post(url, params=params, json=data)
-
-            if response.status_code == 200:
-                result = response.json()
-                return result.get("person")
-            else:
-                logger.warning(f"Apollo API error: {response.status_code} - {response.text}")
-                return None
-
-        except Exception as e:
-            logger.error(f"Apollo people match error: {e}")
-            return None
+        return data
 
     async def search_people(
         self,
@@ -147,6 +340,95 @@ class ApolloService:
         if not self.api_key:
             return {"people": [], "total": 0}
 
+        try:
+            async with self._get_client(timeout=15.0) as client:
+                return await self._search_page(client, query, page, per_page)
+
+        except ApolloError as e:
+            logger.warning(f"Apollo search error: {e.status_code}")
+            return {"people": [], "total": 0}
+        except Exception as e:
+            logger.error(f"Apollo search error: {e}")
+            return {"people": [], "total": 0}
+
+    async def iter_people(
+        self,
+        query: Dict[str, Any],
+        max_results: Optional[int] = None,
+        per_page: int = settings.APOLLO_SEARCH_PAGE_SIZE,
+        prefetch: int = settings.APOLLO_SEARCH_PREFETCH
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream every person matching a search, page by page
+
+        The next `prefetch` pages are fetched concurrently while the
+        current one is consumed (fewer when Apollo reports few requests
+        left this minute). People are yielded in page order, deduplicated
+        across pages by Apollo id. Raises ApolloError if a page fails.
+        """
+        if not self.api_key:
+            return
+
+        seen = set()
+        yielded = 0
+        pending: Deque[asyncio.Task] = deque()
+
+        async with self._get_client(timeout=15.0) as client:
+            limiter = _SearchRateLimit()
+
+            def fetch(page: int) -> asyncio.Task:
+                return asyncio.ensure_future(self._search_page(client, query, page, per_page, limiter))
+
+            try:
+                first = await self._search_page(client, query, 1, per_page, limiter)
+                pagination = first.get("pagination") or {}
+                last_page = min(int(pagination.get("total_pages") or 1), settings.APOLLO_SEARCH_MAX_PAGES)
+                if max_results:
+                    last_page = min(last_page, -(-max_results // per_page))
+                next_page = 2
+                data = first
+
+                while True:
+                    # Keep up to `prefetch` pages in flight ahead of the consumer
+                    window = prefetch if limiter.requests_left is None or limiter.requests_left > prefetch else 1
+                    while next_page <= last_page and len(pending) < window:
+                        pending.append(fetch(next_page))
+                        next_page += 1
+
+                    for person in data.get("people", []) + data.get("contacts", []):
+                        person_id = person.get("person_id") or person.get("id")
+                        if person_id in seen:
+                            continue
+                        if person_id:
+                            seen.add(person_id)
+                        yield person
+                        yielded += 1
+                        if max_results and yielded >= max_results:
+                            return
+
+                    if not pending:
+                        return
+                    data = await pending.popleft()
+            finally:
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _search_page(
+        self,
+        client: httpx.AsyncClient,
+        query: Dict[str, Any],
+        page: int,
+        per_page: int,
+        limiter: Optional["_SearchRateLimit"] = None
+    ) -> Dict[str, Any]:
+        """
+        Call Apollo.io people search for one page
+
+        429 responses are retried after their Retry-After (pausing every
+        fetch sharing `limiter`); other errors raise ApolloError.
+        """
+        limiter = limiter or _SearchRateLimit()
         url = f"{self.base_url}/mixed_people/search"
 
         params = {
@@ -155,16 +437,41 @@ class ApolloService:
             "per_page": per_page
         }
 
-        try:
-            async with httpx.AsyncClient(timeout=15.0) as client:
-                response = await client.post(url, params=params, json=query)
+        for attempt in range(settings.APOLLO_SEARCH_MAX_RETRIES + 1):
+            await limiter.wait()
+            response = await client.post(url, params=params, json=query, timeout=15.0)
+            limiter.update(response.headers)
+
+            if response.status_code == 200:
+                return response.json()
+            if response.status_code != 429 or attempt == settings.APOLLO_SEARCH_MAX_RETRIES:
+                break
 
-                if response.status_code == 200:
-                    return response.json()
-                else:
-                    logger.warning(f"Apollo search error: {response.status_code}")
-                    return {"people": [], "total": 0}
+            retry_after = float(response.headers.get("retry-after") or 5)
+            logger.warning(f"Apollo search rate limited, retrying page {page} in {retry_after:.0f}s")
+            limiter.pause(retry_after)
 
-        except Exception as e:
-            logger.error(f"Apollo search error: {e}")
-            return {"people": [], "total": 0}
+        raise ApolloError(response.status_code)
+
+
+class _SearchRateLimit:
+    """
+    Rate-limit state shared by the page fetches of one search
+    """
+
+    def __init__(self):
+        self.requests_left: Optional[int] = None
+        self._resume_at = 0.0
+
+    def update(self, headers: httpx.Headers) -> None:
+        left = headers.get("x-minute-requests-left")
+        if left is not None and left.isdigit():
+            self.requests_left = int(left)
+
+    def pause(self, seconds: float) -> None:
+        self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+    async def wait(self) -> None:
+        delay = self._resume_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
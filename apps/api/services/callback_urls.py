@@ -0,0 +1,64 @@
+"""
+Callback URL checks - keep job callbacks off internal addresses
+Job callbacks are POSTed from inside the cluster, so a callback URL
+pointing at a private, loopback, link-local or reserved address (Redis,
+the cloud metadata endpoint, our own admin routes...) would let a user
+make the API call internal services. URLs are checked when a job is
+submitted and again right before the callback is sent, since DNS can
+change in between.
+"""
+from typing import List
+from urllib.parse import urlsplit
+import asyncio
+import ipaddress
+import socket
+
+from config import settings
+
+
+class UnsafeCallbackURL(ValueError):
+    """
+    Raised for callback URLs the API must not call
+    """
+
+
+def _host_allowed(host: str, allowed: List[str]) -> bool:
+    host = host.lower().rstrip(".")
+    return any(
+        host == entry or host.endswith("." + entry)
+        for entry in (item.lower().lstrip(".") for item in allowed)
+    )
+
+
+async def check_callback_url(url: str) -> None:
+    """
+    Raise UnsafeCallbackURL unless every address the host resolves to is
+    publicly routable (and the host is on JOB_CALLBACK_ALLOWED_HOSTS,
+    when that allowlist is set)
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise UnsafeCallbackURL("callback_url must be an http(s) URL")
+    if parts.scheme != "https" and settings.ENVIRONMENT == "production":
+        raise UnsafeCallbackURL("callback_url must use https")
+
+    host = parts.hostname
+    if settings.JOB_CALLBACK_ALLOWED_HOSTS and not _host_allowed(host, settings.JOB_CALLBACK_ALLOWED_HOSTS):
+        raise UnsafeCallbackURL("callback_url host is not allowed")
+
+    try:
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+    except ValueError:
+        raise UnsafeCallbackURL("callback_url has an invalid port")
+
+    try:
+        addresses = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror:
+        raise UnsafeCallbackURL("callback_url host does not resolve")
+
+    for *_, sockaddr in addresses:
+        address = ipaddress.ip_address(sockaddr[0].split("%", 1)[0])
+        if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if not address.is_global or address.is_multicast:
+            raise UnsafeCallbackURL("callback_url must not point to a private or reserved address")
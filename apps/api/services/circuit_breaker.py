@@ -0,0 +1,139 @@
+"""
+Circuit Breaker - fail fast while an upstream is degraded
+Opens when the error rate over a rolling window crosses a threshold,
+rejects calls for a cool-down period, then lets a single probe through
+(half-open) to decide whether to close again
+"""
+from collections import deque
+from prometheus_client import Counter, Gauge
+from typing import Deque, Optional, Tuple
+import time
+import logging
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Prometheus metrics
+CIRCUIT_BREAKER_STATE = Gauge(
+    'konqer_api_circuit_breaker_state',
+    'Circuit breaker state (0 = closed, 1 = half-open, 2 = open)',
+    ['name']
+)
+CIRCUIT_BREAKER_TRANSITIONS = Counter(
+    'konqer_api_circuit_breaker_transitions_total',
+    'Circuit breaker state changes',
+    ['name', 'state']
+)
+CIRCUIT_BREAKER_REJECTIONS = Counter(
+    'konqer_api_circuit_breaker_rejections_total',
+    'Calls rejected without reaching the upstream',
+    ['name']
+)
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling an upstream whose circuit is open
+    """
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f"{name} is temporarily unavailable")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        error_rate: float = settings.CIRCUIT_BREAKER_ERROR_RATE,
+        min_calls: int = settings.CIRCUIT_BREAKER_MIN_CALLS,
+        window: float = settings.CIRCUIT_BREAKER_WINDOW,
+        open_seconds: float = settings.CIRCUIT_BREAKER_OPEN_SECONDS
+    ):
+        self.name = name
+        self.error_rate = error_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._probe_started_at: Optional[float] = None
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        CIRCUIT_BREAKER_STATE.labels(name=name).set(STATE_VALUES[CLOSED])
+
+    def retry_after(self) -> Optional[int]:
+        """
+        Seconds until the circuit admits calls again (None if it does now)
+        """
+        if self.state != OPEN:
+            return None
+        remaining = self._opened_at + self.open_seconds - time.monotonic()
+        return max(1, int(remaining + 0.999)) if remaining > 0 else None
+
+    def before_call(self) -> None:
+        """
+        Admit a call or raise CircuitOpenError
+        """
+        if self.state == OPEN:
+            retry_after = self.retry_after()
+            if retry_after is not None:
+                CIRCUIT_BREAKER_REJECTIONS.labels(name=self.name).inc()
+                raise CircuitOpenError(self.name, retry_after)
+            self._transition(HALF_OPEN)
+
+        if self.state == HALF_OPEN:
+            # One probe at a time; a probe that never reported back (e.g.
+            # cancelled) stops blocking after another cool-down period
+            now = time.monotonic()
+            if self._probe_started_at is not None and now - self._probe_started_at < self.open_seconds:
+                CIRCUIT_BREAKER_REJECTIONS.labels(name=self.name).inc()
+                raise CircuitOpenError(self.name, 1)
+            self._probe_started_at = now
+
+    def record_success(self) -> None:
+        if self.state == HALF_OPEN:
+            self._probe_started_at = None
+            self._outcomes.clear()
+            self._transition(CLOSED)
+            return
+        self._record(True)
+
+    def record_failure(self) -> None:
+        if self.state == HALF_OPEN:
+            self._probe_started_at = None
+            self._open()
+            return
+        self._record(False)
+
+    def _record(self, ok: bool) -> None:
+        now = time.monotonic()
+        self._outcomes.append((now, ok))
+        while self._outcomes and self._outcomes[0][0] < now - self.window:
+            self._outcomes.popleft()
+
+        if self.state == CLOSED and len(self._outcomes) >= self.min_calls:
+            failures = sum(1 for _, succeeded in self._outcomes if not succeeded)
+            if failures / len(self._outcomes) >= self.error_rate:
+                self._open()
+
+    def _open(self) -> None:
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self._transition(OPEN)
+        logger.warning(f"Circuit {self.name} opened for {self.open_seconds}s")
+
+    def _transition(self, state: str) -> None:
+        self.state = state
+        CIRCUIT_BREAKER_STATE.labels(name=self.name).set(STATE_VALUES[state])
+        CIRCUIT_BREAKER_TRANSITIONS.labels(name=self.name, state=state).inc()
+
+
+# Process-wide breaker shared by every OpenAIService instance
+openai_breaker = CircuitBreaker("openai")
@@ -0,0 +1,162 @@
+"""
+Service Config Cache - versioned in-process snapshot of service_configs
+Loaded at startup, refreshed on an interval and reloaded on every pod
+through Postgres LISTEN/NOTIFY when an admin updates a config
+"""
+from dataclasses import dataclass, field
+from fastapi import Request
+from prometheus_client import Counter
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, Optional, Set, Tuple
+import asyncio
+import asyncpg
+import logging
+
+from models.database import async_session, ServiceConfig
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "service_config_changed"
+
+# Prometheus metrics
+CONFIG_CACHE_RELOADS = Counter(
+    'konqer_api_service_config_reloads_total',
+    'Service config snapshot reloads',
+    ['trigger']
+)
+
+
+@dataclass(frozen=True)
+class ServiceConfigSnapshot:
+    service: str
+    name: str
+    slug: str
+    type: Optional[str]
+    description: Optional[str]
+    pricing_monthly: Optional[int]
+    pricing_annual: Optional[int]
+    rate_limit_daily: int
+    rate_limit_monthly: int
+    enabled: bool
+    config: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def from_model(cls, row: ServiceConfig) -> "ServiceConfigSnapshot":
+        return cls(
+            service=row.service,
+            name=row.name,
+            slug=row.slug,
+            type=row.type,
+            description=row.description,
+            pricing_monthly=row.pricing_monthly,
+            pricing_annual=row.pricing_annual,
+            rate_limit_daily=row.rate_limit_daily or settings.RATE_LIMIT_DAILY,
+            rate_limit_monthly=row.rate_limit_monthly or settings.RATE_LIMIT_MONTHLY,
+            enabled=bool(row.enabled),
+            config=row.config or {}
+        )
+
+
+class ServiceConfigCache:
+    def __init__(self):
+        self.version = 0
+        self._configs: Dict[str, ServiceConfigSnapshot] = {}
+        self._listener: Optional[asyncpg.Connection] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._pending: Set[asyncio.Task] = set()
+
+    def get(self, service: str) -> Optional[ServiceConfigSnapshot]:
+        """
+        Snapshot for a service (None if the service does not exist)
+        """
+        return self._configs.get(service)
+
+    def limits(self, service: str) -> Tuple[int, int]:
+        """
+        (daily, monthly) generation limits, with defaults for unknown services
+        """
+        config = self._configs.get(service)
+        if config is None:
+            return settings.RATE_LIMIT_DAILY, settings.RATE_LIMIT_MONTHLY
+        return config.rate_limit_daily, config.rate_limit_monthly
+
+    async def load(self, trigger: str = "manual") -> None:
+        """
+        Read all service configs and swap in a new snapshot
+        """
+        async with async_session() as session:
+            result = await session.execute(select(ServiceConfig))
+            configs = {
+                row.service: ServiceConfigSnapshot.from_model(row)
+                for row in result.scalars().all()
+            }
+
+        self._configs = configs
+        self.version += 1
+        CONFIG_CACHE_RELOADS.labels(trigger=trigger).inc()
+
+    async def start(self) -> None:
+        """
+        Initial load, LISTEN connection and refresh loop (main.lifespan)
+        """
+        await self.load(trigger="startup")
+        await self._listen()
+        self._refresh_task = asyncio.create_task(self._refresh_loop())
+        logger.info(f"✅ Service config cache loaded ({len(self._configs)} services)")
+
+    async def stop(self) -> None:
+        if self._refresh_task:
+            self._refresh_task.cancel()
+        if self._listener and not self._listener.is_closed():
+            await self._listener.close()
+
+    async def _listen(self) -> None:
+        """
+        Open a dedicated connection that reloads on NOTIFY
+        """
+        try:
+            self._listener = await asyncpg.connect(settings.DATABASE_URL)
+            await self._listener.add_listener(NOTIFY_CHANNEL, self._on_notify)
+        except Exception as e:
+            # The refresh loop keeps the snapshot reasonably fresh meanwhile
+            logger.warning(f"Service config LISTEN failed: {e}")
+            self._listener = None
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        logger.info(f"Service config changed ({payload}), reloading")
+        task = asyncio.create_task(self.load(trigger="notify"))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.SERVICE_CONFIG_REFRESH_INTERVAL)
+
+            try:
+                await self.load(trigger="interval")
+                if self._listener is None or self._listener.is_closed():
+                    await self._listen()
+            except Exception as e:
+                logger.error(f"Service config refresh failed: {e}")
+
+
+async def notify_config_changed(db: AsyncSession, service: str) -> None:
+    """
+    Queue a NOTIFY in the current transaction (delivered on commit)
+    """
+    await db.execute(
+        text("SELECT pg_notify(:channel, :service)"),
+        {"channel": NOTIFY_CHANNEL, "service": service}
+    )
+
+
+# ============================================
+# DEPENDENCY INJECTION
+# ============================================
+def get_service_config_cache(request: Request) -> ServiceConfigCache:
+    """
+    Dependency: process-wide service config snapshot
+    """
+    return request.app.state.service_config_cache
@@ -0,0 +1,243 @@
+"""
+Enrichment Cache - Apollo enrichment results keyed by prospect
+In-process LRU tier in front of the enrichment_cache table, which every
+pod shares
+
+Entries are keyed by the normalized LinkedIn URL, or name + company when
+there is none. Each enriched field has its own freshness TTL
+(ENRICHMENT_FIELD_TTLS); once any field is stale the entry is refreshed
+from Apollo and its still-fresh fields serve as the fallback. Prospects
+Apollo has no match for and failed lookups are cached briefly too
+(ENRICHMENT_MISS_TTL, ENRICHMENT_ERROR_TTL) so they are not retried on
+every generation.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from prometheus_client import Counter
+from sqlalchemy import String, any_, bindparam, delete, select
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from typing import Any, Dict, Iterable, List, Optional
+import hashlib
+import re
+import logging
+
+from config import settings
+from models.database import async_session, EnrichmentCacheEntry
+
+logger = logging.getLogger(__name__)
+
+# Prometheus metrics
+ENRICHMENT_CACHE_LOOKUPS = Counter(
+    'konqer_api_enrichment_cache_lookups_total',
+    'Enrichment cache lookups (result: fresh, stale, negative, miss)',
+    ['tier', 'result']
+)
+
+HIT = "hit"
+MISS = "miss"
+ERROR = "error"
+
+# Expired rows are purged every this many writes
+PURGE_EVERY = 1000
+
+_LINKEDIN_HOST = re.compile(r"^(https?://)?([a-z]{2,3}\.|www\.)?linkedin\.com")
+
+
+def enrichment_key(context: Dict[str, Any]) -> Optional[str]:
+    """
+    Cache key of a prospect: normalized LinkedIn URL, else name + company
+    (None when the context identifies no one)
+    """
+    linkedin_url = (context.get("linkedin_url") or "").strip().lower()
+    if linkedin_url:
+        url = _LINKEDIN_HOST.sub("linkedin.com", linkedin_url)
+        url = re.split(r"[?#]", url, maxsplit=1)[0].rstrip("/")
+        key = f"li:{url}"
+    elif context.get("name"):
+        name = " ".join(str(context["name"]).lower().split())
+        company = " ".join(str(context.get("company") or "").lower().split())
+        key = f"nc:{name}|{company}"
+    else:
+        return None
+
+    if len(key) > 500:
+        key = key[:3] + hashlib.sha256(key.encode()).hexdigest()
+    return key
+
+
+def field_ttl(name: str) -> int:
+    """
+    Freshness TTL of an enriched field (fields without one use the shortest)
+    """
+    ttls = settings.ENRICHMENT_FIELD_TTLS
+    return ttls.get(name, min(ttls.values()))
+
+
+@dataclass(frozen=True)
+class CachedEnrichment:
+    status: str  # hit, miss (no Apollo match) or error
+    fields: Dict[str, Any]
+    fetched_at: datetime
+    expires_at: datetime
+
+    @classmethod
+    def create(cls, status: str, fields: Dict[str, Any]) -> "CachedEnrichment":
+        fetched_at = datetime.now()
+        if status == HIT:
+            ttl = max((field_ttl(name) for name in fields), default=settings.ENRICHMENT_MISS_TTL)
+        elif status == MISS:
+            ttl = settings.ENRICHMENT_MISS_TTL
+        else:
+            ttl = settings.ENRICHMENT_ERROR_TTL
+        return cls(status, fields, fetched_at, fetched_at + timedelta(seconds=ttl))
+
+    def fresh_fields(self) -> Dict[str, Any]:
+        """
+        Fields still within their freshness TTL
+        """
+        now = datetime.now()
+        return {
+            name: value for name, value in self.fields.items()
+            if self.fetched_at + timedelta(seconds=field_ttl(name)) > now
+        }
+
+    def is_fresh(self) -> bool:
+        """
+        True when the entry can be used without calling Apollo
+        """
+        if datetime.now() >= self.expires_at:
+            return False
+        if self.status != HIT:
+            return True
+        return len(self.fresh_fields()) == len(self.fields)
+
+
+class EnrichmentCache:
+    def __init__(self, max_entries: int = settings.ENRICHMENT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedEnrichment]" = OrderedDict()
+        self._writes = 0
+
+    async def get(self, key: str) -> Optional[CachedEnrichment]:
+        """
+        Freshest entry for a key, from memory or Postgres
+
+        Stale entries are returned too (see CachedEnrichment.is_fresh),
+        so callers can fall back to their fresh fields.
+        """
+        return (await self.get_many([key])).get(key)
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, CachedEnrichment]:
+        """
+        Freshest entries for many keys (see get); keys not fresh in memory
+        are looked up with a single query. Keys with no entry are left out.
+        """
+        entries: Dict[str, CachedEnrichment] = {}
+        missing: Dict[str, Optional[CachedEnrichment]] = {}  # key -> stale memory entry
+        for key in dict.fromkeys(keys):
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.is_fresh():
+                    self._entries.move_to_end(key)
+                    self._count("memory", entry)
+                    entries[key] = entry
+                    continue
+                if datetime.now() >= entry.expires_at:
+                    del self._entries[key]
+                    entry = None
+            missing[key] = entry
+
+        # Another pod may have refreshed them
+        stored = await self._load_many(list(missing)) if missing else {}
+        for key, entry in missing.items():
+            loaded = stored.get(key)
+            if loaded is not None and (entry is None or loaded.fetched_at > entry.fetched_at):
+                self._store(key, loaded)
+                self._count("db", loaded)
+                entries[key] = loaded
+            elif entry is not None:
+                self._count("memory", entry)
+                entries[key] = entry
+            else:
+                ENRICHMENT_CACHE_LOOKUPS.labels(tier="none", result="miss").inc()
+        return entries
+
+    async def set(self, key: str, entry: CachedEnrichment) -> None:
+        await self.set_many({key: entry})
+
+    async def set_many(self, entries: Dict[str, CachedEnrichment]) -> None:
+        """
+        Store entries in memory and upsert them with one statement
+        """
+        if not entries:
+            return
+        for key, entry in entries.items():
+            self._store(key, entry)
+
+        try:
+            async with async_session() as session:
+                statement = insert(EnrichmentCacheEntry).values([
+                    {
+                        "key": key,
+                        "status": entry.status,
+                        "fields": entry.fields,
+                        "fetched_at": entry.fetched_at,
+                        "expires_at": entry.expires_at
+                    }
+                    for key, entry in entries.items()
+                ])
+                await session.execute(statement.on_conflict_do_update(
+                    index_elements=[EnrichmentCacheEntry.key],
+                    set_={
+                        name: statement.excluded[name]
+                        for name in ("status", "fields", "fetched_at", "expires_at")
+                    }
+                ))
+
+                previous, self._writes = self._writes, self._writes + len(entries)
+                if previous // PURGE_EVERY != self._writes // PURGE_EVERY:
+                    await session.execute(
+                        delete(EnrichmentCacheEntry)
+                        .where(EnrichmentCacheEntry.expires_at < datetime.now())
+                    )
+                await session.commit()
+        except Exception as e:
+            logger.warning(f"Enrichment cache write failed: {e}")
+
+    async def _load_many(self, keys: List[str]) -> Dict[str, CachedEnrichment]:
+        try:
+            async with async_session() as session:
+                result = await session.execute(
+                    select(EnrichmentCacheEntry)
+                    .where(EnrichmentCacheEntry.key == any_(bindparam("keys", keys, type_=ARRAY(String))))
+                    .where(EnrichmentCacheEntry.expires_at > datetime.now())
+                )
+                rows = result.scalars().all()
+        except Exception as e:
+            logger.warning(f"Enrichment cache read failed: {e}")
+            return {}
+
+        return {
+            row.key: CachedEnrichment(row.status, row.fields or {}, row.fetched_at, row.expires_at)
+            for row in rows
+        }
+
+    def _store(self, key: str, entry: CachedEnrichment) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _count(self, tier: str, entry: CachedEnrichment) -> None:
+        if not entry.is_fresh():
+            result = "stale"
+        elif entry.status == HIT:
+            result = "fresh"
+        else:
+            result = "negative"
+        ENRICHMENT_CACHE_LOOKUPS.labels(tier=tier, result=result).inc()
+
+
+# Process-wide cache shared by every ApolloService instance
+enrichment_cache = EnrichmentCache()
@@ -0,0 +1,278 @@
+"""
+Entitlements - access, limits and usage for (user, service) in one place
+Resolved once per request and shared by every dependency that needs it
+"""
+from dataclasses import dataclass
+from fastapi import Depends
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Optional, Tuple
+import time
+
+from models.database import get_db, User, ServiceAccess, Subscription, SubscriptionStatus
+from routers.auth import get_current_user
+from services.config_cache import ServiceConfigCache, ServiceConfigSnapshot, get_service_config_cache
+from services.rate_limiter import RateLimiter, RateLimitResult, get_rate_limiter
+from services.scheduler import Tenant, current_tenant
+from config import settings
+
+
+@dataclass
+class Entitlement:
+    user_id: str
+    service: str
+    has_access: bool
+    config: Optional[ServiceConfigSnapshot]
+    daily_limit: int
+    monthly_limit: int
+    plan: Optional[str] = None
+    usage: Optional[RateLimitResult] = None
+
+
+class GrantCache:
+    """
+    Short-lived cache of unlocked (user, service) pairs
+
+    Only grants are cached: a newly unlocked service is visible on the
+    next request, while a lock takes at most ENTITLEMENT_CACHE_TTL seconds.
+    """
+
+    def __init__(self, ttl: int, max_size: int = 50000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._grants: Dict[Tuple[str, str], float] = {}
+
+    def has(self, user_id: str, service: str) -> bool:
+        expires_at = self._grants.get((user_id, service))
+        if expires_at is None:
+            return False
+        if expires_at < time.monotonic():
+            del self._grants[(user_id, service)]
+            return False
+        return True
+
+    def add(self, user_id: str, service: str) -> None:
+        if len(self._grants) >= self.max_size:
+            now = time.monotonic()
+            self._grants = {k: v for k, v in self._grants.items() if v >= now}
+            if len(self._grants) >= self.max_size:
+                self._grants.clear()
+        self._grants[(user_id, service)] = time.monotonic() + self.ttl
+
+    def discard(self, user_id: str, service: str) -> None:
+        self._grants.pop((user_id, service), None)
+
+
+grant_cache = GrantCache(ttl=settings.ENTITLEMENT_CACHE_TTL)
+
+
+class PlanCache:
+    """
+    Short-lived cache of each user's current subscription plan (None for
+    users without an active subscription), used for scheduling weights
+    """
+
+    def __init__(self, ttl: int, max_size: int = 50000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._plans: Dict[str, Tuple[float, Optional[str]]] = {}
+
+    def get(self, user_id: str) -> Tuple[bool, Optional[str]]:
+        entry = self._plans.get(user_id)
+        if entry is None:
+            return False, None
+        if entry[0] < time.monotonic():
+            del self._plans[user_id]
+            return False, None
+        return True, entry[1]
+
+    def add(self, user_id: str, plan: Optional[str]) -> None:
+        if len(self._plans) >= self.max_size:
+            self._plans.clear()
+        self._plans[user_id] = (time.monotonic() + self.ttl, plan)
+
+
+plan_cache = PlanCache(ttl=settings.ENTITLEMENT_CACHE_TTL)
+
+
+async def lookup_plan(db: AsyncSession, user_id) -> Optional[str]:
+    """
+    Current plan of a user (cached), from their latest active or trialing
+    subscription
+    """
+    found, plan = plan_cache.get(str(user_id))
+    if found:
+        return plan
+
+    result = await db.execute(
+        select(Subscription.plan)
+        .where(Subscription.user_id == user_id)
+        .where(Subscription.status.in_([SubscriptionStatus.ACTIVE, SubscriptionStatus.TRIALING]))
+        .order_by(Subscription.created_at.desc())
+        .limit(1)
+    )
+    plan = result.scalar_one_or_none()
+    plan = plan.value if plan is not None else None
+    plan_cache.add(str(user_id), plan)
+    return plan
+
+
+class EntitlementResolver:
+    """
+    Per-request resolver with a memo keyed by (user, service)
+
+    Config and limits come from the service config snapshot, access is a
+    grant cache hit or a single indexed query, the plan (for scheduling)
+    is cached per user, and usage comes from the rate limiter.
+    """
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        config_cache: ServiceConfigCache,
+        limiter: RateLimiter
+    ):
+        self.db = db
+        self.config_cache = config_cache
+        self.limiter = limiter
+        self._memo: Dict[Tuple[str, str], Entitlement] = {}
+
+    async def resolve(self, user: User, service: str) -> Entitlement:
+        """
+        Access and limits for (user, service), memoized for the request
+        """
+        user_id = str(user.id)
+        key = (user_id, service)
+
+        if key in self._memo:
+            return self._memo[key]
+
+        has_access = grant_cache.has(user_id, service)
+
+        if not has_access:
+            result = await self.db.execute(
+                select(ServiceAccess.id)
+                .where(ServiceAccess.user_id == user.id)
+                .where(ServiceAccess.service == service)
+                .where(ServiceAccess.locked == False)
+            )
+            has_access = result.scalar_one_or_none() is not None
+            if has_access:
+                grant_cache.add(user_id, service)
+
+        daily_limit, monthly_limit = self.config_cache.limits(service)
+
+        entitlement = Entitlement(
+            user_id=user_id,
+            service=service,
+            has_access=has_access,
+            config=self.config_cache.get(service),
+            daily_limit=daily_limit,
+            monthly_limit=monthly_limit,
+            plan=await lookup_plan(self.db, user.id) if has_access else None
+        )
+        self._memo[key] = entitlement
+        return entitlement
+
+    async def consume(self, entitlement: Entitlement, cost: int = 1) -> RateLimitResult:
+        """
+        Consume `cost` generations from the entitlement's quotas
+        """
+        entitlement.usage = await self.limiter.hit(
+            entitlement.user_id,
+            entitlement.service,
+            entitlement.daily_limit,
+            entitlement.monthly_limit,
+            cost=cost
+        )
+        return entitlement.usage
+
+
+# ============================================
+# DEPENDENCY INJECTION
+# ============================================
+def get_entitlement_resolver(
+    db: AsyncSession = Depends(get_db),
+    config_cache: ServiceConfigCache = Depends(get_service_config_cache),
+    limiter: RateLimiter = Depends(get_rate_limiter)
+) -> EntitlementResolver:
+    """
+    Dependency: entitlement resolver (FastAPI caches it per request)
+    """
+    return EntitlementResolver(db, config_cache, limiter)
+
+
+async def get_entitlement(
+    service: str,
+    current_user: User = Depends(get_current_user),
+    resolver: EntitlementResolver = Depends(get_entitlement_resolver)
+) -> Entitlement:
+    """
+    Dependency: entitlement for the {service} path parameter
+
+    Also tags the request's upstream calls with the user and plan for
+    the LLM scheduler.
+    """
+    entitlement = await resolver.resolve(current_user, service)
+    current_tenant.set(Tenant(user_id=entitlement.user_id, plan=entitlement.plan))
+    return entitlement
+
+
+if __name__ == "__main__":
+    # Benchmark: python -m services.entitlements --user-id <uuid> [--service cold-dm]
+    # DB round trips and latency of the generate-path checks, before
+    # (access query, ServiceConfig query, today's COUNT) and after the
+    # resolver. Both include the User lookup done by get_current_user.
+    from datetime import datetime
+    from sqlalchemy import func
+    from models.database import async_session, engine, Generation, ServiceConfig, QueryCounter, query_counter
+    import argparse
+    import asyncio
+
+    async def legacy_checks(db: AsyncSession, user: User, service: str) -> None:
+        await db.execute(
+            select(ServiceAccess)
+            .where(ServiceAccess.user_id == user.id)
+            .where(ServiceAccess.service == service)
+            .where(ServiceAccess.locked == False)
+        )
+        await db.execute(select(ServiceConfig).where(ServiceConfig.service == service))
+        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        await db.execute(
+            select(func.count(Generation.id))
+            .where(Generation.user_id == user.id)
+            .where(Generation.service == service)
+            .where(Generation.created_at >= today_start)
+        )
+
+    async def bench(args: argparse.Namespace) -> None:
+        config_cache = ServiceConfigCache()
+        await config_cache.load()
+        limiter = RateLimiter()  # In-process buckets: no Redis needed
+
+        async def resolver_checks(db: AsyncSession, user: User, service: str) -> None:
+            resolver = EntitlementResolver(db, config_cache, limiter)
+            entitlement = await resolver.resolve(user, service)
+            await resolver.consume(entitlement)
+            await limiter.refund(entitlement.user_id, service)
+
+        for name, checks in (("before", legacy_checks), ("after", resolver_checks)):
+            queries = 0
+            started = time.perf_counter()
+            for _ in range(args.runs):
+                counter = QueryCounter()
+                query_counter.set(counter)
+                async with async_session() as db:
+                    user = await db.get(User, args.user_id)
+                    await checks(db, user, args.service)
+                queries += counter.count
+            elapsed = time.perf_counter() - started
+            print(f"{name:>6}: {queries / args.runs:.2f} DB round trips/request, {elapsed / args.runs * 1000:.2f} ms/request")
+
+        await engine.dispose()
+
+    parser = argparse.ArgumentParser(description="Generate-path entitlement checks: before vs after")
+    parser.add_argument("--user-id", required=True, help="Existing user with access to --service")
+    parser.add_argument("--service", default="cold-dm")
+    parser.add_argument("--runs", type=int, default=200)
+    asyncio.run(bench(parser.parse_args()))
@@ -0,0 +1,256 @@
+"""
+Event Tracking - buffered writes to the events analytics table
+track_event() only appends to an in-process ring buffer; a background
+task flushes it with COPY (asyncpg copy_records_to_table) every
+EVENT_FLUSH_INTERVAL_MS, or sooner once EVENT_FLUSH_ROWS are waiting.
+When the buffer is full new events are dropped and counted rather than
+slowing the request down.
+"""
+from collections import deque
+from datetime import datetime
+from fastapi import Request
+from prometheus_client import Counter, Gauge, Histogram
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import asyncio
+import ipaddress
+import json
+import random
+import time
+import logging
+
+from models.database import engine
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Prometheus metrics
+EVENTS_TRACKED = Counter(
+    'konqer_api_events_total',
+    'Analytics events by outcome (buffered, sampled_out, dropped, written, flush_failed)',
+    ['event_type', 'result']
+)
+EVENT_BUFFER_DEPTH = Gauge(
+    'konqer_api_event_buffer_depth',
+    'Analytics events waiting to be flushed'
+)
+EVENT_FLUSH_DURATION = Histogram(
+    'konqer_api_event_flush_duration_seconds',
+    'Time to COPY one batch of analytics events',
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+
+EVENT_COLUMNS = ["user_id", "event_type", "service", "metadata", "ip_address", "user_agent", "created_at"]
+
+EventRecord = Tuple[Any, str, Optional[str], str, Optional[str], Optional[str], datetime]
+
+
+def client_ip(request: Request) -> Optional[str]:
+    """
+    Client address, preferring the first X-Forwarded-For hop set by the ingress
+    """
+    forwarded = request.headers.get("x-forwarded-for")
+    address = forwarded.split(",")[0].strip() if forwarded else (request.client.host if request.client else None)
+    try:
+        return str(ipaddress.ip_address(address)) if address else None
+    except ValueError:
+        return None
+
+
+class EventBuffer:
+    def __init__(
+        self,
+        capacity: int = settings.EVENT_BUFFER_SIZE,
+        flush_rows: int = settings.EVENT_FLUSH_ROWS,
+        flush_interval: float = settings.EVENT_FLUSH_INTERVAL_MS / 1000,
+        sample_rates: Optional[Dict[str, float]] = None
+    ):
+        self.capacity = capacity
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.sample_rates = settings.EVENT_SAMPLE_RATES if sample_rates is None else sample_rates
+        self._records: Deque[EventRecord] = deque()
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def track(
+        self,
+        event_type: str,
+        user_id: Any = None,
+        service: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        request: Optional[Request] = None
+    ) -> bool:
+        """
+        Buffer one event; never blocks. Returns False if it was sampled
+        out or dropped because the buffer is full.
+        """
+        rate = self.sample_rates.get(event_type, 1.0)
+        if rate < 1.0 and random.random() >= rate:
+            EVENTS_TRACKED.labels(event_type=event_type, result="sampled_out").inc()
+            return False
+
+        if len(self._records) >= self.capacity:
+            EVENTS_TRACKED.labels(event_type=event_type, result="dropped").inc()
+            return False
+
+        self._records.append((
+            user_id,
+            event_type,
+            service,
+            json.dumps(metadata or {}),
+            client_ip(request) if request else None,
+            request.headers.get("user-agent") if request else None,
+            datetime.now()
+        ))
+        EVENTS_TRACKED.labels(event_type=event_type, result="buffered").inc()
+        EVENT_BUFFER_DEPTH.set(len(self._records))
+
+        # Backpressure: flush early instead of waiting out the interval
+        if len(self._records) >= self.flush_rows and self._wake is not None:
+            self._wake.set()
+        return True
+
+    async def start(self) -> None:
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        logger.info("✅ Event tracking started")
+
+    async def stop(self) -> None:
+        """
+        Stop the flusher and write out whatever is still buffered
+        """
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        await self._task
+        self._task = None
+        await self.flush()
+        logger.info("✅ Event buffer flushed")
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        while self._records:
+            count = min(len(self._records), self.flush_rows)
+            batch = [self._records.popleft() for _ in range(count)]
+            EVENT_BUFFER_DEPTH.set(len(self._records))
+            await self._copy(batch)
+
+    async def _copy(self, batch: List[EventRecord]) -> None:
+        start = time.perf_counter()
+        try:
+            async with engine.connect() as conn:
+                raw = await conn.get_raw_connection()
+                await raw.driver_connection.copy_records_to_table(
+                    "events", records=batch, columns=EVENT_COLUMNS
+                )
+            result = "written"
+        except Exception as e:
+            logger.error(f"Event flush of {len(batch)} rows failed: {e}")
+            result = "flush_failed"
+        EVENT_FLUSH_DURATION.observe(time.perf_counter() - start)
+
+        counts: Dict[str, int] = {}
+        for record in batch:
+            counts[record[1]] = counts.get(record[1], 0) + 1
+        for event_type, count in counts.items():
+            EVENTS_TRACKED.labels(event_type=event_type, result=result).inc(count)
+
+
+# Process-wide buffer, flushed from main.lifespan
+event_buffer = EventBuffer()
+
+
+def track_event(
+    event_type: str,
+    user_id: Any = None,
+    service: Optional[str] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+    request: Optional[Request] = None
+) -> bool:
+    """
+    Record an analytics event (buffered; see EventBuffer.track)
+    """
+    if not settings.EVENT_TRACKING_ENABLED:
+        return False
+    return event_buffer.track(event_type, user_id, service, metadata, request)
+
+
+if __name__ == "__main__":
+    # Benchmark: python -m services.events bench [--rate 10000] [--seconds 10] [--real]
+    # Feeds EventBuffer at a sustained rate and reports throughput, drops
+    # and peak buffer depth. COPY is stubbed with --copy-ms of latency per
+    # batch unless --real is given (then rows go to the events table).
+    import argparse
+
+    class BenchBuffer(EventBuffer):
+        def __init__(self, copy_latency: Optional[float], **kwargs):
+            super().__init__(**kwargs)
+            self.copy_latency = copy_latency
+            self.flushed = 0
+            self.batches = 0
+            self.peak_depth = 0
+
+        def track(self, *args, **kwargs) -> bool:
+            self.peak_depth = max(self.peak_depth, len(self._records))
+            return super().track(*args, **kwargs)
+
+        async def _copy(self, batch: List[EventRecord]) -> None:
+            self.flushed += len(batch)
+            self.batches += 1
+            if self.copy_latency is None:
+                await super()._copy(batch)
+            else:
+                await asyncio.sleep(self.copy_latency)
+
+    async def bench(args: argparse.Namespace) -> None:
+        buffer = BenchBuffer(
+            None if args.real else args.copy_ms / 1000,
+            sample_rates={},
+            **({"capacity": args.capacity} if args.capacity else {})
+        )
+        await buffer.start()
+
+        total = int(args.rate * args.seconds)
+        metadata = {"bench": True, "tokens": 512}
+        sent = dropped = 0
+        tracking = 0.0
+        started = time.perf_counter()
+        while sent < total:
+            due = min(total, int((time.perf_counter() - started) * args.rate) + 1)
+            tick = time.perf_counter()
+            for _ in range(due - sent):
+                if not buffer.track("bench_event", None, "cold-dm", metadata):
+                    dropped += 1
+            tracking += time.perf_counter() - tick
+            sent = due
+            await asyncio.sleep(0.001)
+        produced = time.perf_counter() - started
+
+        await buffer.stop()
+        drained = time.perf_counter() - started
+        if args.real:
+            await engine.dispose()
+
+        print(f"{total} events at {args.rate}/s target, {'COPY to Postgres' if args.real else f'stubbed COPY ({args.copy_ms} ms/batch)'}")
+        print(f"produced: {total / produced:,.0f} events/s, track() {tracking / total * 1e6:.2f} µs/event")
+        print(f"flushed:  {buffer.flushed} rows in {buffer.batches} batches, {buffer.flushed / drained:,.0f} rows/s")
+        print(f"dropped:  {dropped}, peak buffer depth {buffer.peak_depth}/{buffer.capacity}")
+
+    parser = argparse.ArgumentParser(description="EventBuffer throughput benchmark")
+    parser.add_argument("command", choices=["bench"])
+    parser.add_argument("--rate", type=int, default=10000, help="Events per second to sustain")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--copy-ms", type=float, default=20, help="Stubbed COPY latency per batch")
+    parser.add_argument("--capacity", type=int, default=0, help="Buffer size (default EVENT_BUFFER_SIZE)")
+    parser.add_argument("--real", action="store_true", help="COPY into the configured database")
+    asyncio.run(bench(parser.parse_args()))
@@ -0,0 +1,221 @@
+"""
+Generation pipeline - enrichment, completion and scoring for one generation
+Shared by the synchronous, streaming and batch generate endpoints
+"""
+from prometheus_client import Counter, Histogram
+from typing import Any, Dict, List, Optional, Set, Tuple
+import asyncio
+import time
+import logging
+
+from services.openai_service import OpenAIService
+from services.apollo_service import ApolloService
+from services.config_cache import ServiceConfigSnapshot
+from services.response_cache import ResponseCache
+from services.singleflight import completion_flight
+from services.personalization import score_message
+from services.token_budget import record_actual
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Prometheus metrics
+ENRICHMENT_BUDGET = Counter(
+    'konqer_api_enrichment_budget_total',
+    'Enrichments that finished within their latency budget, ran past it or failed',
+    ['service', 'result']
+)
+ENRICHMENT_DURATION = Histogram(
+    'konqer_api_enrichment_duration_seconds',
+    'Time generations waited for enrichment',
+    ['service'],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 0.8, 1, 2, 5, 10)
+)
+PERSONALIZATION_SCORE = Histogram(
+    'konqer_api_personalization_score',
+    'Personalization score of generated messages, by whether enrichment completed',
+    ['service', 'enrichment'],
+    buckets=(10, 20, 30, 40, 50, 60, 70, 80, 90, 100)
+)
+
+# Enrichments in flight, kept referenced until they finish
+_background_enrichments: Set[asyncio.Future] = set()
+
+
+def _log_background_failure(enrichment: asyncio.Future) -> None:
+    # Retrieves the exception so it is logged once, not reported as
+    # never retrieved when the task is garbage collected
+    if not enrichment.cancelled() and enrichment.exception() is not None:
+        logger.warning(f"Background enrichment failed: {enrichment.exception()}")
+
+
+async def run_generation(
+    service: str,
+    prompt: str,
+    context: Dict[str, Any],
+    openai_service: OpenAIService,
+    apollo_service: ApolloService,
+    response_cache: ResponseCache,
+    config: Optional[ServiceConfigSnapshot],
+    prepared: bool = False
+) -> Dict[str, Any]:
+    """
+    Prepare context (unless already `prepared`, e.g. by prepare_contexts),
+    run the completion and score the output
+
+    Returns output, tokens_used, personalization_score (with its
+    per-factor breakdown) and the (possibly enriched) context.
+    """
+    enriched = True
+    if not prepared:
+        context, enriched = await prepare_context(service, context, apollo_service, config)
+    openai_request = openai_service.build_request(service, prompt, context, config)
+    result = await complete_generation(
+        service, openai_request, openai_service, response_cache, config
+    )
+
+    personalization_score, personalization_factors = score_generation(
+        service, result["output"], context, enriched
+    )
+
+    return {
+        "output": result["output"],
+        "tokens_used": result["tokens_used"],
+        "personalization_score": personalization_score,
+        "personalization_factors": personalization_factors,
+        "context": context
+    }
+
+
+async def complete_generation(
+    service: str,
+    openai_request: Dict[str, Any],
+    openai_service: OpenAIService,
+    response_cache: ResponseCache,
+    config: Optional[ServiceConfigSnapshot]
+) -> Dict[str, Any]:
+    """
+    Run the upstream completion, served from the response cache when the
+    service opts in and coalesced with identical in-flight calls
+
+    Only the caller that actually reached OpenAI reports tokens_used;
+    cache hits and coalesced callers report 0.
+    """
+    fingerprint = openai_service.fingerprint(service, openai_request)
+    cache_ttl = response_cache.ttl_for(config)
+
+    if cache_ttl:
+        cached = await response_cache.get(fingerprint, service)
+        if cached is not None:
+            return {**cached, "tokens_used": 0}
+
+    deadline = openai_service.deadline_for(service, config)
+    result, shared = await completion_flight.do(
+        fingerprint, lambda: openai_service.complete(openai_request, deadline)
+    )
+    if shared:
+        return {**result, "tokens_used": 0}
+
+    record_actual(service, openai_request, result.get("prompt_tokens"))
+
+    if cache_ttl:
+        await response_cache.set(fingerprint, result, cache_ttl)
+
+    return result
+
+
+async def prepare_context(
+    service: str,
+    context: Dict[str, Any],
+    apollo_service: ApolloService,
+    config: Optional[ServiceConfigSnapshot] = None
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    Service-specific context preparation before generation
+
+    Enrichment gets the service's latency budget; when it runs out the
+    original context is used and enrichment finishes in the background
+    (warming the enrichment cache for the next request). A failed
+    enrichment is logged and treated the same way.
+
+    Returns the context and whether enrichment completed.
+    """
+    if service != "cold-dm":
+        return context, True
+
+    # Enrich context with Apollo (on a copy: it may finish after we return)
+    budget = enrichment_budget(config)
+    started = time.monotonic()
+    enrichment = asyncio.ensure_future(apollo_service.enrich_profile(dict(context)))
+    _background_enrichments.add(enrichment)
+    enrichment.add_done_callback(_background_enrichments.discard)
+    try:
+        await asyncio.wait({enrichment}, timeout=budget)
+    finally:
+        if not enrichment.done():
+            # Left to finish in the background (budget exceeded or we
+            # were cancelled)
+            enrichment.add_done_callback(_log_background_failure)
+    ENRICHMENT_DURATION.labels(service=service).observe(time.monotonic() - started)
+
+    if not enrichment.done():
+        ENRICHMENT_BUDGET.labels(service=service, result="exceeded").inc()
+        logger.info(f"Enrichment exceeded its {budget:.2f}s budget for {service}, generating without it")
+        return context, False
+
+    try:
+        enriched = enrichment.result()
+    except Exception as e:
+        ENRICHMENT_BUDGET.labels(service=service, result="failed").inc()
+        logger.warning(f"Enrichment failed for {service}, generating without it: {e}")
+        return context, False
+
+    ENRICHMENT_BUDGET.labels(service=service, result="within_budget").inc()
+    return enriched, True
+
+
+def enrichment_budget(config: Optional[ServiceConfigSnapshot]) -> Optional[float]:
+    """
+    Seconds generation waits for enrichment (None = no limit)
+
+    ServiceConfig.config["enrichment_budget_ms"] overrides
+    ENRICHMENT_BUDGET_MS; 0 disables the budget.
+    """
+    budget_ms = settings.ENRICHMENT_BUDGET_MS
+    if config is not None and config.config.get("enrichment_budget_ms") is not None:
+        budget_ms = config.config["enrichment_budget_ms"]
+    return budget_ms / 1000 if budget_ms else None
+
+
+def score_generation(
+    service: str,
+    output: str,
+    context: Dict[str, Any],
+    enriched: bool
+) -> Tuple[Optional[float], Optional[Dict[str, float]]]:
+    """
+    Personalization score and factors (cold-dm only), recorded by
+    whether enrichment completed
+    """
+    if service != "cold-dm":
+        return None, None
+
+    scored = score_message(output, context)
+    PERSONALIZATION_SCORE.labels(
+        service=service, enrichment="complete" if enriched else "partial"
+    ).observe(scored.score)
+    return scored.score, scored.factors
+
+
+async def prepare_contexts(
+    service: str,
+    contexts: List[Dict[str, Any]],
+    apollo_service: ApolloService
+) -> List[Dict[str, Any]]:
+    """
+    prepare_context for a whole batch (cold-dm uses Apollo bulk match)
+    """
+    if service == "cold-dm":
+        return await apollo_service.enrich_profiles(contexts)
+
+    return contexts
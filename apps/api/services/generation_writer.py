@@ -0,0 +1,171 @@
+"""
+Generation Writer - optional write-behind buffer for Generation rows
+Requests enqueue fully-formed rows (client-side id and created_at) and
+return immediately; a background flusher bulk-inserts them every
+GENERATION_FLUSH_INTERVAL_MS or GENERATION_FLUSH_ROWS rows, whichever
+comes first. The queue is bounded and drained on shutdown.
+"""
+from datetime import datetime
+from fastapi import Request
+from prometheus_client import Counter, Gauge
+from sqlalchemy import insert
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import uuid
+import logging
+
+from models.database import async_session, Generation
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Prometheus metrics
+GENERATION_WRITES = Counter(
+    'konqer_api_generation_writes_total',
+    'Generation rows written by the write-behind buffer',
+    ['result']
+)
+GENERATION_WRITE_QUEUE = Gauge(
+    'konqer_api_generation_write_queue_depth',
+    'Generation rows waiting to be flushed'
+)
+
+FLUSH_ATTEMPTS = 3
+
+_STOP = object()
+
+
+def generation_row(
+    user_id: Any,
+    service: str,
+    prompt: str,
+    output: str,
+    tokens_used: Optional[int],
+    personalization_score: Optional[float],
+    metadata: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Build a Generation row with its id and timestamp assigned up front
+    """
+    return {
+        "id": uuid.uuid4(),
+        "user_id": user_id,
+        "service": service,
+        "prompt": prompt,
+        "output": output,
+        "tokens_used": tokens_used,
+        "personalization_score": personalization_score,
+        "metadata": metadata,
+        "created_at": datetime.now()
+    }
+
+
+class GenerationWriter:
+    def __init__(
+        self,
+        max_queue: int = settings.GENERATION_WRITE_QUEUE_SIZE,
+        flush_rows: int = settings.GENERATION_FLUSH_ROWS,
+        flush_interval: float = settings.GENERATION_FLUSH_INTERVAL_MS / 1000
+    ):
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    async def add(self, row: Dict[str, Any]) -> None:
+        """
+        Queue a row for insertion; waits for space when the buffer is full
+        """
+        if self._closed:
+            # Flusher already drained; write through
+            await self._flush([row])
+            return
+        await self._queue.put(row)
+        GENERATION_WRITE_QUEUE.set(self._queue.qsize())
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+        logger.info("✅ Generation write-behind buffer started")
+
+    async def stop(self) -> None:
+        """
+        Flush everything still queued, then stop the flusher
+        """
+        if self._task is None:
+            return
+        self._closed = True
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+        logger.info("✅ Generation write-behind buffer drained")
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch, stopping = await self._collect()
+            if batch:
+                await self._flush(batch)
+
+        # Rows enqueued behind the stop marker
+        remaining = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not _STOP:
+                remaining.append(item)
+        for start in range(0, len(remaining), self.flush_rows):
+            await self._flush(remaining[start:start + self.flush_rows])
+        GENERATION_WRITE_QUEUE.set(0)
+
+    async def _collect(self) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Wait for the first row, then gather more until the batch is full
+        or the flush interval has passed
+        """
+        loop = asyncio.get_running_loop()
+        first = await self._queue.get()
+        if first is _STOP:
+            return [], True
+
+        batch = [first]
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.flush_rows:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+
+        GENERATION_WRITE_QUEUE.set(self._queue.qsize())
+        return batch, False
+
+    async def _flush(self, rows: List[Dict[str, Any]]) -> None:
+        for attempt in range(1, FLUSH_ATTEMPTS + 1):
+            try:
+                async with async_session() as session:
+                    await session.execute(insert(Generation), rows)
+                    await session.commit()
+                GENERATION_WRITES.labels(result="written").inc(len(rows))
+                return
+            except Exception as e:
+                logger.warning(f"Generation flush of {len(rows)} rows failed (attempt {attempt}): {e}")
+                if attempt < FLUSH_ATTEMPTS:
+                    await asyncio.sleep(0.5 * 2 ** (attempt - 1))
+
+        logger.error(f"Dropped {len(rows)} generation rows after {FLUSH_ATTEMPTS} attempts")
+        GENERATION_WRITES.labels(result="dropped").inc(len(rows))
+
+
+# ============================================
+# DEPENDENCY INJECTION
+# ============================================
+def get_generation_writer(request: Request) -> Optional[GenerationWriter]:
+    """
+    Dependency: write-behind buffer (None when GENERATION_WRITE_BEHIND is off)
+    """
+    return request.app.state.generation_writer
@@ -0,0 +1,116 @@
+"""
+Shared HTTP clients - pooled connections reused across requests
+Created once in the app lifespan and injected into routers as dependencies
+"""
+from fastapi import FastAPI, Request
+from openai import AsyncOpenAI
+from prometheus_client import Gauge
+import httpx
+import logging
+
+from config import settings
+from services.openai_service import OpenAIService
+from services.apollo_service import ApolloService
+
+logger = logging.getLogger(__name__)
+
+# Prometheus metrics
+HTTP_POOL_CONNECTIONS = Gauge(
+    'konqer_api_http_pool_connections',
+    'Connections held by shared outbound HTTP pools',
+    ['pool', 'state']
+)
+HTTP_POOL_MAX_CONNECTIONS = Gauge(
+    'konqer_api_http_pool_max_connections',
+    'Configured connection limit of shared outbound HTTP pools',
+    ['pool']
+)
+
+
+def create_http_client(timeout: float) -> httpx.AsyncClient:
+    """
+    Build an httpx client with the configured pool limits
+    """
+    return httpx.AsyncClient(
+        timeout=timeout,
+        http2=settings.HTTP2_ENABLED,
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=settings.HTTP_POOL_KEEPALIVE_EXPIRY
+        )
+    )
+
+
+def _count_connections(client: httpx.AsyncClient, state: str) -> int:
+    """
+    Count pooled connections by state (httpcore does not expose this publicly)
+    """
+    pool = getattr(client._transport, "_pool", None)
+    connections = getattr(pool, "connections", [])
+
+    if state == "idle":
+        return sum(1 for conn in connections if conn.is_idle())
+    return sum(1 for conn in connections if not conn.is_idle())
+
+
+def register_pool_metrics(name: str, client: httpx.AsyncClient) -> None:
+    """
+    Export pool utilisation of a shared client as gauges
+    """
+    for state in ("active", "idle"):
+        HTTP_POOL_CONNECTIONS.labels(pool=name, state=state).set_function(
+            lambda state=state: _count_connections(client, state)
+        )
+    HTTP_POOL_MAX_CONNECTIONS.labels(pool=name).set(settings.HTTP_POOL_MAX_CONNECTIONS)
+
+
+async def open_clients(app: FastAPI) -> None:
+    """
+    Create the process-wide clients (called from main.lifespan)
+    """
+    openai_http = create_http_client(timeout=60.0)
+    apollo_http = create_http_client(timeout=15.0)
+
+    register_pool_metrics("openai", openai_http)
+    register_pool_metrics("apollo", apollo_http)
+
+    app.state.openai_client = AsyncOpenAI(
+        api_key=settings.OPENAI_API_KEY,
+        base_url=settings.OPENAI_BASE_URL,
+        http_client=openai_http,
+        max_retries=0  # OpenAIService retries within its deadline budget
+    )
+    app.state.apollo_client = apollo_http
+
+    logger.info("✅ Shared HTTP clients created")
+
+
+async def close_clients(app: FastAPI) -> None:
+    """
+    Close the process-wide clients (called from main.lifespan)
+    """
+    await app.state.openai_client.close()
+    await app.state.apollo_client.aclose()
+
+    logger.info("✅ Shared HTTP clients closed")
+
+
+# ============================================
+# DEPENDENCY INJECTION
+# ============================================
+def get_openai_service(request: Request) -> OpenAIService:
+    """
+    Dependency: OpenAIService bound to the shared client and admission controller
+    """
+    return OpenAIService(
+        client=request.app.state.openai_client,
+        admission=request.app.state.admission_controller
+    )
+
+
+def get_apollo_service(request: Request) -> ApolloService:
+    """
+    Dependency: ApolloService bound to the shared client
+    """
+    return ApolloService(client=request.app.state.apollo_client)
@@ -0,0 +1,227 @@
+"""
+Idempotency - replay stored responses for retried requests
+Redis-backed with an in-process fallback
+
+The first request with a given Idempotency-Key reserves it, runs, and
+stores its JSON response for IDEMPOTENCY_TTL seconds. Retries replay the
+stored response; duplicates that arrive while the original is still
+running wait for it instead of starting a second one.
+"""
+from fastapi import HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
+from prometheus_client import Counter
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import time
+import logging
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Prometheus metrics
+IDEMPOTENCY_REQUESTS = Counter(
+    'konqer_api_idempotency_requests_total',
+    'Requests carrying an Idempotency-Key',
+    ['scope', 'result']
+)
+
+PENDING = "pending"
+DONE = "done"
+
+
+class IdempotencyKeyReused(Exception):
+    """The key was already used for a different request"""
+
+
+class IdempotencyKeyInProgress(Exception):
+    """The original request is still running after the wait timeout"""
+
+
+def request_fingerprint(payload: Any) -> str:
+    """
+    Stable hash of a request payload
+    """
+    data = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+class IdempotencyStore:
+    def __init__(self, redis_client=None):
+        self.redis = redis_client
+        self._memory: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._events: Dict[str, asyncio.Event] = {}
+
+    async def run(
+        self,
+        scope: str,
+        key: str,
+        fingerprint: str,
+        fn: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, bool]:
+        """
+        Run fn once per (scope, key); returns (response, replayed)
+        """
+        storage_key = f"idempotency:{scope}:{hashlib.sha256(key.encode()).hexdigest()}"
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+
+        while True:
+            if await self._reserve(storage_key, fingerprint):
+                break
+
+            record = await self._get(storage_key)
+            if record is None:
+                continue  # Released by a failed original, try to take it over
+
+            if record["fingerprint"] != fingerprint:
+                IDEMPOTENCY_REQUESTS.labels(scope=scope, result="mismatch").inc()
+                raise IdempotencyKeyReused()
+
+            if record["state"] == DONE:
+                IDEMPOTENCY_REQUESTS.labels(scope=scope, result="replayed").inc()
+                return record["response"], True
+
+            if time.monotonic() >= deadline:
+                IDEMPOTENCY_REQUESTS.labels(scope=scope, result="in_progress").inc()
+                raise IdempotencyKeyInProgress()
+
+            await self._wait(storage_key)
+
+        IDEMPOTENCY_REQUESTS.labels(scope=scope, result="executed").inc()
+        event = self._events.setdefault(storage_key, asyncio.Event())
+
+        try:
+            response = jsonable_encoder(await fn())
+        except BaseException:
+            await self._release(storage_key)
+            raise
+        else:
+            await self._set(
+                storage_key,
+                {"state": DONE, "fingerprint": fingerprint, "response": response},
+                settings.IDEMPOTENCY_TTL
+            )
+            return response, False
+        finally:
+            event.set()
+            self._events.pop(storage_key, None)
+
+    async def _reserve(self, storage_key: str, fingerprint: str) -> bool:
+        record = {"state": PENDING, "fingerprint": fingerprint}
+
+        if self.redis is not None:
+            try:
+                return bool(await self.redis.set(
+                    storage_key, json.dumps(record),
+                    nx=True, ex=settings.IDEMPOTENCY_LOCK_TTL
+                ))
+            except Exception as e:
+                logger.warning(f"Idempotency Redis reserve failed, using in-process fallback: {e}")
+
+        if self._memory_get(storage_key) is not None:
+            return False
+        self._prune()
+        self._memory[storage_key] = (time.monotonic() + settings.IDEMPOTENCY_LOCK_TTL, record)
+        return True
+
+    async def _get(self, storage_key: str) -> Optional[Dict[str, Any]]:
+        if self.redis is not None:
+            try:
+                raw = await self.redis.get(storage_key)
+                return json.loads(raw) if raw is not None else None
+            except Exception as e:
+                logger.warning(f"Idempotency Redis read failed, using in-process fallback: {e}")
+
+        return self._memory_get(storage_key)
+
+    async def _set(self, storage_key: str, record: Dict[str, Any], ttl: int) -> None:
+        if self.redis is not None:
+            try:
+                await self.redis.set(storage_key, json.dumps(record), ex=ttl)
+                return
+            except Exception as e:
+                logger.warning(f"Idempotency Redis write failed, using in-process fallback: {e}")
+
+        self._prune()
+        self._memory[storage_key] = (time.monotonic() + ttl, record)
+
+    async def _release(self, storage_key: str) -> None:
+        if self.redis is not None:
+            try:
+                await self.redis.delete(storage_key)
+            except Exception as e:
+                logger.warning(f"Idempotency Redis release failed: {e}")
+        self._memory.pop(storage_key, None)
+
+    async def _wait(self, storage_key: str) -> None:
+        """
+        Wait for the original: woken directly when it runs in this
+        process, otherwise polled
+        """
+        event = self._events.get(storage_key)
+        try:
+            if event is not None:
+                await asyncio.wait_for(event.wait(), timeout=settings.IDEMPOTENCY_POLL_INTERVAL * 10)
+            else:
+                await asyncio.sleep(settings.IDEMPOTENCY_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+    def _prune(self, max_entries: int = 10000) -> None:
+        if len(self._memory) >= max_entries:
+            now = time.monotonic()
+            self._memory = {k: v for k, v in self._memory.items() if v[0] >= now}
+
+    def _memory_get(self, storage_key: str) -> Optional[Dict[str, Any]]:
+        entry = self._memory.get(storage_key)
+        if entry is None:
+            return None
+        expires_at, record = entry
+        if expires_at < time.monotonic():
+            del self._memory[storage_key]
+            return None
+        return record
+
+
+async def run_idempotent(
+    store: IdempotencyStore,
+    idempotency_key: Optional[str],
+    scope: str,
+    payload: Any,
+    fn: Callable[[], Awaitable[Any]],
+    response: Response
+) -> Any:
+    """
+    Run an endpoint body under an optional Idempotency-Key header
+    """
+    if not idempotency_key:
+        return await fn()
+
+    if len(idempotency_key) > 255:
+        raise HTTPException(400, "Idempotency-Key must be at most 255 characters")
+
+    try:
+        result, replayed = await store.run(
+            scope, idempotency_key, request_fingerprint(payload), fn
+        )
+    except IdempotencyKeyReused:
+        raise HTTPException(422, "Idempotency-Key was already used for a different request")
+    except IdempotencyKeyInProgress:
+        raise HTTPException(409, "A request with this Idempotency-Key is still in progress")
+
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+
+    return result
+
+
+# ============================================
+# DEPENDENCY INJECTION
+# ============================================
+def get_idempotency_store(request: Request) -> IdempotencyStore:
+    """
+    Dependency: process-wide idempotency store
+    """
+    return request.app.state.idempotency_store
@@ -0,0 +1,298 @@
+"""
+Job Worker - runs queued generation jobs from the generation_jobs table
+Jobs are claimed with FOR UPDATE SKIP LOCKED, so any number of API pods
+and dedicated worker pods (worker.py) can process the same queue
+"""
+from datetime import datetime, timedelta
+from prometheus_client import Counter, Histogram
+from sqlalchemy import select, or_, and_
+from typing import Any, Dict, List, Optional
+import asyncio
+import hashlib
+import hmac
+import json
+import httpx
+import logging
+
+from models.database import async_session, Generation, GenerationJob
+from services.openai_service import OpenAIService
+from services.apollo_service import ApolloService
+from services.config_cache import ServiceConfigCache
+from services.response_cache import ResponseCache
+from services.rate_limiter import RateLimiter
+from services.generation import run_generation
+from services.circuit_breaker import CircuitOpenError
+from services.admission import AdmissionRejected
+from services.entitlements import lookup_plan
+from services.scheduler import Tenant, current_tenant
+from services.callback_urls import UnsafeCallbackURL, check_callback_url
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Prometheus metrics
+JOBS_PROCESSED = Counter(
+    'konqer_api_jobs_processed_total',
+    'Generation jobs processed by workers',
+    ['service', 'status']
+)
+JOB_QUEUE_WAIT = Histogram(
+    'konqer_api_job_queue_wait_seconds',
+    'Time between job creation and claim',
+    ['service']
+)
+
+
+def serialize_job(job: GenerationJob) -> Dict[str, Any]:
+    """
+    Public representation of a job (GET /jobs/{id} and callbacks)
+    """
+    return {
+        "id": str(job.id),
+        "service": job.service,
+        "status": job.status,
+        "result": job.result,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at
+    }
+
+
+class JobWorker:
+    def __init__(
+        self,
+        openai_service: OpenAIService,
+        apollo_service: ApolloService,
+        response_cache: ResponseCache,
+        config_cache: ServiceConfigCache,
+        limiter: RateLimiter,
+        concurrency: int = settings.JOB_WORKER_CONCURRENCY
+    ):
+        self.openai_service = openai_service
+        self.apollo_service = apollo_service
+        self.response_cache = response_cache
+        self.config_cache = config_cache
+        self.limiter = limiter
+        self.concurrency = concurrency
+        self._tasks: List[asyncio.Task] = []
+        self._callback_client: Optional[httpx.AsyncClient] = None
+
+    async def start(self) -> None:
+        # Redirects are not followed: they could lead to internal addresses
+        self._callback_client = httpx.AsyncClient(timeout=10.0, follow_redirects=False)
+        self._tasks = [
+            asyncio.create_task(self._run_loop(n))
+            for n in range(self.concurrency)
+        ]
+        logger.info(f"✅ Job worker started ({self.concurrency} slots)")
+
+    async def stop(self) -> None:
+        """
+        Stop claiming; running jobs are cancelled and later reclaimed
+        once their lock expires
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._callback_client:
+            await self._callback_client.aclose()
+
+    async def _run_loop(self, slot: int) -> None:
+        while True:
+            try:
+                job = await self.claim()
+            except Exception as e:
+                logger.error(f"Job claim failed (slot {slot}): {e}")
+                job = None
+
+            if job is None:
+                await asyncio.sleep(settings.JOB_POLL_INTERVAL)
+                continue
+
+            try:
+                await self.process(job)
+            except Exception:
+                logger.exception(f"Job {job.id} crashed (slot {slot})")
+                await self._release(job)
+
+    async def claim(self) -> Optional[GenerationJob]:
+        """
+        Claim the oldest queued job (or a running one whose lock expired)
+        """
+        now = datetime.now()
+        lock_cutoff = now - timedelta(seconds=settings.JOB_LOCK_TIMEOUT)
+
+        async with async_session() as session:
+            result = await session.execute(
+                select(GenerationJob)
+                .where(or_(
+                    GenerationJob.status == 'queued',
+                    and_(
+                        GenerationJob.status == 'running',
+                        GenerationJob.locked_at < lock_cutoff
+                    )
+                ))
+                .order_by(GenerationJob.created_at)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            )
+            job = result.scalar_one_or_none()
+
+            if job is None:
+                return None
+
+            if job.status == 'queued':
+                JOB_QUEUE_WAIT.labels(service=job.service).observe(
+                    (now - job.created_at).total_seconds()
+                )
+
+            job.status = 'running'
+            job.attempts = (job.attempts or 0) + 1
+            job.locked_at = now
+            job.started_at = job.started_at or now
+            await session.commit()
+
+        return job
+
+    async def process(self, job: GenerationJob) -> None:
+        """
+        Run a claimed job; no DB connection is held during the LLM call
+        """
+        if job.attempts > settings.JOB_MAX_ATTEMPTS:
+            await self._finish(job, error="Job exceeded maximum attempts")
+            return
+
+        try:
+            async with async_session() as session:
+                plan = await lookup_plan(session, job.user_id)
+        except Exception as e:
+            logger.warning(f"Plan lookup failed for job {job.id}: {e}")
+            plan = None
+        current_tenant.set(Tenant(user_id=str(job.user_id), plan=plan))
+
+        try:
+            result = await run_generation(
+                job.service, job.prompt, dict(job.context or {}),
+                self.openai_service, self.apollo_service,
+                self.response_cache, self.config_cache.get(job.service)
+            )
+        except (CircuitOpenError, AdmissionRejected) as e:
+            # Not the job's fault: hand it back and pause this slot
+            logger.warning(f"Job {job.id} requeued, {e}")
+            await self._requeue(job)
+            await asyncio.sleep(e.retry_after)
+            return
+        except Exception as e:
+            logger.error(f"Job {job.id} failed for {job.service}: {e}")
+            await self._finish(job, error=f"Generation failed: {str(e)}")
+            return
+
+        await self._finish(job, result=result)
+
+    async def _requeue(self, job: GenerationJob) -> None:
+        """
+        Return a claimed job to the queue without counting the attempt
+        """
+        async with async_session() as session:
+            job = await session.get(GenerationJob, job.id)
+            job.status = 'queued'
+            job.attempts = max(0, (job.attempts or 1) - 1)
+            job.locked_at = None
+            await session.commit()
+
+    async def _release(self, job: GenerationJob) -> None:
+        """
+        Hand a job that crashed mid-processing back to the queue
+
+        The attempt stays counted, so a job that keeps crashing is failed
+        once it exceeds JOB_MAX_ATTEMPTS. If even this fails (e.g. the
+        database is down) the job is reclaimed once its lock expires.
+        """
+        try:
+            async with async_session() as session:
+                job = await session.get(GenerationJob, job.id)
+                if job is not None and job.status == 'running':
+                    job.status = 'queued'
+                    job.locked_at = None
+                    await session.commit()
+        except Exception:
+            logger.exception(f"Could not release job {job.id}; it will be reclaimed after its lock expires")
+
+    async def _finish(
+        self,
+        job: GenerationJob,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None
+    ) -> None:
+        async with async_session() as session:
+            job = await session.get(GenerationJob, job.id)
+
+            if result is not None:
+                generation = Generation(
+                    user_id=job.user_id,
+                    service=job.service,
+                    prompt=job.prompt,
+                    output=result["output"],
+                    tokens_used=result["tokens_used"],
+                    personalization_score=result["personalization_score"],
+                    metadata=result["context"]
+                )
+                session.add(generation)
+                await session.flush()
+
+                job.status = 'succeeded'
+                job.generation_id = generation.id
+                job.result = {
+                    "id": str(generation.id),
+                    "service": job.service,
+                    "output": result["output"],
+                    "personalization_score": result["personalization_score"],
+                    "personalization_factors": result["personalization_factors"],
+                    "tokens_used": result["tokens_used"]
+                }
+            else:
+                job.status = 'failed'
+                job.error = error
+
+            job.finished_at = datetime.now()
+            job.locked_at = None
+            await session.commit()
+
+        if error is not None:
+            await self.limiter.refund(str(job.user_id), job.service)
+
+        JOBS_PROCESSED.labels(service=job.service, status=job.status).inc()
+
+        if job.callback_url:
+            await self._send_callback(job)
+
+    async def _send_callback(self, job: GenerationJob) -> None:
+        """
+        POST the finished job to its callback URL (best effort)
+
+        When JOB_CALLBACK_SECRET is set the body is signed with
+        HMAC-SHA256 in the X-Konqer-Signature header. The URL is checked
+        again before sending, in case its host now resolves elsewhere.
+        """
+        try:
+            await check_callback_url(job.callback_url)
+        except UnsafeCallbackURL as e:
+            logger.warning(f"Job {job.id} callback skipped: {e}")
+            return
+
+        body = json.dumps(serialize_job(job), default=str).encode()
+        headers = {"Content-Type": "application/json"}
+
+        if settings.JOB_CALLBACK_SECRET:
+            signature = hmac.new(
+                settings.JOB_CALLBACK_SECRET.encode(), body, hashlib.sha256
+            ).hexdigest()
+            headers["X-Konqer-Signature"] = f"sha256={signature}"
+
+        try:
+            response = await self._callback_client.post(job.callback_url, content=body, headers=headers)
+            if response.status_code >= 400:
+                logger.warning(f"Job {job.id} callback returned {response.status_code}")
+        except httpx.HTTPError as e:
+            logger.warning(f"Job {job.id} callback failed: {e}")
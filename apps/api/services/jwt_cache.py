@@ -0,0 +1,123 @@
+"""
+JWT Cache - verified access token claims, reused until the token expires
+Frontends present the same Keycloak token on every request; RS256
+signature verification is the largest CPU cost of cheap endpoints, so
+each token is verified once and its claims are kept in a bounded LRU
+keyed by the token's SHA-256 digest (raw tokens are never stored).
+
+Entries expire at the token's `exp`, and after JWT_CACHE_MAX_TTL at the
+latest. Rejected tokens are not cached.
+"""
+from collections import OrderedDict
+from jose import jwt
+from prometheus_client import Counter
+from typing import Any, Dict, Optional, Tuple
+import hashlib
+import time
+import logging
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Prometheus metrics
+JWT_VERIFICATIONS = Counter(
+    'konqer_api_jwt_verifications_total',
+    'Access token checks (cached, verified, rejected)',
+    ['result']
+)
+
+
+class TokenCache:
+    def __init__(
+        self,
+        public_key: str = settings.JWT_PUBLIC_KEY,
+        algorithm: str = settings.JWT_ALGORITHM,
+        audience: Optional[str] = settings.KEYCLOAK_CLIENT_ID,
+        max_entries: int = settings.JWT_CACHE_SIZE,
+        max_ttl: int = settings.JWT_CACHE_MAX_TTL
+    ):
+        self.public_key = public_key
+        self.algorithm = algorithm
+        self.audience = audience
+        self.max_entries = max_entries
+        self.max_ttl = max_ttl
+        self._entries: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        """
+        Claims of a valid token, verifying its signature only on a cache miss
+
+        Raises JWTError for invalid or expired tokens.
+        """
+        digest = hashlib.sha256(token.encode()).digest()
+        entry = self._entries.get(digest)
+        if entry is not None:
+            expires_at, claims = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(digest)
+                JWT_VERIFICATIONS.labels(result="cached").inc()
+                return claims
+            del self._entries[digest]
+
+        try:
+            claims = jwt.decode(
+                token,
+                self.public_key,
+                algorithms=[self.algorithm],
+                audience=self.audience
+            )
+        except Exception:
+            JWT_VERIFICATIONS.labels(result="rejected").inc()
+            raise
+
+        JWT_VERIFICATIONS.labels(result="verified").inc()
+        if isinstance(claims.get("exp"), (int, float)):
+            self._store(digest, min(claims["exp"], time.time() + self.max_ttl), claims)
+        return claims
+
+    def _store(self, digest: bytes, expires_at: float, claims: Dict[str, Any]) -> None:
+        self._entries[digest] = (expires_at, claims)
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+# Process-wide cache used by get_current_user
+jwt_cache = TokenCache()
+
+
+if __name__ == "__main__":
+    # Micro-benchmark: python -m services.jwt_cache
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    import timeit
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption()
+    ).decode()
+    public_pem = key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+
+    token = jwt.encode(
+        {"sub": "bench-user", "aud": "bench", "exp": int(time.time()) + 3600, "email": "bench@example.com"},
+        private_pem,
+        algorithm="RS256"
+    )
+    cache = TokenCache(public_key=public_pem, algorithm="RS256", audience="bench")
+
+    runs = 2000
+    seconds = timeit.timeit(
+        lambda: jwt.decode(token, public_pem, algorithms=["RS256"], audience="bench"),
+        number=runs
+    )
+    print(f"jwt.decode (RS256): {seconds / runs * 1e6:.1f} µs/request")
+
+    cache.decode(token)
+    seconds = timeit.timeit(lambda: cache.decode(token), number=runs * 10)
+    print(f"TokenCache.decode (cached): {seconds / (runs * 10) * 1e6:.1f} µs/request")
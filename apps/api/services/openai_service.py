@@ -1,18 +1,102 @@
 """
 OpenAI Service - GPT-4o integration for all 12 services
 """
-from openai import AsyncOpenAI
-from typing import Dict, Any, Optional
+from openai import (
+    AsyncOpenAI, APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+)
+from prometheus_client import Counter
+from typing import Dict, Any, Optional, AsyncIterator, Awaitable, Callable, TypeVar
 from config import settings
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError, openai_breaker
+from services.admission import AdmissionController
+from services.scheduler import FairScheduler, SlotTimeout, llm_scheduler, llm_stream_scheduler
+from services.token_budget import fit_request, prompt_tokens_of, trim_context
+import asyncio
+import hashlib
+import json
+import random
+import time
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Prometheus metrics
+OPENAI_RETRIES = Counter(
+    'konqer_api_openai_retries_total',
+    'OpenAI calls retried after a transient failure',
+    ['reason']
+)
+
+# Failures worth retrying and counted against the circuit breaker;
+# anything else (bad request, auth) is the caller's problem
+TRANSIENT_ERRORS = (
+    APIConnectionError,  # Includes APITimeoutError
+    RateLimitError,
+    InternalServerError,
+    asyncio.TimeoutError
+)
+
+T = TypeVar("T")
+
+
+def _usage_counts(usage: Any) -> Dict[str, int]:
+    # Extra chunk fields are plain dicts in this SDK version, typed
+    # objects in later ones
+    if not isinstance(usage, dict):
+        usage = usage.model_dump()
+    return {
+        "prompt_tokens": usage.get("prompt_tokens") or 0,
+        "total_tokens": usage.get("total_tokens") or 0
+    }
+
+
+class DeadlineExceeded(Exception):
+    """
+    Raised when a completion could not finish within its deadline budget
+    """
+
 
 class OpenAIService:
-    def __init__(self):
-        self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+    def __init__(
+        self,
+        client: Optional[AsyncOpenAI] = None,
+        breaker: CircuitBreaker = openai_breaker,
+        admission: Optional[AdmissionController] = None,
+        scheduler: FairScheduler = llm_scheduler,
+        stream_scheduler: FairScheduler = llm_stream_scheduler
+    ):
+        # Prefer the shared client from the app lifespan; a standalone
+        # client is only created for scripts and one-off callers
+        self.client = client or AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL,
+            max_retries=0  # Retries are budgeted in _call
+        )
         self.model = settings.OPENAI_MODEL
+        self.breaker = breaker
+        self.admission = admission
+        self.scheduler = scheduler
+        self.stream_scheduler = stream_scheduler
+
+    @staticmethod
+    def estimate_tokens(request: Dict[str, Any]) -> int:
+        """
+        Token cost of a request for admission control: prompt tokens
+        (counted locally, once per request) plus the completion allowance
+        """
+        return prompt_tokens_of(request) + int(request.get("max_tokens") or 0)
+
+    @staticmethod
+    def deadline_for(service: str, config=None) -> float:
+        """
+        Total time budget (seconds, retries included) for one completion
+
+        ServiceConfig.config["deadline_seconds"] overrides the
+        OPENAI_SERVICE_DEADLINES / OPENAI_DEADLINE_SECONDS defaults.
+        """
+        if config is not None and config.config.get("deadline_seconds"):
+            return float(config.config["deadline_seconds"])
+        return settings.OPENAI_SERVICE_DEADLINES.get(service, settings.OPENAI_DEADLINE_SECONDS)
 
     async def generate_cold_dm(
         self,
@@ -33,33 +117,12 @@ class OpenAIService:
                 "interests": [...]
             }
         """
-        prompt = self._build_cold_dm_prompt(context)
-
-        response = await self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": """You are a world-class B2B sales expert specializing in cold outreach.
-Your messages are concise (max 150 words), highly personalized, and focus on value.
-You always reference specific details about the prospect's work or company.
-You never use generic templates or salesy language."""
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=temperature,
-            max_tokens=300
-        )
-
-        message = response.choices[0].message.content
-        tokens_used = response.usage.total_tokens
+        request = self._cold_dm_request(context, temperature)
+        result = await self.complete(request)
 
         return {
-            "message": message,
-            "tokens_used": tokens_used,
+            "message": result["output"],
+            "tokens_used": result["tokens_used"],
             "model": self.model
         }
 
@@ -82,6 +145,289 @@ You never use generic templates or salesy language."""
             }
             framework: "Cost vs Value" or "Urgency Creation"
         """
+        request = self._objection_request(objection, context, framework)
+        result = await self.complete(request)
+
+        return {
+            "response": result["output"],
+            "tokens_used": result["tokens_used"],
+            "framework_used": framework
+        }
+
+    async def generate_carousel(
+        self,
+        topic: str,
+        target_audience: str,
+        slides_count: int = 10
+    ) -> Dict[str, Any]:
+        """
+        Generate LinkedIn carousel structure
+        """
+        request = self._carousel_request(topic, target_audience, slides_count)
+        result = await self.complete(request)
+
+        return {
+            "carousel_structure": result["output"],
+            "tokens_used": result["tokens_used"]
+        }
+
+    async def generate_generic(
+        self,
+        service: str,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 1000
+    ) -> Dict[str, Any]:
+        """
+        Generic generation endpoint for other services
+        """
+        request = self._generic_request(prompt, system_prompt, temperature, max_tokens)
+        return await self.complete(request)
+
+    def build_request(
+        self,
+        service: str,
+        prompt: str,
+        context: Dict[str, Any],
+        config=None
+    ) -> Dict[str, Any]:
+        """
+        Build chat completion parameters for a service
+
+        Used by the generate endpoints so the same request can be sent
+        either as a single completion or as a stream. Low-value context is
+        trimmed first and max_tokens is sized from the service config;
+        raises RequestTooLarge if the prompt exceeds its token budget.
+        """
+        request = self._build_request(service, prompt, trim_context(context))
+        return fit_request(service, request, config)
+
+    def _build_request(
+        self,
+        service: str,
+        prompt: str,
+        context: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        if service == "cold-dm":
+            return self._cold_dm_request(context)
+
+        if service == "objection":
+            return self._objection_request(
+                objection=prompt,
+                context=context,
+                framework=context.get("framework", "Cost vs Value")
+            )
+
+        if service == "carousel":
+            return self._carousel_request(
+                topic=prompt,
+                target_audience=context.get("target_audience", "B2B professionals")
+            )
+
+        # Generic generation for other services
+        return self._generic_request(
+            prompt=prompt,
+            system_prompt=context.get("system_prompt")
+        )
+
+    def fingerprint(self, service: str, request: Dict[str, Any]) -> str:
+        """
+        Hash of everything that determines a completion built by build_request
+
+        The messages already contain the system prompt, the prompt and the
+        context fields the service actually uses, so context keys that do
+        not reach the model do not change the fingerprint.
+        """
+        payload = json.dumps(
+            {
+                "service": service,
+                "model": self.model,
+                "messages": request["messages"],
+                "temperature": request.get("temperature"),
+                "max_tokens": request.get("max_tokens")
+            },
+            sort_keys=True,
+            separators=(",", ":")
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    async def complete(self, request: Dict[str, Any], deadline: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Run a chat completion built by build_request within `deadline`
+        seconds (default OPENAI_DEADLINE_SECONDS)
+        """
+        tokens = self.estimate_tokens(request)
+        budget = settings.OPENAI_DEADLINE_SECONDS if deadline is None else deadline
+        expires_at = time.monotonic() + budget
+
+        try:
+            async with self.scheduler.slot(tokens, timeout=budget):
+                response = await self._call(
+                    lambda timeout: self.client.chat.completions.create(
+                        model=self.model,
+                        timeout=timeout,
+                        **request
+                    ),
+                    expires_at,
+                    budget,
+                    tokens
+                )
+        except SlotTimeout:
+            raise DeadlineExceeded(f"OpenAI call exceeded its {budget:.0f}s deadline")
+
+        return {
+            "output": response.choices[0].message.content,
+            "tokens_used": response.usage.total_tokens,
+            "prompt_tokens": response.usage.prompt_tokens,
+            "model": self.model
+        }
+
+    async def stream(
+        self,
+        request: Dict[str, Any],
+        deadline: Optional[float] = None,
+        usage: Optional[Dict[str, int]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream a chat completion built by build_request, yielding text deltas
+
+        The deadline and retries cover opening the stream; once tokens
+        flow, the client timeout bounds each read. The slot, from the
+        separate stream scheduler, is held until the stream ends.
+
+        `usage`, if given, is filled with the prompt_tokens and
+        total_tokens reported in the final chunk.
+        """
+        tokens = self.estimate_tokens(request)
+        budget = settings.OPENAI_DEADLINE_SECONDS if deadline is None else deadline
+        expires_at = time.monotonic() + budget
+
+        try:
+            async with self.stream_scheduler.slot(tokens, timeout=budget):
+                response = await self._call(
+                    lambda timeout: self.client.chat.completions.create(
+                        model=self.model,
+                        stream=True,
+                        timeout=timeout,
+                        # Usage arrives in a final chunk without choices
+                        # (no stream_options parameter in this SDK version)
+                        extra_body={"stream_options": {"include_usage": True}},
+                        **request
+                    ),
+                    expires_at,
+                    budget,
+                    tokens
+                )
+
+                try:
+                    async for chunk in response:
+                        chunk_usage = getattr(chunk, "usage", None)
+                        if chunk_usage and usage is not None:
+                            usage.update(_usage_counts(chunk_usage))
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content
+                        if delta:
+                            yield delta
+                finally:
+                    # Return the pooled connection even when the caller
+                    # stops early (client disconnect closes this generator)
+                    await response.response.aclose()
+        except SlotTimeout:
+            raise DeadlineExceeded(f"OpenAI call exceeded its {budget:.0f}s deadline")
+
+    async def _call(
+        self,
+        fn: Callable[[float], Awaitable[T]],
+        expires_at: float,
+        budget: float,
+        tokens: int = 0
+    ) -> T:
+        """
+        Call OpenAI through admission control and the circuit breaker,
+        retrying transient failures with jittered exponential backoff
+        until `expires_at` (monotonic clock)
+        """
+        attempt = 0
+
+        while True:
+            remaining = expires_at - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceeded(f"OpenAI call exceeded its {budget:.0f}s deadline")
+
+            if self.admission is not None:
+                # Don't queue for capacity while the circuit is open anyway
+                retry_after = self.breaker.retry_after()
+                if retry_after is not None:
+                    raise CircuitOpenError(self.breaker.name, retry_after)
+                # Queueing spends the same deadline budget
+                await self.admission.acquire(tokens, max_wait=remaining)
+                remaining = expires_at - time.monotonic()
+                if remaining <= 0:
+                    raise DeadlineExceeded(f"OpenAI call exceeded its {budget:.0f}s deadline")
+
+            self.breaker.before_call()
+            try:
+                result = await asyncio.wait_for(fn(remaining), remaining)
+            except TRANSIENT_ERRORS as e:
+                self.breaker.record_failure()
+                error = e
+            except Exception:
+                # Upstream answered; the request itself was rejected
+                self.breaker.record_success()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+
+            # Full jitter: sleep a random fraction of the exponential step
+            delay = random.uniform(0, min(
+                settings.OPENAI_RETRY_MAX_DELAY,
+                settings.OPENAI_RETRY_BASE_DELAY * 2 ** attempt
+            ))
+            remaining = expires_at - time.monotonic()
+            if attempt >= settings.OPENAI_MAX_RETRIES or delay >= remaining:
+                if isinstance(error, (asyncio.TimeoutError, APITimeoutError)):
+                    raise DeadlineExceeded(f"OpenAI call exceeded its {budget:.0f}s deadline") from error
+                raise error
+
+            attempt += 1
+            OPENAI_RETRIES.labels(reason=type(error).__name__).inc()
+            logger.warning(f"OpenAI call failed ({type(error).__name__}), retry {attempt} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    def _cold_dm_request(
+        self,
+        context: Dict[str, Any],
+        temperature: float = 0.7
+    ) -> Dict[str, Any]:
+        prompt = self._build_cold_dm_prompt(context)
+
+        return {
+            "messages": [
+                {
+                    "role": "system",
+                    "content": """You are a world-class B2B sales expert specializing in cold outreach.
+Your messages are concise (max 150 words), highly personalized, and focus on value.
+You always reference specific details about the prospect's work or company.
+You never use generic templates or salesy language."""
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "temperature": temperature,
+            "max_tokens": 300
+        }
+
+    def _objection_request(
+        self,
+        objection: str,
+        context: Dict[str, Any],
+        framework: str
+    ) -> Dict[str, Any]:
         prompt = f"""Generate a sales objection handling response using the {framework} framework.
 
 **Objection:** "{objection}"
@@ -100,9 +446,8 @@ You never use generic templates or salesy language."""
 
 Generate the response (200-250 words):"""
 
-        response = await self.client.chat.completions.create(
-            model=self.model,
-            messages=[
+        return {
+            "messages": [
                 {
                     "role": "system",
                     "content": "You are a sales objection handling expert. Your responses follow proven sales frameworks and focus on value demonstration."
@@ -112,25 +457,16 @@ Generate the response (200-250 words):"""
                     "content": prompt
                 }
             ],
-            temperature=0.6,
-            max_tokens=400
-        )
-
-        return {
-            "response": response.choices[0].message.content,
-            "tokens_used": response.usage.total_tokens,
-            "framework_used": framework
+            "temperature": 0.6,
+            "max_tokens": 400
         }
 
-    async def generate_carousel(
+    def _carousel_request(
         self,
         topic: str,
         target_audience: str,
         slides_count: int = 10
     ) -> Dict[str, Any]:
-        """
-        Generate LinkedIn carousel structure
-        """
         prompt = f"""Create a {slides_count}-slide LinkedIn carousel about: {topic}
 
 Target Audience: {target_audience}
@@ -148,9 +484,8 @@ Format as JSON array:
 
 Make it engaging, actionable, and viral-worthy."""
 
-        response = await self.client.chat.completions.create(
-            model=self.model,
-            messages=[
+        return {
+            "messages": [
                 {
                     "role": "system",
                     "content": "You are a LinkedIn viral content expert. Create carousel structures that maximize engagement."
@@ -160,26 +495,17 @@ Make it engaging, actionable, and viral-worthy."""
                     "content": prompt
                 }
             ],
-            temperature=0.8,
-            max_tokens=1500
-        )
-
-        return {
-            "carousel_structure": response.choices[0].message.content,
-            "tokens_used": response.usage.total_tokens
+            "temperature": 0.8,
+            "max_tokens": 1500
         }
 
-    async def generate_generic(
+    def _generic_request(
         self,
-        service: str,
         prompt: str,
         system_prompt: Optional[str] = None,
         temperature: float = 0.7,
         max_tokens: int = 1000
     ) -> Dict[str, Any]:
-        """
-        Generic generation endpoint for other services
-        """
         messages = []
 
         if system_prompt:
@@ -187,17 +513,10 @@ Make it engaging, actionable, and viral-worthy."""
 
         messages.append({"role": "user", "content": prompt})
 
-        response = await self.client.chat.completions.create(
-            model=self.model,
-            messages=messages,
-            temperature=temperature,
-            max_tokens=max_tokens
-        )
-
         return {
-            "output": response.choices[0].message.content,
-            "tokens_used": response.usage.total_tokens,
-            "model": self.model
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens
         }
 
     def _build_cold_dm_prompt(self, context: Dict[str, Any]) -> str:
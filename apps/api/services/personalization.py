@@ -0,0 +1,180 @@
+"""
+Personalization Scorer - how specifically a cold DM addresses its prospect
+All name, company, activity, tech stack and generic-phrase patterns are
+compiled into one Aho-Corasick automaton, so each message is lower-cased
+once and scanned in a single pass.
+"""
+from collections import deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, Hashable, Iterable, List, Set, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Factor weights
+NAME_WEIGHT = 20
+COMPANY_WEIGHT = 15
+ACTIVITY_WEIGHT = 30
+TECH_STACK_WEIGHT = 20
+GENERIC_PHRASE_PENALTY = -10
+
+ACTIVITY_KEYWORDS = 5  # Leading words of each activity summary that count as a reference
+
+GENERIC_PHRASES = (
+    "i hope this message finds you well",
+    "i came across your profile",
+    "quick question",
+    "touching base"
+)
+
+
+class AhoCorasick:
+    """
+    Multi-pattern substring matcher; search() reports the tags of every
+    pattern that occurs in the text
+    """
+    def __init__(self, patterns: Iterable[Tuple[str, Hashable]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Hashable]] = [[]]
+
+        for pattern, tag in patterns:
+            if not pattern:
+                continue
+            node = 0
+            for ch in pattern:
+                child = self._goto[node].get(ch)
+                if child is None:
+                    child = len(self._goto)
+                    self._goto[node][ch] = child
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = child
+            self._out[node].append(tag)
+
+        # Breadth-first failure links; each state also reports the
+        # patterns of its longest proper suffix state
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                state = self._fail[node]
+                while state and ch not in self._goto[state]:
+                    state = self._fail[state]
+                target = self._goto[state].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                if self._out[self._fail[child]]:
+                    self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def search(self, text: str) -> Set[Hashable]:
+        goto, fail, out = self._goto, self._fail, self._out
+        found: Set[Hashable] = set()
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found.update(out[node])
+        return found
+
+
+@dataclass
+class PersonalizationScore:
+    score: float
+    factors: Dict[str, float] = field(default_factory=dict)
+
+
+@lru_cache(maxsize=1024)
+def _automaton(patterns: Tuple[Tuple[str, Tuple[str, str]], ...]) -> AhoCorasick:
+    return AhoCorasick(patterns)
+
+
+def _context_patterns(context: Dict[str, Any]) -> Tuple[Tuple[str, Tuple[str, str]], ...]:
+    """
+    Lower-cased patterns for one prospect, tagged (factor, pattern)
+    """
+    patterns: List[Tuple[str, Tuple[str, str]]] = []
+
+    name_parts = str(context.get("name") or "").split()
+    if name_parts:
+        first_name = name_parts[0].lower()
+        patterns.append((first_name, ("name", first_name)))
+
+    company = str(context.get("company") or "").lower()
+    if company:
+        patterns.append((company, ("company", company)))
+
+    for activity in context.get("recent_activity") or []:
+        summary = str(activity.get("summary") or "") if isinstance(activity, dict) else ""
+        for keyword in summary.lower().split()[:ACTIVITY_KEYWORDS]:
+            patterns.append((keyword, ("activity", keyword)))
+
+    for tech in context.get("tech_stack") or []:
+        tech = str(tech).lower()
+        if tech:
+            patterns.append((tech, ("tech_stack", tech)))
+
+    for phrase in GENERIC_PHRASES:
+        patterns.append((phrase, ("generic_phrases", phrase)))
+
+    # Sorted so equal contexts share one cached automaton
+    return tuple(sorted(set(patterns)))
+
+
+def score_message(message: str, context: Dict[str, Any]) -> PersonalizationScore:
+    """
+    Score one message (0-100) with its per-factor breakdown
+    """
+    matched = _automaton(_context_patterns(context)).search(message.lower())
+    factors_hit = {factor for factor, _ in matched}
+    generic_hits = sum(1 for factor, _ in matched if factor == "generic_phrases")
+
+    factors = {
+        "name": NAME_WEIGHT if "name" in factors_hit else 0,
+        "company": COMPANY_WEIGHT if "company" in factors_hit else 0,
+        "activity": ACTIVITY_WEIGHT if "activity" in factors_hit else 0,
+        "tech_stack": TECH_STACK_WEIGHT if "tech_stack" in factors_hit else 0,
+        "generic_phrases": GENERIC_PHRASE_PENALTY * generic_hits
+    }
+    score = float(max(0, min(100, sum(factors.values()))))
+    return PersonalizationScore(score=score, factors=factors)
+
+
+def score_batch(pairs: Iterable[Tuple[str, Dict[str, Any]]]) -> List[PersonalizationScore]:
+    """
+    Score many (message, context) pairs; automata are shared between
+    pairs whose contexts produce the same patterns
+    """
+    return [score_message(message, context) for message, context in pairs]
+
+
+if __name__ == "__main__":
+    # Micro-benchmark: python -m services.personalization
+    import timeit
+
+    sample_context = {
+        "name": "Jordan Lee",
+        "company": "Acme Analytics",
+        "recent_activity": [
+            {"summary": "Launched a new self-serve analytics dashboard for finance teams"},
+            {"summary": "Spoke at DataConf about warehouse cost control"}
+        ],
+        "tech_stack": ["Snowflake", "dbt", "Looker", "Airflow"]
+    }
+    sample_message = (
+        "Hi Jordan - saw Acme just launched the self-serve dashboard. "
+        "Teams running Snowflake and dbt usually hit the same warehouse cost "
+        "wall we helped solve for others. Worth a quick chat? "
+    ) * 4
+
+    runs = 20000
+    seconds = timeit.timeit(lambda: score_message(sample_message, sample_context), number=runs)
+    print(f"score_message: {seconds / runs * 1e6:.1f} µs/message ({len(sample_message)} chars)")
+
+    batch = [(sample_message, dict(sample_context, name=f"Lead {i}")) for i in range(1000)]
+    seconds = timeit.timeit(lambda: score_batch(batch), number=5)
+    print(f"score_batch: {seconds / 5 / len(batch) * 1e6:.1f} µs/message (1000 distinct contexts)")
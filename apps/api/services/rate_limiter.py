@@ -0,0 +1,342 @@
+"""
+Rate Limiter - daily/monthly quotas and burst token buckets per (user, service)
+Redis-backed (atomic Lua scripts) with an in-process fallback
+
+Usage is kept as one bucket per day in a hash, together with a running
+total over the sliding monthly window. Expired day buckets are subtracted
+from the total as the window moves, so daily and monthly limits are both
+checked with a single lookup instead of a COUNT over generations.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from fastapi import Request
+from prometheus_client import Counter
+from typing import Any, Dict, Optional, Tuple
+import math
+import time
+import logging
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Prometheus metrics
+RATE_LIMIT_DECISIONS = Counter(
+    'konqer_api_rate_limit_decisions_total',
+    'Rate limit decisions on generation requests',
+    ['service', 'result']
+)
+
+# retry_after_ms sentinels returned by the scripts
+DAILY_EXCEEDED = -1
+MONTHLY_EXCEEDED = -2
+
+# KEYS[1] = usage hash (day buckets + 'first' + 'total'), KEYS[2] = burst bucket
+# ARGV = daily_limit, monthly_limit, window_days, today, burst_capacity,
+#        refill_per_second, now, cost (generations to consume, 0 = read usage only)
+# Returns {allowed, daily_count, monthly_count, retry_after_ms}
+HIT_SCRIPT = """
+local daily_limit = tonumber(ARGV[1])
+local monthly_limit = tonumber(ARGV[2])
+local window_days = tonumber(ARGV[3])
+local today = tonumber(ARGV[4])
+local capacity = tonumber(ARGV[5])
+local refill_rate = tonumber(ARGV[6])
+local now = tonumber(ARGV[7])
+local cost = tonumber(ARGV[8])
+local window_start = today - window_days + 1
+
+-- Roll expired day buckets out of the window total
+local first = tonumber(redis.call('HGET', KEYS[1], 'first') or today)
+local total = tonumber(redis.call('HGET', KEYS[1], 'total') or '0')
+if first + window_days <= window_start then
+  redis.call('DEL', KEYS[1])
+  first = today
+  total = 0
+end
+while first < window_start do
+  total = total - tonumber(redis.call('HGET', KEYS[1], first) or '0')
+  redis.call('HDEL', KEYS[1], first)
+  first = first + 1
+end
+if total < 0 then
+  total = 0
+end
+redis.call('HSET', KEYS[1], 'first', first, 'total', total)
+redis.call('EXPIRE', KEYS[1], (window_days + 1) * 86400)
+
+local count = tonumber(redis.call('HGET', KEYS[1], today) or '0')
+
+if cost == 0 then
+  return {1, count, total, 0}
+end
+if count + cost > daily_limit then
+  return {0, count, total, -1}
+end
+if total + cost > monthly_limit then
+  return {0, count, total, -2}
+end
+
+local bucket = redis.call('HMGET', KEYS[2], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * refill_rate)
+
+if tokens < 1 then
+  return {0, count, total, math.ceil((1 - tokens) / refill_rate * 1000)}
+end
+
+redis.call('HSET', KEYS[2], 'tokens', tokens - 1, 'ts', now)
+redis.call('EXPIRE', KEYS[2], math.ceil(capacity / refill_rate) + 1)
+
+redis.call('HINCRBY', KEYS[1], today, cost)
+redis.call('HINCRBY', KEYS[1], 'total', cost)
+
+return {1, count + cost, total + cost, 0}
+"""
+
+# KEYS[1] = usage hash, ARGV[1] = today, ARGV[2] = cost
+REFUND_SCRIPT = """
+local count = tonumber(redis.call('HGET', KEYS[1], ARGV[1]) or '0')
+local cost = math.min(count, tonumber(ARGV[2]))
+if cost > 0 then
+  redis.call('HINCRBY', KEYS[1], ARGV[1], -cost)
+  redis.call('HINCRBY', KEYS[1], 'total', -cost)
+end
+return 0
+"""
+
+
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    remaining: int
+    reset: int  # Unix timestamp of the next daily reset
+    monthly_limit: int
+    monthly_remaining: int
+    retry_after: int = 0  # Seconds
+    reason: Optional[str] = None  # 'daily', 'monthly' or 'burst' when rejected
+
+    def headers(self) -> Dict[str, str]:
+        """
+        X-RateLimit-* response headers
+        """
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": str(self.reset),
+            "X-RateLimit-Limit-Month": str(self.monthly_limit),
+            "X-RateLimit-Remaining-Month": str(self.monthly_remaining)
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(self.retry_after)
+        return headers
+
+
+class MemoryBackend:
+    """
+    In-process backend with the same semantics as the Lua scripts
+    Limits are per process, so it is only meant for Redis outages,
+    local development and tests.
+    """
+
+    def __init__(self):
+        self._usage: Dict[str, Dict[Any, int]] = {}
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    async def hit(
+        self,
+        usage_key: str,
+        bucket_key: str,
+        daily_limit: int,
+        monthly_limit: int,
+        window_days: int,
+        today: int,
+        capacity: int,
+        refill_rate: float,
+        now: float,
+        cost: int
+    ) -> Tuple[int, int, int, int]:
+        window_start = today - window_days + 1
+        usage = self._usage.get(usage_key)
+
+        if usage is None or usage["first"] + window_days <= window_start:
+            usage = self._usage[usage_key] = {"first": today, "total": 0}
+
+        while usage["first"] < window_start:
+            usage["total"] -= usage.pop(usage["first"], 0)
+            usage["first"] += 1
+        usage["total"] = max(0, usage["total"])
+
+        count = usage.get(today, 0)
+        total = usage["total"]
+
+        if cost == 0:
+            return 1, count, total, 0
+        if count + cost > daily_limit:
+            return 0, count, total, DAILY_EXCEEDED
+        if total + cost > monthly_limit:
+            return 0, count, total, MONTHLY_EXCEEDED
+
+        tokens, ts = self._buckets.get(bucket_key, (capacity, now))
+        tokens = min(capacity, tokens + max(0.0, now - ts) * refill_rate)
+
+        if tokens < 1:
+            return 0, count, total, math.ceil((1 - tokens) / refill_rate * 1000)
+
+        self._buckets[bucket_key] = (tokens - 1, now)
+        usage[today] = count + cost
+        usage["total"] = total + cost
+        return 1, count + cost, total + cost, 0
+
+    async def refund(self, usage_key: str, today: int, cost: int) -> None:
+        usage = self._usage.get(usage_key)
+        cost = min(cost, usage.get(today, 0)) if usage else 0
+        if cost > 0:
+            usage[today] -= cost
+            usage["total"] -= cost
+
+
+class RateLimiter:
+    """
+    Per (user, service) limiter combining daily and monthly quotas with a
+    burst bucket
+
+    `redis_client` is any redis.asyncio-compatible client (a local
+    redis-server or fakeredis.aioredis.FakeRedis both work). Without one,
+    or when Redis errors, the in-process backend is used.
+    """
+
+    def __init__(self, redis_client=None):
+        self.redis = redis_client
+        self.memory = MemoryBackend()
+        self.window_days = settings.RATE_LIMIT_MONTHLY_WINDOW_DAYS
+        self.burst_capacity = settings.RATE_LIMIT_BURST
+        self.refill_rate = settings.RATE_LIMIT_BURST / settings.RATE_LIMIT_BURST_WINDOW
+
+        if self.redis is not None:
+            self._hit_script = self.redis.register_script(HIT_SCRIPT)
+            self._refund_script = self.redis.register_script(REFUND_SCRIPT)
+
+    async def hit(
+        self,
+        user_id: str,
+        service: str,
+        daily_limit: int,
+        monthly_limit: int,
+        cost: int = 1
+    ) -> RateLimitResult:
+        """
+        Consume `cost` generations from the quotas and one burst token
+
+        A batch counts as a single request against the burst bucket.
+        """
+        return await self._run(user_id, service, daily_limit, monthly_limit, cost=cost)
+
+    async def usage(
+        self,
+        user_id: str,
+        service: str,
+        daily_limit: int,
+        monthly_limit: int
+    ) -> RateLimitResult:
+        """
+        Read remaining quota without consuming anything
+        """
+        return await self._run(user_id, service, daily_limit, monthly_limit, cost=0)
+
+    async def refund(self, user_id: str, service: str, cost: int = 1) -> None:
+        """
+        Give back generations that failed upstream
+        """
+        today, _ = self._day_window()
+        usage_key = self._usage_key(user_id, service)
+
+        try:
+            if self.redis is None:
+                raise ConnectionError("Redis not configured")
+            await self._refund_script(keys=[usage_key], args=[today, cost])
+        except Exception:
+            await self.memory.refund(usage_key, today, cost)
+
+    async def _run(
+        self,
+        user_id: str,
+        service: str,
+        daily_limit: int,
+        monthly_limit: int,
+        cost: int
+    ) -> RateLimitResult:
+        now = time.time()
+        today, reset = self._day_window()
+        usage_key = self._usage_key(user_id, service)
+        bucket_key = f"ratelimit:{user_id}:{service}:burst"
+
+        args = [
+            daily_limit, monthly_limit, self.window_days, today,
+            self.burst_capacity, self.refill_rate, now, cost
+        ]
+
+        try:
+            if self.redis is None:
+                raise ConnectionError("Redis not configured")
+            allowed, count, total, retry_ms = await self._hit_script(
+                keys=[usage_key, bucket_key], args=args
+            )
+        except Exception as e:
+            if self.redis is not None:
+                logger.warning(f"Redis rate limit failed, using in-process fallback: {e}")
+            allowed, count, total, retry_ms = await self.memory.hit(usage_key, bucket_key, *args)
+
+        allowed, count, total, retry_ms = bool(allowed), int(count), int(total), int(retry_ms)
+
+        if allowed:
+            reason = None
+            retry_after = 0
+        elif retry_ms == DAILY_EXCEEDED:
+            reason = "daily"
+            retry_after = max(1, reset - int(now))
+        elif retry_ms == MONTHLY_EXCEEDED:
+            # The oldest day bucket leaves the window at the next reset
+            reason = "monthly"
+            retry_after = max(1, reset - int(now))
+        else:
+            reason = "burst"
+            retry_after = max(1, math.ceil(retry_ms / 1000))
+
+        if cost:
+            RATE_LIMIT_DECISIONS.labels(service=service, result=reason or "allowed").inc()
+
+        return RateLimitResult(
+            allowed=allowed,
+            limit=daily_limit,
+            remaining=max(0, daily_limit - count),
+            reset=reset,
+            monthly_limit=monthly_limit,
+            monthly_remaining=max(0, monthly_limit - total),
+            retry_after=retry_after,
+            reason=reason
+        )
+
+    def _usage_key(self, user_id: str, service: str) -> str:
+        return f"ratelimit:{user_id}:{service}:usage"
+
+    def _day_window(self) -> Tuple[int, int]:
+        """
+        Current day number (server local time, like the generations count
+        it replaces) and the timestamp of the next midnight
+        """
+        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        reset = int((today_start + timedelta(days=1)).timestamp())
+        return today_start.toordinal(), reset
+
+
+# ============================================
+# DEPENDENCY INJECTION
+# ============================================
+def get_rate_limiter(request: Request) -> RateLimiter:
+    """
+    Dependency: process-wide rate limiter
+    """
+    return request.app.state.rate_limiter
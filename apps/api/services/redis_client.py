@@ -0,0 +1,48 @@
+"""
+Redis client - shared connection pool for rate limiting and caches
+"""
+from fastapi import FastAPI, Request
+from typing import Optional
+import redis.asyncio as redis
+import logging
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+async def open_redis(app: FastAPI) -> None:
+    """
+    Connect to Redis (called from main.lifespan)
+
+    Redis is optional: when it cannot be reached, app.state.redis is None
+    and consumers fall back to their in-process implementation.
+    """
+    client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+
+    try:
+        await client.ping()
+    except Exception as e:
+        logger.warning(f"Redis unavailable ({e}), using in-process fallbacks")
+        await client.aclose()
+        client = None
+    else:
+        logger.info("✅ Redis connection established")
+
+    app.state.redis = client
+
+
+async def close_redis(app: FastAPI) -> None:
+    """
+    Close the Redis pool (called from main.lifespan)
+    """
+    if app.state.redis is not None:
+        await app.state.redis.aclose()
+        logger.info("✅ Redis connection closed")
+
+
+def get_redis(request: Request) -> Optional[redis.Redis]:
+    """
+    Dependency: shared Redis client (None when Redis is unavailable)
+    """
+    return request.app.state.redis
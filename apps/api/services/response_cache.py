@@ -0,0 +1,96 @@
+"""
+Response Cache - exact-match cache for deterministic generations
+In-process LRU tier with an optional Redis second tier
+
+Opt-in per service via `response_cache_ttl` (seconds) in
+ServiceConfig.config; services without it are never cached. Entries are
+keyed by OpenAIService.fingerprint.
+"""
+from collections import OrderedDict
+from fastapi import Request
+from prometheus_client import Counter
+from typing import Any, Dict, Optional, Tuple
+import json
+import time
+import logging
+
+from config import settings
+from services.config_cache import ServiceConfigSnapshot
+
+logger = logging.getLogger(__name__)
+
+# Prometheus metrics
+RESPONSE_CACHE_LOOKUPS = Counter(
+    'konqer_api_response_cache_lookups_total',
+    'Response cache lookups on generation requests',
+    ['service', 'result']
+)
+
+
+class ResponseCache:
+    def __init__(self, redis_client=None, max_entries: int = settings.RESPONSE_CACHE_MAX_ENTRIES):
+        self.redis = redis_client if settings.RESPONSE_CACHE_REDIS_ENABLED else None
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    @staticmethod
+    def ttl_for(config: Optional[ServiceConfigSnapshot]) -> int:
+        """
+        Cache TTL for a service (0 = caching disabled)
+        """
+        if config is None:
+            return 0
+        return int(config.config.get("response_cache_ttl") or 0)
+
+    async def get(self, key: str, service: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                RESPONSE_CACHE_LOOKUPS.labels(service=service, result="hit_memory").inc()
+                return value
+            del self._entries[key]
+
+        if self.redis is not None:
+            try:
+                raw = await self.redis.get(self._redis_key(key))
+                if raw is not None:
+                    value = json.loads(raw)
+                    ttl = await self.redis.ttl(self._redis_key(key))
+                    self._store(key, value, max(1, ttl))
+                    RESPONSE_CACHE_LOOKUPS.labels(service=service, result="hit_redis").inc()
+                    return value
+            except Exception as e:
+                logger.warning(f"Response cache Redis read failed: {e}")
+
+        RESPONSE_CACHE_LOOKUPS.labels(service=service, result="miss").inc()
+        return None
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: int) -> None:
+        self._store(key, value, ttl)
+
+        if self.redis is not None:
+            try:
+                await self.redis.set(self._redis_key(key), json.dumps(value), ex=ttl)
+            except Exception as e:
+                logger.warning(f"Response cache Redis write failed: {e}")
+
+    def _store(self, key: str, value: Dict[str, Any], ttl: int) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _redis_key(self, key: str) -> str:
+        return f"response-cache:{key}"
+
+
+# ============================================
+# DEPENDENCY INJECTION
+# ============================================
+def get_response_cache(request: Request) -> ResponseCache:
+    """
+    Dependency: process-wide response cache
+    """
+    return request.app.state.response_cache
@@ -0,0 +1,148 @@
+"""
+LLM Scheduler - weighted fair queueing of OpenAI calls across users
+Start-time fair queueing: each call gets a virtual finish tag of
+max(virtual time, user's last finish) + cost / weight, and free slots go to
+the lowest tag. A user flooding the queue (e.g. a large batch) only pushes
+back their own calls; weights come from the user's subscription plan.
+
+The caller's identity travels in the `current_tenant` context variable,
+set by get_entitlement and by the job worker.
+
+Streams hold their slot until the last token, which for long outputs is
+far longer than a completion, so they are scheduled separately
+(llm_stream_scheduler, LLM_STREAM_SCHEDULER_CONCURRENCY): open streams
+cannot starve plain completions, and the stream cap bounds how many
+long-lived upstream connections a pod keeps open.
+"""
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from prometheus_client import Gauge, Histogram
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import heapq
+import itertools
+import time
+import logging
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Prometheus metrics
+LLM_SCHEDULER_WAIT = Histogram(
+    'konqer_api_llm_scheduler_wait_seconds',
+    'Time OpenAI calls waited for a scheduler slot',
+    ['scheduler', 'plan'],
+    buckets=(0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+LLM_SCHEDULER_QUEUE = Gauge(
+    'konqer_api_llm_scheduler_queue_depth',
+    'OpenAI calls waiting for a scheduler slot in this process',
+    ['scheduler']
+)
+LLM_SCHEDULER_ACTIVE = Gauge(
+    'konqer_api_llm_scheduler_active',
+    'OpenAI calls holding a scheduler slot in this process',
+    ['scheduler']
+)
+
+
+class SlotTimeout(asyncio.TimeoutError):
+    """
+    Raised when no scheduler slot frees up in time
+    """
+
+
+@dataclass(frozen=True)
+class Tenant:
+    user_id: str
+    plan: Optional[str] = None
+
+
+SYSTEM_TENANT = Tenant(user_id="system")
+
+current_tenant: ContextVar[Optional[Tenant]] = ContextVar("current_tenant", default=None)
+
+
+def plan_weight(plan: Optional[str]) -> float:
+    """
+    Scheduling weight of a plan (LLM_PLAN_WEIGHTS, default 1)
+    """
+    return float(settings.LLM_PLAN_WEIGHTS.get(plan or "none", 1.0))
+
+
+class FairScheduler:
+    def __init__(self, concurrency: int = settings.LLM_SCHEDULER_CONCURRENCY, name: str = "completion"):
+        self.concurrency = concurrency
+        self.name = name
+        self._active = 0
+        self._virtual_time = 0.0
+        self._finish_tags: Dict[str, float] = {}
+        self._queue: List[Tuple[float, int, float, asyncio.Future]] = []
+        self._seq = itertools.count()
+
+    @asynccontextmanager
+    async def slot(self, cost: float = 1.0, timeout: Optional[float] = None) -> AsyncIterator[None]:
+        """
+        Hold one of `concurrency` upstream slots for the current tenant
+
+        Raises SlotTimeout if no slot frees up within `timeout`.
+        """
+        tenant = current_tenant.get() or SYSTEM_TENANT
+        start = max(self._virtual_time, self._finish_tags.get(tenant.user_id, 0.0))
+        finish = start + max(cost, 1.0) / plan_weight(tenant.plan)
+        self._finish_tags[tenant.user_id] = finish
+        self._prune_tags()
+
+        waited_from = time.monotonic()
+        if self._active < self.concurrency and not self._queue:
+            self._grant(start)
+        else:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._queue, (finish, next(self._seq), start, future))
+            LLM_SCHEDULER_QUEUE.labels(scheduler=self.name).set(len(self._queue))
+            try:
+                await asyncio.wait_for(future, timeout)
+            except BaseException as e:
+                # Granted in the same tick we gave up: hand the slot on
+                if future.done() and not future.cancelled():
+                    self._release()
+                if isinstance(e, asyncio.TimeoutError):
+                    raise SlotTimeout() from e
+                raise
+
+        LLM_SCHEDULER_WAIT.labels(scheduler=self.name, plan=tenant.plan or "none").observe(time.monotonic() - waited_from)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _grant(self, start: float) -> None:
+        self._active += 1
+        self._virtual_time = max(self._virtual_time, start)
+        LLM_SCHEDULER_ACTIVE.labels(scheduler=self.name).set(self._active)
+
+    def _release(self) -> None:
+        self._active -= 1
+        LLM_SCHEDULER_ACTIVE.labels(scheduler=self.name).set(self._active)
+        while self._queue and self._active < self.concurrency:
+            _, _, start, future = heapq.heappop(self._queue)
+            if future.done():
+                continue  # Waiter timed out or was cancelled
+            self._grant(start)
+            future.set_result(None)
+        LLM_SCHEDULER_QUEUE.labels(scheduler=self.name).set(len(self._queue))
+
+    def _prune_tags(self) -> None:
+        # Tags at or behind virtual time behave like a fresh user
+        if len(self._finish_tags) > 10000:
+            self._finish_tags = {
+                user_id: tag for user_id, tag in self._finish_tags.items()
+                if tag > self._virtual_time
+            }
+
+
+# Process-wide schedulers shared by every OpenAIService instance
+llm_scheduler = FairScheduler()
+llm_stream_scheduler = FairScheduler(settings.LLM_STREAM_SCHEDULER_CONCURRENCY, name="stream")
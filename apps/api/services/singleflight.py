@@ -0,0 +1,48 @@
+"""
+Singleflight - coalesce identical in-flight upstream calls
+Concurrent callers with the same key await one call and share its result
+"""
+from prometheus_client import Counter
+from typing import Any, Awaitable, Callable, Dict, Tuple
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Prometheus metrics
+SINGLEFLIGHT_COALESCED = Counter(
+    'konqer_api_singleflight_coalesced_total',
+    'Calls that joined an identical in-flight upstream call',
+    ['group']
+)
+
+
+class SingleFlight:
+    def __init__(self, group: str):
+        self.group = group
+        self._calls: Dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Run fn once per key at a time
+
+        Returns (result, shared) where shared is True for callers that
+        joined a call started by someone else. The call runs in its own
+        task, so a caller disconnecting does not cancel it for the others.
+        """
+        task = self._calls.get(key)
+        shared = task is not None
+
+        if shared:
+            SINGLEFLIGHT_COALESCED.labels(group=self.group).inc()
+        else:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+
+        return await asyncio.shield(task), shared
+
+
+# Process-wide groups for OpenAI completions and Apollo enrichment
+completion_flight = SingleFlight("openai_completion")
+enrichment_flight = SingleFlight("apollo_enrichment")
@@ -2,7 +2,7 @@
 Stripe Service - Payment processing
 """
 import stripe
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from config import settings
 import logging
 
@@ -18,7 +18,8 @@ class StripeService:
         email: str,
         plan: str = "founding",
         success_url: str = "https://konqer.app/success",
-        cancel_url: str = "https://konqer.app/pricing"
+        cancel_url: str = "https://konqer.app/pricing",
+        idempotency_key: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Create Stripe Checkout Session
@@ -27,6 +28,8 @@ class StripeService:
             user_id: User UUID
             email: User email
             plan: 'founding', 'monthly_single', 'monthly_bundle', etc.
+            idempotency_key: Forwarded to Stripe (scoped to the user) so a
+                retried create returns the same session
         """
         # Get price ID based on plan
         price_id = self._get_price_id(plan)
@@ -50,7 +53,8 @@ class StripeService:
                     'user_id': user_id,
                     'plan': plan
                 }
-            }
+            },
+            idempotency_key=f"checkout:{user_id}:{idempotency_key}" if idempotency_key else None
         )
 
         return {
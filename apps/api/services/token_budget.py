@@ -0,0 +1,215 @@
+"""
+Token Budget - pre-flight token counting and max_tokens sizing
+Counts prompt tokens locally (tiktoken when available, ~4 chars/token
+otherwise) so oversized requests are rejected before any network call,
+trims low-value context fields, and sizes max_tokens per service from
+ServiceConfig.config
+
+The encoding is loaded off the event loop at startup (warm_up); images
+ship it under TIKTOKEN_CACHE_DIR so nothing is downloaded at runtime.
+"""
+from prometheus_client import Histogram
+from typing import Any, Dict, List, Optional
+import asyncio
+import json
+import logging
+
+from config import settings
+from services.config_cache import ServiceConfigSnapshot
+
+try:
+    import tiktoken
+except ImportError:  # Optional: fall back to the character heuristic
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Prometheus metrics
+OPENAI_PROMPT_TOKENS = Histogram(
+    'konqer_api_openai_prompt_tokens',
+    'Prompt tokens per OpenAI request, as estimated locally and as billed',
+    ['service', 'source'],
+    buckets=(50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+)
+OPENAI_ESTIMATE_RATIO = Histogram(
+    'konqer_api_openai_prompt_token_estimate_ratio',
+    'Estimated / actual prompt tokens',
+    ['service'],
+    buckets=(0.5, 0.75, 0.9, 0.95, 1.0, 1.05, 1.1, 1.25, 1.5, 2.0)
+)
+
+# Chat format overhead (per message, and priming of the reply)
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+_encoding = None  # None: not loaded yet, False: unavailable
+_warming = False
+
+
+class ChatRequest(dict):
+    """
+    Chat completion parameters built by fit_request, carrying the prompt
+    token count so it is only computed once per request
+    """
+    prompt_tokens: int
+
+
+class RequestTooLarge(Exception):
+    """
+    Raised when a prompt would not fit its token budget
+    """
+    def __init__(self, prompt_tokens: int, limit: int):
+        super().__init__(f"Request is too large ({prompt_tokens} tokens, limit {limit})")
+        self.prompt_tokens = prompt_tokens
+        self.limit = limit
+
+
+def _load_encoding():
+    global _encoding
+    if _encoding is None and tiktoken is not None:
+        try:
+            _encoding = tiktoken.encoding_for_model(settings.OPENAI_MODEL)
+        except Exception:
+            try:
+                _encoding = tiktoken.get_encoding("o200k_base")
+            except Exception as e:
+                logger.warning(f"tiktoken unavailable, estimating tokens from length: {e}")
+                _encoding = False
+    return _encoding or None
+
+
+def _get_encoding():
+    # While warm_up loads the encoding in a thread, estimate instead of
+    # blocking the event loop on a second load
+    if _encoding is None and _warming:
+        return None
+    return _load_encoding()
+
+
+async def warm_up(timeout: float = settings.TIKTOKEN_LOAD_TIMEOUT) -> None:
+    """
+    Load the encoding in a worker thread (reading or downloading its
+    BPE file blocks), giving up waiting after `timeout` seconds; until
+    it is loaded token counts use the length heuristic
+    """
+    global _warming
+    if _encoding is not None or tiktoken is None:
+        return
+    _warming = True
+    try:
+        await asyncio.wait_for(asyncio.to_thread(_load_encoding), timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"tiktoken encoding not loaded after {timeout:g}s, estimating tokens from length meanwhile")
+    else:
+        _warming = False
+
+
+def count_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages: List[Dict[str, Any]]) -> int:
+    """
+    Prompt tokens of a chat completion request
+    """
+    return TOKENS_PER_REPLY + sum(
+        TOKENS_PER_MESSAGE + count_tokens(message.get("content") or "")
+        for message in messages
+    )
+
+
+def trim_context(context: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Copy of context with long lists cut to CONTEXT_LIST_LIMITS (e.g. the
+    3 most recent activities) and strings inside list items (post
+    summaries, etc.) cut to CONTEXT_FIELD_MAX_CHARS
+    """
+    trimmed = dict(context)
+    max_chars = settings.CONTEXT_FIELD_MAX_CHARS
+
+    for field, value in trimmed.items():
+        if not isinstance(value, list):
+            continue
+        limit = settings.CONTEXT_LIST_LIMITS.get(field)
+        if limit is not None:
+            value = value[:limit]
+        trimmed[field] = [
+            item[:max_chars] if isinstance(item, str)
+            else {k: v[:max_chars] if isinstance(v, str) else v for k, v in item.items()}
+            if isinstance(item, dict)
+            else item
+            for item in value
+        ]
+    return trimmed
+
+
+def prompt_limit(config: Optional[ServiceConfigSnapshot]) -> int:
+    """
+    Max prompt tokens for a service (config "max_prompt_tokens" overrides)
+    """
+    if config is not None and config.config.get("max_prompt_tokens"):
+        return int(config.config["max_prompt_tokens"])
+    return settings.OPENAI_MAX_PROMPT_TOKENS
+
+
+def check_input(prompt: str, context: Dict[str, Any], config: Optional[ServiceConfigSnapshot]) -> None:
+    """
+    Cheap pre-flight check on raw user input, before quota or enrichment
+    """
+    limit = prompt_limit(config)
+    context_json = json.dumps(trim_context(context), default=str)
+    # A BPE token covers at least one UTF-8 byte, so input that fits in
+    # `limit` bytes cannot exceed it and needs no encoding
+    if len(prompt.encode()) + len(context_json.encode()) <= limit:
+        return
+    tokens = count_tokens(prompt) + count_tokens(context_json)
+    if tokens > limit:
+        raise RequestTooLarge(tokens, limit)
+
+
+def fit_request(
+    service: str,
+    request: Dict[str, Any],
+    config: Optional[ServiceConfigSnapshot]
+) -> ChatRequest:
+    """
+    Reject a built request whose prompt exceeds its budget and size
+    max_tokens: ServiceConfig.config["max_tokens"] (else the builder
+    default), capped to what is left of the model context window
+    """
+    prompt_tokens = count_message_tokens(request["messages"])
+    limit = prompt_limit(config)
+    if prompt_tokens > limit:
+        raise RequestTooLarge(prompt_tokens, limit)
+
+    max_tokens = request.get("max_tokens") or settings.OPENAI_DEFAULT_MAX_TOKENS
+    if config is not None and config.config.get("max_tokens"):
+        max_tokens = int(config.config["max_tokens"])
+    max_tokens = min(max_tokens, settings.OPENAI_CONTEXT_WINDOW - prompt_tokens)
+
+    OPENAI_PROMPT_TOKENS.labels(service=service, source="estimated").observe(prompt_tokens)
+    fitted = ChatRequest(request, max_tokens=max_tokens)
+    fitted.prompt_tokens = prompt_tokens
+    return fitted
+
+
+def prompt_tokens_of(request: Dict[str, Any]) -> int:
+    """
+    Prompt tokens of a request, reusing the count made by fit_request
+    """
+    if isinstance(request, ChatRequest):
+        return request.prompt_tokens
+    return count_message_tokens(request.get("messages", []))
+
+
+def record_actual(service: str, request: Dict[str, Any], prompt_tokens: Optional[int]) -> None:
+    """
+    Export billed prompt tokens next to the local estimate
+    """
+    if not prompt_tokens:
+        return
+    OPENAI_PROMPT_TOKENS.labels(service=service, source="actual").observe(prompt_tokens)
+    OPENAI_ESTIMATE_RATIO.labels(service=service).observe(prompt_tokens_of(request) / prompt_tokens)
@@ -0,0 +1,72 @@
+"""
+KONQER Job Worker - standalone process for asynchronous generation jobs
+Scales independently of the API: python worker.py
+"""
+from fastapi import FastAPI
+import asyncio
+import signal
+import logging
+
+from models.database import engine
+from services.http_clients import open_clients, close_clients
+from services.redis_client import open_redis, close_redis
+from services.rate_limiter import RateLimiter
+from services.config_cache import ServiceConfigCache
+from services.response_cache import ResponseCache
+from services.admission import AdmissionController
+from services.job_worker import JobWorker
+from services.openai_service import OpenAIService
+from services.apollo_service import ApolloService
+from services.token_budget import warm_up as warm_up_token_counting
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    logger.info("🚀 Starting Konqer job worker...")
+
+    # Same shared clients as the API; the app object only holds state
+    app = FastAPI()
+    await open_clients(app)
+    await open_redis(app)
+
+    # Token counting encoding (loaded off the event loop)
+    await warm_up_token_counting()
+
+    config_cache = ServiceConfigCache()
+    await config_cache.start()
+
+    worker = JobWorker(
+        openai_service=OpenAIService(
+            client=app.state.openai_client,
+            admission=AdmissionController(app.state.redis)
+        ),
+        apollo_service=ApolloService(client=app.state.apollo_client),
+        response_cache=ResponseCache(app.state.redis),
+        config_cache=config_cache,
+        limiter=RateLimiter(app.state.redis)
+    )
+    await worker.start()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await stop.wait()
+
+    logger.info("🛑 Shutting down Konqer job worker...")
+    await worker.stop()
+    await config_cache.stop()
+    await close_clients(app)
+    await close_redis(app)
+    await engine.dispose()
+    logger.info("✅ Job worker stopped")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())